@@ -31,24 +31,33 @@ def create_app(config_class=None):
     # ブループリントを登録
     from app.routes import main as main_blueprint
     from app.auth import auth as auth_blueprint
-    from app.upload_routes import upload_bp as upload_blueprint
     from app.analyse_routes import analyse as analyse_blueprint
-    from app.ishida1_routes import ishida1 as ishida1_blueprint
-    from app.ishida2_routes import ishida2 as ishida2_blueprint
-    from app.master_routes import master as master_blueprint
     
     app.register_blueprint(main_blueprint)
     app.register_blueprint(auth_blueprint)
-    app.register_blueprint(upload_blueprint)
     app.register_blueprint(analyse_blueprint)
-    app.register_blueprint(ishida1_blueprint)
-    app.register_blueprint(ishida2_blueprint)
-    app.register_blueprint(master_blueprint)
     
-    # アプリケーションコンテキストをプッシュしてモデルを初期化
+    # 利用頻度の低い画面は最初のアクセス時にモジュールを読み込む
+    from app.lazy_blueprints import register_lazy_blueprint
+    register_lazy_blueprint(app, 'app.upload_routes', 'upload_bp')
+    register_lazy_blueprint(app, 'app.ishida1_routes', 'ishida1')
+    register_lazy_blueprint(app, 'app.ishida2_routes', 'ishida2')
+    register_lazy_blueprint(app, 'app.master_routes', 'master')
+    
+    # テーブル作成は manage_db.py create-tables で行う（DB_CREATE_ALL=1 の場合のみ起動時にも実行）
+    if app.config.get('DB_CREATE_ALL'):
+        with app.app_context():
+            create_all_tables()
+    
+    # スキーマバージョンの確認（結果はキャッシュされ、通常はDBに問い合わせない）
+    from .schema import check_schema_version
     with app.app_context():
-        # マスタモデルをインポートしてテーブルを作成
-        from .master_models import PrdMstModel, KbnMst, MnoMstModel
-        db.create_all()
+        check_schema_version(max_age=app.config.get('SCHEMA_CHECK_INTERVAL', 3600))
     
-    return app 
\ No newline at end of file
+    return app
+
+def create_all_tables():
+    """全モデルの未作成のテーブルを作成する（アプリケーションコンテキスト内で呼び出す）"""
+    # テーブル定義を登録するため、モデルのモジュールをすべてインポートする
+    from . import models, master_models, ishida_models, import_jobs
+    db.create_all() 
\ No newline at end of file
@@ -1,11 +1,12 @@
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, current_app as app, jsonify
-from .models import SjiDatModel, WorkerModel, db, PrdRecordModel, SetMst
+from flask import Blueprint, render_template, request, flash, current_app as app, jsonify
+from .models import SjiDatModel, WorkerModel, db, PrdRecordModel, PrdDailyAggModel, SetMst
 from .master_models import MnoMstModel
 from .master_models import PrdMstModel
 from .utils import log_error
+from .date_range import date_range, group_by_month, invalid_dates
+from .defect_categories import DEFECT_CATEGORIES, DEFECT_LABELS, defect_sum_columns, total_defect_column, DefectMatrix
 from .master_models import KbnMst
-from app.ishida_models import FmcDat
 import tempfile
 import os
 from flask_login import login_required
@@ -63,78 +64,56 @@ def defect_data():
     mono_syu = request.args.get('mono_syu')
     prd_nm = request.args.get('prd_nm')
     prd_color = request.args.get('prd_color')
-    # クエリビルド
-    query = PrdRecordModel.query
+    # 指定された日付条件（日付区分 → 期間）
+    periods = {
+        kbn: (period_from, period_to)
+        for kbn, period_from, period_to in (
+            ('R1', date_from, date_to),
+            ('CHK', date_from2, date_to2),
+            ('R2', date_from3, date_to3),
+        )
+        if period_from or period_to
+    }
     
-    # フィルター適用
-    if date_from:
-        query = query.filter(PrdRecordModel.PRR_R1_IN_DATE >= date_from)
-    if date_to:
-        query = query.filter(PrdRecordModel.PRR_R1_IN_DATE <= date_to)
-    if date_from2:
-        query = query.filter(PrdRecordModel.PRR_CHK_DT >= date_from2)
-    if date_to2:
-        query = query.filter(PrdRecordModel.PRR_CHK_DT <= date_to2)
-    if date_from3:
-        query = query.filter(PrdRecordModel.PRR_R2_DATE >= date_from3)
-    if date_to3:
-        query = query.filter(PrdRecordModel.PRR_R2_DATE <= date_to3)
+    # 日付条件が1種類以下なら日別集計テーブル、複数の日付で絞る場合は生産実績を集計
+    if len(periods) <= 1:
+        src = PrdDailyAggModel
+        date_kbn, (period_from, period_to) = next(iter(periods.items()), ('R1', (None, None)))
+        query = PrdDailyAggModel.filter_period(PrdDailyAggModel.query, date_kbn, period_from, period_to)
+    else:
+        src = PrdRecordModel
+        query = PrdRecordModel.query
+        
+        # フィルター適用
+        if date_from:
+            query = query.filter(PrdRecordModel.PRR_R1_IN_DATE >= date_from)
+        if date_to:
+            query = query.filter(PrdRecordModel.PRR_R1_IN_DATE <= date_to)
+        if date_from2:
+            query = query.filter(PrdRecordModel.PRR_CHK_DT >= date_from2)
+        if date_to2:
+            query = query.filter(PrdRecordModel.PRR_CHK_DT <= date_to2)
+        if date_from3:
+            query = query.filter(PrdRecordModel.PRR_R2_DATE >= date_from3)
+        if date_to3:
+            query = query.filter(PrdRecordModel.PRR_R2_DATE <= date_to3)
     if prd_id:
-        query = query.filter(PrdRecordModel.PRR_PRD_ID == prd_id)
+        query = query.filter(src.PRR_PRD_ID == prd_id)
     if mono_syu:
-        query = query.filter(PrdRecordModel.PRR_MONO_SYU == mono_syu)
+        query = query.filter(src.PRR_MONO_SYU == mono_syu)
     
     # PrdMstModelとの結合（prd_nmまたはprd_colorが指定されている場合）
     if prd_nm or prd_color:
-        query = query.join(PrdMstModel, PrdRecordModel.PRR_PRD_ID == PrdMstModel.PRD_ID)
+        query = query.join(PrdMstModel, src.PRR_PRD_ID == PrdMstModel.PRD_ID)
         if prd_nm:
             query = query.filter(PrdMstModel.PRD_NM == prd_nm)
         if prd_color:
             query = query.filter(PrdMstModel.PRD_COLOR == prd_color)
     # データ取得
     result = query.with_entities(
-        func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
-        func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-        func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-        func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-        func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-        func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-        func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-        func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-        func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-        func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-        func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-        func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-        func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-        func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-        func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-        func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-        func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-        func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-        func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-        func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-        func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-        func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-        func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-        func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-        func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-        func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-        func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-        func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-        func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-        func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-        func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),                func.sum(PrdRecordModel.PRR_OTHER_2).label('other_2'),
-        func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-        func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-        func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-        func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-        func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-        func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-        func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-        func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-        func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-        func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-        func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
+        func.sum(src.PRR_INJECT_QTY).label('total_inject'),
+        # 各不良項目の合計
+        *defect_sum_columns(src)
     ).first()
     
     # 結果がNoneの場合の処理
@@ -151,94 +130,10 @@ def defect_data():
     
     if total_inject > 0:
         # 不良率を計算
-        data = {
-            'roll_miss': round((float(result.roll_miss or 0) / total_inject) * 100, 2),
-            'leak': round((float(result.leak or 0) / total_inject) * 100, 2),
-            'film_pull': round((float(result.film_pull or 0) / total_inject) * 100, 2),
-            'crack': round((float(result.crack or 0) / total_inject) * 100, 2),
-            'tear': round((float(result.tear or 0) / total_inject) * 100, 2),
-            'peel': round((float(result.peel or 0) / total_inject) * 100, 2),
-            'chip': round((float(result.chip or 0) / total_inject) * 100, 2),
-            'poly_crk': round((float(result.poly_crk or 0) / total_inject) * 100, 2),
-            'mold_scr': round((float(result.mold_scr or 0) / total_inject) * 100, 2),
-            'lens_scr': round((float(result.lens_scr or 0) / total_inject) * 100, 2),
-            'r1_bubble': round((float(result.r1_bubble or 0) / total_inject) * 100, 2),
-            'r2_bubble': round((float(result.r2_bubble or 0) / total_inject) * 100, 2),
-            'defect': round((float(result.defect or 0) / total_inject) * 100, 2),
-            'elution': round((float(result.elution or 0) / total_inject) * 100, 2),
-            'haze': round((float(result.haze or 0) / total_inject) * 100, 2),
-            'curl': round((float(result.curl or 0) / total_inject) * 100, 2),
-            'film_float': round((float(result.film_float or 0) / total_inject) * 100, 2),
-            'r1_defect': round((float(result.r1_defect or 0) / total_inject) * 100, 2),
-            'film_ng': round((float(result.film_ng or 0) / total_inject) * 100, 2),
-            'foreign': round((float(result.foreign or 0) / total_inject) * 100, 2),
-            'cut_waste': round((float(result.cut_waste or 0) / total_inject) * 100, 2),
-            'fiber': round((float(result.fiber or 0) / total_inject) * 100, 2),
-            'mold_dirt': round((float(result.mold_dirt or 0) / total_inject) * 100, 2),
-            'film_dirt': round((float(result.film_dirt or 0) / total_inject) * 100, 2),
-            'axis_1st': round((float(result.axis_1st or 0) / total_inject) * 100, 2),
-            'stripe_1st': round((float(result.stripe_1st or 0) / total_inject) * 100, 2),
-            'edge_defect': round((float(result.edge_defect or 0) / total_inject) * 100, 2),
-            'wash_drop': round((float(result.wash_drop or 0) / total_inject) * 100, 2),
-            'unknown': round((float(result.unknown or 0) / total_inject) * 100, 2),
-            'other_1': round((float(result.other_1 or 0) / total_inject) * 100, 2),
-            'ecc_defect': round((float(result.ecc_defect or 0) / total_inject) * 100, 2),
-            'drop': round((float(result.drop or 0) / total_inject) * 100, 2),
-            'count_err': round((float(result.count_err or 0) / total_inject) * 100, 2),
-            'suction': round((float(result.suction or 0) / total_inject) * 100, 2),
-            'axis_def': round((float(result.axis_def or 0) / total_inject) * 100, 2),
-            'color_def': round((float(result.color_def or 0) / total_inject) * 100, 2),
-            'trans_def': round((float(result.trans_def or 0) / total_inject) * 100, 2),
-            'curve_def': round((float(result.curve_def or 0) / total_inject) * 100, 2),
-            'cen_th_def': round((float(result.cen_th_def or 0) / total_inject) * 100, 2),
-            'diam_def': round((float(result.diam_def or 0) / total_inject) * 100, 2),
-            'r1_th_def': round((float(result.r1_th_def or 0) / total_inject) * 100, 2)
-        }
+        data = DefectMatrix([result]).row_rates(0)
     
     # 日本語ラベル
-    labels = {
-        'roll_miss': '巻きミス',
-        'leak': 'モレ',
-        'film_pull': '膜ひっぱり',
-        'crack': 'ワレ',
-        'tear': 'チギレ',
-        'peel': 'ハガレ',
-        'chip': 'カケ',
-        'poly_crk': '重合ワレ',
-        'mold_scr': '型キズ',
-        'lens_scr': 'レンズキズ',
-        'r1_bubble': 'R1泡',
-        'r2_bubble': 'R2泡',
-        'defect': 'ブツ',
-        'elution': '溶出',
-        'haze': 'モヤ',
-        'curl': 'カール',
-        'film_float': '膜浮き',
-        'r1_defect': 'R1不良',
-        'film_ng': '膜不良',
-        'foreign': 'イブツ',
-        'cut_waste': 'カットくず',
-        'fiber': 'センイ',
-        'mold_dirt': 'モールド汚れ',
-        'film_dirt': '膜汚れ',
-        'axis_1st': '片軸',
-        'stripe_1st': '脈理',
-        'edge_defect': 'コバスリ不良',
-        'wash_drop': '洗浄落下',
-        'unknown': '不明',
-        'other_1': 'その他',
-        'ecc_defect': '偏心不良',
-        'drop': '落下',
-        'count_err': '員数違い',
-        'suction': '吸い込み',
-        'axis_def': '軸不良',
-        'color_def': 'カラー不良',
-        'trans_def': '透過率不良',
-        'curve_def': 'カーブ不良',
-        'cen_th_def': '中心厚不良',
-        'diam_def': '径不良',
-        'r1_th_def': 'R1厚み不良'
-    }
+    labels = DEFECT_LABELS
     
     return jsonify({
         'data': data,
@@ -270,90 +165,24 @@ def mono_syu_defect_data():
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
     
-    # クエリビルド
+    # クエリビルド（日別集計テーブルから集計）
     base_query = db.session.query(
-        func.DATE(PrdRecordModel.PRR_R2_DATE).label('date'),
-        PrdRecordModel.PRR_MONO_SYU,
-        func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
+        PrdDailyAggModel.PDA_DATE.label('date'),
+        PrdDailyAggModel.PRR_MONO_SYU,
+        func.sum(PrdDailyAggModel.PRR_INJECT_QTY).label('total_inject'),
         # 全ての不良項目を合計
-        func.sum(
-            PrdRecordModel.PRR_ROLL_MISS + 
-            PrdRecordModel.PRR_R1_BUB_CHK + 
-            PrdRecordModel.PRR_CURL_INS + 
-            PrdRecordModel.PRR_FILM_FLT_CK + 
-            PrdRecordModel.PRR_LEAK + 
-            PrdRecordModel.PRR_FILM_PULL + 
-            PrdRecordModel.PRR_FILM_NG_CK + 
-            PrdRecordModel.PRR_R2_BUB_REK + 
-            PrdRecordModel.PRR_CRACK + 
-            PrdRecordModel.PRR_TEAR_RLS + 
-            PrdRecordModel.PRR_TEAR + 
-            PrdRecordModel.PRR_PEEL + 
-            PrdRecordModel.PRR_CHIP + 
-            PrdRecordModel.PRR_POLY_CRK + 
-            PrdRecordModel.PRR_MOLD_SCR + 
-            PrdRecordModel.PRR_LENS_SCR + 
-            PrdRecordModel.PRR_R1_BUBBLE + 
-            PrdRecordModel.PRR_R2_BUBBLE + 
-            PrdRecordModel.PRR_DEFECT + 
-            PrdRecordModel.PRR_ELUTION + 
-            PrdRecordModel.PRR_HAZE + 
-            PrdRecordModel.PRR_CURL + 
-            PrdRecordModel.PRR_FILM_FLOAT + 
-            PrdRecordModel.PRR_R1_DEFECT + 
-            PrdRecordModel.PRR_FILM_NG + 
-            PrdRecordModel.PRR_FOREIGN + 
-            PrdRecordModel.PRR_CUT_WASTE + 
-            PrdRecordModel.PRR_FIBER + 
-            PrdRecordModel.PRR_MOLD_DIRT + 
-            PrdRecordModel.PRR_FILM_DIRT + 
-            PrdRecordModel.PRR_AXIS_1ST + 
-            PrdRecordModel.PRR_STRIPE_1ST + 
-            PrdRecordModel.PRR_EDGE_DEFECT + 
-            PrdRecordModel.PRR_ECC_1ST + 
-            PrdRecordModel.PRR_WASH_DROP + 
-            PrdRecordModel.PRR_UNKNOWN + 
-            PrdRecordModel.PRR_OTHER_1 + 
-            PrdRecordModel.PRR_OTHER_2 + 
-            PrdRecordModel.PRR_ECC_DEFECT + 
-            PrdRecordModel.PRR_DROP + 
-            PrdRecordModel.PRR_COUNT_ERR + 
-            PrdRecordModel.PRR_OTHER_1ST + 
-            PrdRecordModel.PRR_PEEL_2ND + 
-            PrdRecordModel.PRR_STRIPE_2ND + 
-            PrdRecordModel.PRR_SUCTION + 
-            PrdRecordModel.PRR_MOLD_2ND + 
-            PrdRecordModel.PRR_FILM_2ND + 
-            PrdRecordModel.PRR_DEFECT_2ND + 
-            PrdRecordModel.PRR_OTHER_2ND + 
-            PrdRecordModel.PRR_AXIS_DEF + 
-            PrdRecordModel.PRR_FILM_3RD + 
-            PrdRecordModel.PRR_COLOR_DEF + 
-            PrdRecordModel.PRR_TRANS_DEF + 
-            PrdRecordModel.PRR_CURVE_DEF + 
-            PrdRecordModel.PRR_CEN_TH_DEF + 
-            PrdRecordModel.PRR_DIAM_DEF + 
-            PrdRecordModel.PRR_R1_TH_DEF + 
-            PrdRecordModel.PRR_ECC_3RD + 
-            PrdRecordModel.PRR_EDGE_DEF_3 + 
-            PrdRecordModel.PRR_AXIS_3RD + 
-            PrdRecordModel.PRR_OTHER_3RD
-        ).label('total_defect')
+        total_defect_column(PrdDailyAggModel)
     )
     
-    # フィルター適用
-    if date_from:
-        base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE >= date_from)
-    if date_to:
-        base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE <= date_to)
-    base_query = base_query.filter(PrdRecordModel.PRR_CHK3_BY.isnot(None))
+    # フィルター適用（R2注入日、三次検査済み）
+    base_query = PrdDailyAggModel.filter_period(base_query, 'R2', date_from, date_to, chk3_only=True)
     
     # グループ化して結果取得
     results = base_query.group_by(
-        func.DATE(PrdRecordModel.PRR_R2_DATE),
-        PrdRecordModel.PRR_MONO_SYU
+        PrdDailyAggModel.PDA_DATE,
+        PrdDailyAggModel.PRR_MONO_SYU
     ).order_by(
-        func.DATE(PrdRecordModel.PRR_R2_DATE)
+        PrdDailyAggModel.PDA_DATE
     ).all()
     
     # モノマーマスタの取得
@@ -505,47 +334,7 @@ def mono_syu_defect_detail_data():
         PrdRecordModel.PRR_MONO_SYU,
         func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
         # 各不良項目の合計
-        func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-        func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-        func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-        func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-        func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-        func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-        func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-        func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-        func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-        func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-        func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-        func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-        func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-        func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-        func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-        func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-        func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-        func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-        func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-        func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-        func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-        func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-        func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-        func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-        func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-        func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-        func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-        func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-        func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-        func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),                func.sum(PrdRecordModel.PRR_OTHER_2).label('other_2'),
-        func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-        func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-        func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-        func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-        func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-        func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-        func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-        func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-        func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-        func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-        func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
+        *defect_sum_columns(PrdRecordModel)
     )
     
     # フィルター適用
@@ -577,194 +366,34 @@ def mono_syu_defect_detail_data():
     total_rates = {}  # total_ratesを初期化
     
     # 不良項目の日本語ラベル
-    defect_labels = {
-        'roll_miss': '巻きミス',
-        'leak': 'モレ',
-        'film_pull': '膜ひっぱり',
-        'crack': 'ワレ',
-        'tear': 'チギレ',
-        'peel': 'ハガレ',
-        'chip': 'カケ',
-        'poly_crk': '重合ワレ',
-        'mold_scr': '型キズ',
-        'lens_scr': 'レンズキズ',
-        'r1_bubble': 'R1泡',
-        'r2_bubble': 'R2泡',
-        'defect': 'ブツ',
-        'elution': '溶出',
-        'haze': 'モヤ',
-        'curl': 'カール',
-        'film_float': '膜浮き',
-        'r1_defect': 'R1不良',
-        'film_ng': '膜不良',
-        'foreign': 'イブツ',
-        'cut_waste': 'カットくず',
-        'fiber': 'センイ',
-        'mold_dirt': 'モールド汚れ',
-        'film_dirt': '膜汚れ',
-        'axis_1st': '片軸',
-        'stripe_1st': '脈理',
-        'edge_defect': 'コバスリ不良',
-        'wash_drop': '洗浄落下',
-        'unknown': '不明',
-        'other_1': 'その他',
-        'ecc_defect': '偏心不良',
-        'drop': '落下',
-        'count_err': '員数違い',
-        'suction': '吸い込み',
-        'axis_def': '軸不良',
-        'color_def': 'カラー不良',
-        'trans_def': '透過率不良',
-        'curve_def': 'カーブ不良',
-        'cen_th_def': '中心厚不良',
-        'diam_def': '径不良',
-        'r1_th_def': 'R1厚み不良'
-    }
+    defect_labels = DEFECT_LABELS
     
-    for row in results:
+    # 不良数・注入数を配列にまとめ、不良率は行単位で計算する
+    matrix = DefectMatrix(results)
+    defect_rates = {}
+    for index, row in enumerate(results):
         date_str = row.date.strftime('%Y-%m-%d') if row.date else 'Unknown'
-        mono_syu = row.PRR_MONO_SYU or 'Unknown'
         
         # 日付リストに追加
         if date_str not in dates:
             dates.append(date_str)
         
-        # 不良データの初期化
-        if date_str not in defect_data:
-            defect_data[date_str] = {}
-        
         # 各不良項目のデータを格納
+        total_inject = matrix.totals[index]
+        total_defect = matrix.row_total_defect(index)
         defect_data[date_str] = {
-            'total_inject': float(row.total_inject or 0),
-            'roll_miss': float(row.roll_miss or 0),
-            'leak': float(row.leak or 0),
-            'film_pull': float(row.film_pull or 0),
-            'crack': float(row.crack or 0),
-            'tear': float(row.tear or 0),
-            'peel': float(row.peel or 0),
-            'chip': float(row.chip or 0),
-            'poly_crk': float(row.poly_crk or 0),
-            'mold_scr': float(row.mold_scr or 0),
-            'lens_scr': float(row.lens_scr or 0),
-            'r1_bubble': float(row.r1_bubble or 0),
-            'r2_bubble': float(row.r2_bubble or 0),
-            'defect': float(row.defect or 0),
-            'elution': float(row.elution or 0),
-            'haze': float(row.haze or 0),
-            'curl': float(row.curl or 0),
-            'film_float': float(row.film_float or 0),
-            'r1_defect': float(row.r1_defect or 0),
-            'film_ng': float(row.film_ng or 0),
-            'foreign': float(row.foreign or 0),
-            'cut_waste': float(row.cut_waste or 0),
-            'fiber': float(row.fiber or 0),
-            'mold_dirt': float(row.mold_dirt or 0),
-            'film_dirt': float(row.film_dirt or 0),
-            'axis_1st': float(row.axis_1st or 0),
-            'stripe_1st': float(row.stripe_1st or 0),
-            'edge_defect': float(row.edge_defect or 0),
-            'wash_drop': float(row.wash_drop or 0),
-            'unknown': float(row.unknown or 0),
-            'other_1': float(row.other_1 or 0),
-            'ecc_defect': float(row.ecc_defect or 0),
-            'drop': float(row.drop or 0),
-            'count_err': float(row.count_err or 0),
-            'suction': float(row.suction or 0),
-            'axis_def': float(row.axis_def or 0),
-            'color_def': float(row.color_def or 0),
-            'trans_def': float(row.trans_def or 0),
-            'curve_def': float(row.curve_def or 0),
-            'cen_th_def': float(row.cen_th_def or 0),
-            'diam_def': float(row.diam_def or 0),
-            'r1_th_def': float(row.r1_th_def or 0)
+            'total_inject': total_inject,
+            **matrix.row_counts(index)
+        }
+        total_data[date_str] = {
+            'total_inject': total_inject,
+            'total_defect': total_defect
         }
         
-        # 合計データの更新
-        if date_str not in total_data:
-            total_data[date_str] = {
-                'total_inject': 0,
-                'total_defect': 0
-            }
-        total_data[date_str]['total_inject'] += float(row.total_inject or 0)
-        total_data[date_str]['total_defect'] += sum([
-            float(row.roll_miss or 0),
-            float(row.leak or 0),
-            float(row.film_pull or 0),
-            float(row.crack or 0),
-            float(row.tear or 0),
-            float(row.peel or 0),
-            float(row.chip or 0),
-            float(row.poly_crk or 0),
-            float(row.mold_scr or 0),
-            float(row.lens_scr or 0),
-            float(row.r1_bubble or 0),
-            float(row.r2_bubble or 0),
-            float(row.defect or 0),
-            float(row.elution or 0),
-            float(row.haze or 0),
-            float(row.curl or 0),
-            float(row.film_float or 0),
-            float(row.r1_defect or 0),
-            float(row.film_ng or 0),
-            float(row.foreign or 0),
-            float(row.cut_waste or 0),
-            float(row.fiber or 0),
-            float(row.mold_dirt or 0),
-            float(row.film_dirt or 0),
-            float(row.axis_1st or 0),
-            float(row.stripe_1st or 0),
-            float(row.edge_defect or 0),
-            float(row.wash_drop or 0),
-            float(row.unknown or 0),
-            float(row.other_1 or 0),
-            float(row.ecc_defect or 0),
-            float(row.drop or 0),
-            float(row.count_err or 0),
-            float(row.suction or 0),
-            float(row.axis_def or 0),
-            float(row.color_def or 0),
-            float(row.trans_def or 0),
-            float(row.curve_def or 0),
-            float(row.cen_th_def or 0),
-            float(row.diam_def or 0),
-            float(row.r1_th_def or 0)
-        ])
-    
-    # 不良率の計算
-    defect_rates = {}
-    for date_str in dates:
-        if date_str in defect_data and defect_data[date_str]['total_inject'] > 0:
-            defect_rates[date_str] = {}
-            total_defect = 0  # 全不良数の合計
-            
-            # 各不良項目の不良率を計算
-            for defect_type, count in defect_data[date_str].items():
-                if defect_type != 'total_inject':
-                    rate = round(
-                        (count / defect_data[date_str]['total_inject']) * 100, 2
-                    ) if defect_data[date_str]['total_inject'] > 0 else 0
-                    defect_rates[date_str][defect_type] = rate
-                    total_defect += count  # 全不良数を合計
-            
-            # 合計不良率を計算（全不良数/注入数）
-            total_rates[date_str] = round(
-                (total_defect / defect_data[date_str]['total_inject']) * 100, 2
-            ) if defect_data[date_str]['total_inject'] > 0 else 0
-        else:
-            # 注入数が0の場合、全ての不良率を0に設定
-            defect_rates[date_str] = {defect_type: 0 for defect_type in defect_labels.keys()}
-            total_rates[date_str] = 0
-
-    # 合計データの更新
-    for date_str in dates:
-        if date_str in defect_data:
-            total_data[date_str] = {
-                'total_inject': defect_data[date_str]['total_inject'],
-                'total_defect': sum(
-                    count for defect_type, count in defect_data[date_str].items()
-                    if defect_type != 'total_inject'
-                )
-            }
+        # 不良率の計算（注入数が0の場合は全て0）
+        defect_rates[date_str] = matrix.row_rates(index)
+        # 合計不良率（全不良数/注入数）
+        total_rates[date_str] = round((total_defect / total_inject) * 100, 2) if total_inject > 0 else 0
 
     return jsonify({
         'dates': dates,
@@ -793,21 +422,63 @@ def defect_by_item():
     # モノマーマスタの取得
     mono_mst = {m.MNO_SYU: {'name': m.MNO_NM, 'target': float(m.MNO_TARGET) if m.MNO_TARGET else None} 
                 for m in MnoMstModel.get_all()}
-    workers = WorkerModel.query.all()
+    workers = WorkerModel.get_all()
     return render_template('defect_by_item.html', title='不良項目別モノマー種毎の不良率分析', mono_mst=mono_mst, workers=workers)
 
+def _defect_by_item_query(*entities):
+    """不良項目別分析の集計クエリ（R1・R2注入日、R1・R2注入者で絞り込み、モノマー種でグループ化）"""
+    query = db.session.query(
+        PrdRecordModel.PRR_MONO_SYU,
+        func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
+        *entities
+    )
+    
+    # フィルター適用
+    query = query.filter(*date_range(PrdRecordModel.PRR_R1_IN_DATE, request.args.get('date_from'), request.args.get('date_to')))
+    query = query.filter(*date_range(PrdRecordModel.PRR_R2_DATE, request.args.get('date_from2'), request.args.get('date_to2')))
+    if request.args.get('injector'):
+        query = query.filter(PrdRecordModel.PRR_R1_INJECT == request.args.get('injector'))
+    if request.args.get('injector2'):
+        query = query.filter(PrdRecordModel.PRR_R2_INJECT == request.args.get('injector2'))
+    
+    return query.group_by(PrdRecordModel.PRR_MONO_SYU)
+
+def _mono_syu_defect_rates(results, count_key, mono_mst):
+    """モノマー種ごとの集計行から不良率のリストを作成（不良率の降順。不良数が0でも含める）"""
+    mono_syu_data = []
+    for row in results:
+        mono_syu = row.PRR_MONO_SYU or 'Unknown'
+        total_inject = float(row.total_inject or 0)
+        defect_count = float(getattr(row, count_key) or 0)
+        
+        # 不良率を計算
+        defect_rate = 0
+        if total_inject > 0:
+            defect_rate = round((defect_count / total_inject) * 100, 2)
+        
+        mono_syu_data.append({
+            'mono_syu': mono_syu,
+            'mono_name': mono_mst.get(mono_syu, {}).get('name', 'Unknown'),
+            'target': mono_mst.get(mono_syu, {}).get('target'),
+            'total_inject': total_inject,
+            'defect_count': defect_count,
+            'defect_rate': defect_rate
+        })
+    
+    # 不良率でソート（降順）
+    mono_syu_data.sort(key=lambda x: x['defect_rate'], reverse=True)
+    return mono_syu_data
+
 @analyse.route('/api/defect_by_item_data')
 @login_required
 def defect_by_item_data():
-    """特定の不良項目における各モノマー種別の不良率データをJSON形式で返す"""
-    # フィルターパラメータ取得
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    date_from2 = request.args.get('date_from2')
-    date_to2 = request.args.get('date_to2')
+    """
+    特定の不良項目における各モノマー種別の不良率データをJSON形式で返す
+    
+    defect_item=all の場合は、全不良項目のモノマー種別データを1回の集計で返す
+    （items: {不良項目キー: mono_syu_data}）。画面は不良項目の切り替えをサーバーに問い合わせずに表示できる。
+    """
     defect_item = request.args.get('defect_item')
-    injector = request.args.get('injector')
-    injector2 = request.args.get('injector2')
     
     # 不良項目が指定されていない場合はエラー
     if not defect_item:
@@ -816,93 +487,41 @@ def defect_by_item_data():
             'mono_syu_data': []
         }), 400
     
-    try:
-        # カラム名の作成 - 全て大文字にして統一
-        column_name = f'PRR_{defect_item.upper()}'
-        
-        # カラム名のマッピング確認（必要な場合）
-        # 例：defect_itemが「r1_bubble」の場合、「PRR_R1_BUBBLE」のようになるかを確認
-        log_error(f'検索カラム: {column_name}')
-        
-        # カラム名が存在するか確認
+    # 不良項目キー → 集計する列（各不良カテゴリの先頭の列 PRR_<キー>）
+    if defect_item == 'all':
+        item_columns = {category.key: category.columns[0] for category in DEFECT_CATEGORIES}
+    else:
+        item_columns = {defect_item: f'PRR_{defect_item.upper()}'}
+    
+    # カラム名が存在するか確認
+    for item, column_name in item_columns.items():
         if not hasattr(PrdRecordModel, column_name):
-            # 大文字・小文字の区別が問題かもしれないので、すべてのカラムをチェック
-            all_columns = [c.key for c in PrdRecordModel.__table__.columns]
-            log_error(f'利用可能なカラム: {all_columns}')
-            
             return jsonify({
-                'error': f'不良項目 {defect_item} に対応するカラム {column_name} は存在しません',
+                'error': f'不良項目 {item} に対応するカラム {column_name} は存在しません',
                 'mono_syu_data': []
             }), 400
-        
-        # SQLAlchemyでカラム名を動的に扱うためにカラムオブジェクトを取得
-        defect_column = getattr(PrdRecordModel, column_name)
-        
-        # クエリビルド
-        base_query = db.session.query(
-            PrdRecordModel.PRR_MONO_SYU,
-            func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
-            func.sum(defect_column).label('defect_count')
-        )
-        
-        # フィルター適用
-        if date_from:
-            base_query = base_query.filter(PrdRecordModel.PRR_R1_IN_DATE >= date_from)
-        if date_to:
-            base_query = base_query.filter(PrdRecordModel.PRR_R1_IN_DATE <= date_to)
-        if date_from2:
-            base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE >= date_from2)
-        if date_to2:
-            base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE <= date_to2) 
-        if injector:
-            base_query = base_query.filter(PrdRecordModel.PRR_R1_INJECT == injector)
-        if injector2:
-            base_query = base_query.filter(PrdRecordModel.PRR_R2_INJECT == injector2)
-            
-        # グループ化して結果取得
-        results = base_query.group_by(
-            PrdRecordModel.PRR_MONO_SYU
-        ).all()
+    
+    try:
+        results = _defect_by_item_query(*[
+            func.sum(getattr(PrdRecordModel, column_name)).label(item)
+            for item, column_name in item_columns.items()
+        ]).all()
         
         # モノマーマスタの取得
         mono_mst = {m.MNO_SYU: {'name': m.MNO_NM, 'target': float(m.MNO_TARGET) if m.MNO_TARGET else None} 
                     for m in MnoMstModel.get_all()}
         
-        # 結果の整形
-        mono_syu_data = []
-        
-        for row in results:
-            mono_syu = row.PRR_MONO_SYU or 'Unknown'
-            total_inject = float(row.total_inject or 0)
-            defect_count = float(row.defect_count or 0)
-            
-            # 不良率を計算
-            defect_rate = 0
-            if total_inject > 0:
-                defect_rate = round((defect_count / total_inject) * 100, 2)
-            
-            # モノマー情報を取得
-            mono_name = mono_mst.get(mono_syu, {}).get('name', 'Unknown')
-            target = mono_mst.get(mono_syu, {}).get('target')
-            
-            # すべての場合を追加（不良数が0でも表示）
-            mono_syu_data.append({
-                'mono_syu': mono_syu,
-                'mono_name': mono_name,
-                'target': target,
-                'total_inject': total_inject,
-                'defect_count': defect_count,
-                'defect_rate': defect_rate
-            })
-        
-        # 不良率でソート（降順）
-        mono_syu_data.sort(key=lambda x: x['defect_rate'], reverse=True)
-        
-        return jsonify({
-            'mono_syu_data': mono_syu_data,
+        response = {
             'mono_mst': mono_mst,
             'csv_import_time': SetMst.get_csv_import_time()
-        })
+        }
+        if defect_item == 'all':
+            response['items'] = {
+                item: _mono_syu_defect_rates(results, item, mono_mst) for item in item_columns
+            }
+        else:
+            response['mono_syu_data'] = _mono_syu_defect_rates(results, defect_item, mono_mst)
+        return jsonify(response)
     except Exception as e:
         log_error(f'不良項目別データ取得中にエラーが発生しました: {str(e)}')
         return jsonify({
@@ -940,10 +559,9 @@ def progress():
     )
     
     # 検索条件の適用
-    if r1_in_date:
-        query = query.filter(func.date(PrdRecordModel.PRR_R1_IN_DATE) >= r1_in_date)
-    if r1_in_date2:
-        query = query.filter(func.date(PrdRecordModel.PRR_R1_IN_DATE) <= r1_in_date2)
+    query = query.filter(*date_range(PrdRecordModel.PRR_R1_IN_DATE, r1_in_date, r1_in_date2))
+    if invalid_dates(r1_in_date, r1_in_date2):
+        flash('日付の形式が正しくないため、期間の条件を指定せずに表示しています')
     if mono_syu:
         query = query.filter(MnoMstModel.MNO_SYU == mono_syu)
     
@@ -981,156 +599,16 @@ def progress():
 @analyse.route('/api/high_defect_rate_data')
 @login_required
 def high_defect_rate_data():
-    """不良率が高い不良データをJSON形式で返す"""
-    # フィルターパラメータ取得
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    date_type = request.args.get('date_type', 'r2')  # r2: R2注入日, chk: 検査日
-    
-    # 不良項目の定義
-    defect_items = {
-        'roll_miss': '巻きミス',
-        'leak': 'モレ',
-        'film_pull': '膜ひっぱり',
-        'crack': 'ワレ',
-        'tear': 'チギレ',
-        'peel': 'ハガレ',
-        'chip': 'カケ',
-        'poly_crk': '重合ワレ',
-        'mold_scr': '型キズ',
-        'lens_scr': 'レンズキズ',
-        'r1_bubble': 'R1泡',
-        'r2_bubble': 'R2泡',
-        'defect': 'ブツ',
-        'elution': '溶出',
-        'haze': 'モヤ',
-        'curl': 'カール',
-        'film_float': '膜浮き',
-        'r1_defect': 'R1不良',
-        'film_ng': '膜不良',
-        'foreign': 'イブツ',
-        'cut_waste': 'カットくず',
-        'fiber': 'センイ',
-        'mold_dirt': 'モールド汚れ',
-        'film_dirt': '膜汚れ',
-        'axis_1st': '片軸',
-        'stripe_1st': '脈理',
-        'edge_defect': 'コバスリ不良',
-        'wash_drop': '洗浄落下',
-        'unknown': '不明',
-        'other_1': 'その他',
-        'ecc_defect': '偏心不良',
-        'drop': '落下',
-        'count_err': '員数違い',
-        'suction': '吸い込み',
-        'axis_def': '軸不良',
-        'color_def': 'カラー不良',
-        'trans_def': '透過率不良',
-        'curve_def': 'カーブ不良',
-        'cen_th_def': '中心厚不良',
-        'diam_def': '径不良',
-        'r1_th_def': 'R1厚み不良'
-    }
-    
-    # クエリビルド
-    base_query = db.session.query(
-        PrdRecordModel.PRR_MONO_SYU,
-        func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
-        # 各不良項目の合計
-        func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-        func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-        func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-        func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-        func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-        func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-        func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-        func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-        func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-        func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-        func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-        func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-        func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-        func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-        func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-        func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-        func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-        func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-        func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-        func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-        func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-        func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-        func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-        func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-        func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-        func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-        func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-        func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-        func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-        func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),                func.sum(PrdRecordModel.PRR_OTHER_2).label('other_2'),
-        func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-        func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-        func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-        func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-        func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-        func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-        func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-        func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-        func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-        func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-        func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
+    """不良率が高い不良データをJSON形式で返す（集計はDefectAggregateServiceに共通化）"""
+    from .defect_aggregate import defect_aggregates
+
+    data = defect_aggregates.high_defect_rates(
+        request.args.get('date_type', 'r2'),  # r2: R2注入日, chk: 検査日
+        request.args.get('date_from'),
+        request.args.get('date_to')
     )
-    
-    # フィルター適用
-    if date_from:
-        if date_type == 'r2':
-            base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE >= date_from)
-        else:
-            base_query = base_query.filter(PrdRecordModel.PRR_CHK_DT >= date_from)
-    if date_to:
-        if date_type == 'r2':
-            base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE <= date_to)
-        else:
-            base_query = base_query.filter(PrdRecordModel.PRR_CHK_DT <= date_to)
-    
-    # グループ化して結果取得
-    results = base_query.group_by(
-        PrdRecordModel.PRR_MONO_SYU
-    ).all()
-    
-    # モノマーマスタの取得
-    mono_mst = {m.MNO_SYU: {'name': m.MNO_NM, 'target': float(m.MNO_TARGET) if m.MNO_TARGET else None} 
-                for m in MnoMstModel.get_all()}
-    
-    # 結果の整形
-    defect_data = []
-    for row in results:
-        mono_syu = row.PRR_MONO_SYU or 'Unknown'
-        total_inject = float(row.total_inject or 0)
-        
-        # 各不良項目のデータを格納
-        for defect_key, defect_label in defect_items.items():
-            defect_count = float(getattr(row, defect_key) or 0)
-            if defect_count > 0:  # 不良数が0より大きい場合のみ追加
-                defect_rate = round((defect_count / total_inject * 100), 2) if total_inject > 0 else 0
-                defect_data.append({
-                    'mono_syu': mono_syu,
-                    'mono_name': mono_mst.get(mono_syu, {}).get('name', 'Unknown'),
-                    'target': mono_mst.get(mono_syu, {}).get('target'),
-                    'defect_type': defect_key,
-                    'defect_label': defect_label,
-                    'total_inject': total_inject,
-                    'defect_count': defect_count,
-                    'defect_rate': defect_rate
-                })
-    
-    # 不良率でソート（降順）
-    defect_data.sort(key=lambda x: x['defect_rate'], reverse=True)
-    
-    return jsonify({
-        'defect_data': defect_data,
-        'mono_mst': mono_mst,
-        'csv_import_time': SetMst.get_csv_import_time()
-    })
+    data['csv_import_time'] = SetMst.get_csv_import_time()
+    return jsonify(data)
 
 @analyse.route('/mono_syu_achievement', methods=['GET'])
 @login_required
@@ -1231,12 +709,10 @@ def mono_syu_achievement():
             'gd_per_inj': round((total_gd_qty / total_inj_qty * 100), 2) if total_inj_qty > 0 else 0
         })
     
-    set_mst = SetMst.query.first()
-    
     return render_template(
         'mono_syu_achievement.html',
         achievement_data=achievement_data,
-        csv_import_time=set_mst.get_csv_import_time()
+        csv_import_time=SetMst.get_csv_import_time()
     )
 
 @analyse.route('/mono_syu_inspection')
@@ -1265,49 +741,7 @@ def mono_syu_inspection_data():
         result_data = []
         
         # 不良項目の日本語名マッピング
-        defect_labels = {
-            'roll_miss': '巻きミス',
-            'leak': 'モレ',
-            'film_pull': '膜ひっぱり',
-            'crack': 'ワレ',
-            'tear': 'チギレ',
-            'peel': 'ハガレ',
-            'chip': 'カケ',
-            'poly_crk': '重合ワレ',
-            'mold_scr': '型キズ',
-            'lens_scr': 'レンズキズ',
-            'r1_bubble': 'R1泡',
-            'r2_bubble': 'R2泡',
-            'defect': 'ブツ',
-            'elution': '溶出',
-            'haze': 'モヤ',
-            'curl': 'カール',
-            'film_float': '膜浮き',
-            'r1_defect': 'R1不良',
-            'film_ng': '膜不良',
-            'foreign': 'イブツ',
-            'cut_waste': 'カットくず',
-            'fiber': 'センイ',
-            'mold_dirt': 'モールド汚れ',
-            'film_dirt': '膜汚れ',
-            'axis_1st': '片軸',
-            'stripe_1st': '脈理',
-            'edge_defect': 'コバスリ不良',
-            'wash_drop': '洗浄落下',
-            'unknown': '不明',
-            'other_1': 'その他',
-            'ecc_defect': '偏心不良',
-            'drop': '落下',
-            'count_err': '員数違い',
-            'suction': '吸い込み',
-            'axis_def': '軸不良',
-            'color_def': 'カラー不良',
-            'trans_def': '透過率不良',
-            'curve_def': 'カーブ不良',
-            'cen_th_def': '中心厚不良',
-            'diam_def': '径不良',
-            'r1_th_def': 'R1厚み不良'
-        }
+        defect_labels = DEFECT_LABELS
         
         for mono in mono_mst:
             # 期間内の実績データを取得
@@ -1316,47 +750,7 @@ def mono_syu_inspection_data():
                 func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
                 func.sum(PrdRecordModel.PRR_A_GRADE + PrdRecordModel.PRR_B_GRADE).label('good_count'),
                 # 各不良項目の合計
-                func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-                func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-                func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-                func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-                func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-                func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-                func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-                func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-                func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-                func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-                func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-                func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-                func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-                func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-                func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-                func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-                func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-                func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-                func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-                func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-                func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-                func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-                func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-                func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-                func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-                func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-                func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-                func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-                func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-                func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),
-                func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-                func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-                func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-                func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-                func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-                func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-                func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-                func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-                func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-                func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-                func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
+                *defect_sum_columns(PrdRecordModel)
             ).filter(
                 PrdRecordModel.PRR_CHK_DT >= start_date,
                 PrdRecordModel.PRR_CHK_DT < end_date,
@@ -1400,7 +794,7 @@ def mono_syu_inspection_data():
                     'rate': data['rate']
                 })
                 
-            csv_import_time = SetMst.query.first().get_csv_import_time()
+            csv_import_time = SetMst.get_csv_import_time()
             
             # 結果データの追加
             result_data.append({
@@ -1446,6 +840,7 @@ def fmc_defect_analysis():
 @login_required
 def api_fmc_defect_analysis():
     """膜カット不良率分析のAPIエンドポイント"""
+    from app.ishida_models import FmcDat
     try:
         # パラメータの取得と変換
         start_date = request.args.get('start_date')
@@ -1556,6 +951,7 @@ def fmc_defect_detail_analysis():
 @login_required
 def api_fmc_defect_detail_data():
     """膜カット不良詳細データの日付×不良項目クロス集計データをJSONで返す"""
+    from app.ishida_models import FmcDat
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -1690,6 +1086,7 @@ def fmc_monomer_summary():
 @login_required
 def api_fmc_monomer_summary():
     """FMCモノマー別集計APIエンドポイント"""
+    from app.ishida_models import FmcDat
     try:
         # 検索条件の取得
         cut_date_start = request.args.get('cut_date_start')
@@ -1755,6 +1152,7 @@ def fmc_defect_monthly_analysis():
 @login_required
 def api_fmc_defect_monthly_data():
     """膜カット不良データの月別集計データをJSONで返す"""
+    from app.ishida_models import FmcDat
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -1798,17 +1196,14 @@ def api_fmc_defect_monthly_data():
         
         # クエリビルド（カット日基準で月別集計）
         query = db.session.query(
-            func.date_format(FmcDat.FMC_CUT_DATE, '%Y-%m').label('month'),
+            FmcDat.FMC_CUT_DATE.label('day'),
             *[func.sum(getattr(FmcDat, k)).label(k) for k in cut_keys + wash_keys],
             func.sum(FmcDat.FMC_INPUT_QTY).label('total_input'),
             func.sum(FmcDat.FMC_GOOD_QTY).label('total_good')
         )
         
         # フィルター適用
-        if start_date:
-            query = query.filter(FmcDat.FMC_CUT_DATE >= start_date)
-        if end_date:
-            query = query.filter(FmcDat.FMC_CUT_DATE <= end_date)
+        query = query.filter(*date_range(FmcDat.FMC_CUT_DATE, start_date, end_date))
         if monomer:
             query = query.filter(FmcDat.FMC_MONOMER == monomer)
         if item:
@@ -1824,11 +1219,11 @@ def api_fmc_defect_monthly_data():
         query = query.filter(FmcDat.FMC_MONOMER != 8)  # 色目を除く
         query = query.filter(FmcDat.FMC_CUT_MENU != 62)  # 色目を除く
         
-        # 月別グループ化とソート
-        query = query.group_by(func.date_format(FmcDat.FMC_CUT_DATE, '%Y-%m'))
-        query = query.order_by(func.date_format(FmcDat.FMC_CUT_DATE, '%Y-%m'))
+        # 日付列のままグループ化し（インデックス順）、月ごとにまとめる
+        query = query.group_by(FmcDat.FMC_CUT_DATE)
+        query = query.order_by(FmcDat.FMC_CUT_DATE)
         
-        results = query.all()
+        results = group_by_month(query.all(), 'day')
 
         # データ整形
         months = []
@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
+from app.database import get_pool_options
 
 # .envファイルの読み込み
 load_dotenv()
@@ -13,6 +14,14 @@ class Config:
         f"{os.getenv('DB_HOST', 'localhost')}/" \
         f"{os.getenv('DB_NAME', 'dbname')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # コネクションプール設定（計測用のMeteredQueuePool。get_db_session() もこのエンジンを使う）
+    SQLALCHEMY_ENGINE_OPTIONS = get_pool_options()
+    # 起動時にdb.create_all()を実行するか（通常は manage_db.py create-tables で作成する）
+    DB_CREATE_ALL = os.getenv('DB_CREATE_ALL', '0').lower() in ('1', 'true', 'yes', 'on')
+    # 起動時のスキーマバージョン確認をキャッシュする秒数
+    SCHEMA_CHECK_INTERVAL = int(os.getenv('SCHEMA_CHECK_INTERVAL', '3600'))
+    # 利用頻度の低い画面のモジュールを最初のアクセス時に読み込むか（0で起動時にすべて読み込む）
+    LAZY_BLUEPRINTS = os.getenv('LAZY_BLUEPRINTS', '1').lower() in ('1', 'true', 'yes', 'on')
     
     # アプリケーション設定
     SECRET_KEY = os.environ.get('SECRET_KEY', 'default-secret-key-for-development')
@@ -21,4 +30,10 @@ class Config:
     UPLOAD_DIR = os.getenv('UPLOAD_DIR', 'uploads')
     CSV_ENCODING = os.getenv('CSV_ENCODING', 'shift_jis')
     
-    PERMANENT_SESSION_LIFETIME = timedelta(hours=24) 
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
+    
+    # スライドAPIの応答キャッシュの有効期間（秒）
+    RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+    
+    # 実績一覧（R1・R2実績／検査実績）の1ページの件数
+    RESULTS_PAGE_SIZE = int(os.getenv('RESULTS_PAGE_SIZE', '200')) 
\ No newline at end of file
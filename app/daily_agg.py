@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, text
+
+# ==================== 生産実績日別集計（PRD_DAILY_AGG） ====================
+#
+# PRD_RECORDを（日付区分, 日付, モノマー種, 製品ID, 三次検査済み）単位で合計した集計テーブル。
+# 分析APIは生の生産実績ではなくこのテーブルを集計する。
+# 生産実績CSV取込（import_from_csv / import_from_csv2）が影響を受けた日付だけを再集計する。
+
+# 日付区分 → PRD_RECORDの日付列
+PRD_AGG_DATE_KBNS = {
+    'R1': 'PRR_R1_IN_DATE',  # R1注入日
+    'R2': 'PRR_R2_DATE',     # R2注入日
+    'CHK': 'PRR_CHK_DT',     # 検査日
+}
+
+# 日別集計で合計するPRD_RECORDの数量列（集計テーブルの列名は PRR_ → PDA_）
+PRD_AGG_SUM_COLUMNS = (
+    'PRR_INJECT_QTY', 'PRR_ROLL_MISS', 'PRR_R1_BUB_CHK', 'PRR_CURL_INS',
+    'PRR_FILM_FLT_CK', 'PRR_LEAK', 'PRR_FILM_PULL', 'PRR_FILM_NG_CK',
+    'PRR_R2_BUB_REK', 'PRR_CRACK', 'PRR_TEAR_RLS', 'PRR_TEAR', 'PRR_PEEL',
+    'PRR_CHIP', 'PRR_POLY_CRK', 'PRR_MOLD_SCR', 'PRR_LENS_SCR', 'PRR_R1_BUBBLE',
+    'PRR_R2_BUBBLE', 'PRR_DEFECT', 'PRR_ELUTION', 'PRR_HAZE', 'PRR_CURL',
+    'PRR_FILM_FLOAT', 'PRR_R1_DEFECT', 'PRR_FILM_NG', 'PRR_FOREIGN',
+    'PRR_CUT_WASTE', 'PRR_FIBER', 'PRR_MOLD_DIRT', 'PRR_FILM_DIRT',
+    'PRR_AXIS_1ST', 'PRR_STRIPE_1ST', 'PRR_EDGE_DEFECT', 'PRR_ECC_1ST',
+    'PRR_WASH_DROP', 'PRR_UNKNOWN', 'PRR_OTHER_1', 'PRR_OTHER_2',
+    'PRR_ECC_DEFECT', 'PRR_DROP', 'PRR_COUNT_ERR', 'PRR_OTHER_1ST',
+    'PRR_PEEL_2ND', 'PRR_STRIPE_2ND', 'PRR_SUCTION', 'PRR_MOLD_2ND',
+    'PRR_FILM_2ND', 'PRR_DEFECT_2ND', 'PRR_OTHER_2ND', 'PRR_AXIS_DEF',
+    'PRR_FILM_3RD', 'PRR_COLOR_DEF', 'PRR_TRANS_DEF', 'PRR_CURVE_DEF',
+    'PRR_CEN_TH_DEF', 'PRR_DIAM_DEF', 'PRR_R1_TH_DEF', 'PRR_ECC_3RD',
+    'PRR_EDGE_DEF_3', 'PRR_AXIS_3RD', 'PRR_OTHER_3RD', 'PRR_A_GRADE',
+    'PRR_B_GRADE',
+)
+
+
+def agg_column_name(column):
+    """PRD_RECORDの列名を集計テーブルの列名に変換（PRR_INJECT_QTY → PDA_INJECT_QTY）"""
+    return 'PDA_' + column[len('PRR_'):]
+
+
+CREATE_PRD_DAILY_AGG_SQL = (
+    "CREATE TABLE IF NOT EXISTS PRD_DAILY_AGG (\n"
+    "    PDA_ID bigint NOT NULL AUTO_INCREMENT COMMENT 'ID',\n"
+    "    PDA_DATE_KBN varchar(3) NOT NULL COMMENT '日付区分(R1/R2/CHK)',\n"
+    "    PDA_DATE date COMMENT '日付',\n"
+    "    PDA_MONO_SYU varchar(1) COMMENT 'モノマー種',\n"
+    "    PDA_PRD_ID varchar(5) COMMENT '製品ID',\n"
+    "    PDA_CHK3_FLG decimal(1) NOT NULL DEFAULT 0 COMMENT '三次検査済み',\n"
+    "    PDA_LOT_CNT int NOT NULL DEFAULT 0 COMMENT 'ロット数',\n"
+    + ''.join(
+        f"    {agg_column_name(col)} decimal(10) COMMENT '{col}の合計',\n"
+        for col in PRD_AGG_SUM_COLUMNS
+    )
+    + "    PRIMARY KEY (PDA_ID),\n"
+    "    KEY IX_PDA_DATE (PDA_DATE_KBN, PDA_DATE, PDA_MONO_SYU),\n"
+    "    KEY IX_PDA_PRD (PDA_DATE_KBN, PDA_PRD_ID, PDA_DATE)\n"
+    ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='生産実績日別集計'"
+)
+
+_CHK3_FLG_SQL = "CASE WHEN PRR_CHK3_BY IS NULL THEN 0 ELSE 1 END"
+
+
+def _insert_select_sql(date_kbn, where=None, kbn_expr=None):
+    """
+    PRD_RECORDを指定日付区分で集計してPRD_DAILY_AGGへ投入するSQL
+
+    kbn_expr: 日付区分列に入れる式（省略時は区分の文字列リテラル）
+    """
+    date_col = PRD_AGG_DATE_KBNS[date_kbn]
+    insert_cols = ['PDA_DATE_KBN', 'PDA_DATE', 'PDA_MONO_SYU', 'PDA_PRD_ID', 'PDA_CHK3_FLG', 'PDA_LOT_CNT']
+    insert_cols += [agg_column_name(col) for col in PRD_AGG_SUM_COLUMNS]
+    select_cols = [kbn_expr or f"'{date_kbn}'", f"DATE({date_col})", 'PRR_MONO_SYU', 'PRR_PRD_ID', _CHK3_FLG_SQL, 'COUNT(*)']
+    select_cols += [f'SUM({col})' for col in PRD_AGG_SUM_COLUMNS]
+    return (
+        f"INSERT INTO PRD_DAILY_AGG ({', '.join(insert_cols)}) "
+        f"SELECT {', '.join(select_cols)} FROM PRD_RECORD "
+        + (f"WHERE {where} " if where else '')
+        + f"GROUP BY DATE({date_col}), PRR_MONO_SYU, PRR_PRD_ID, {_CHK3_FLG_SQL}"
+    )
+
+
+# 集計テーブル全体の再作成に使うSQL（スキーマ移行・manage_db.py rebuild-agg）
+REBUILD_PRD_DAILY_AGG_SQL = ["DELETE FROM PRD_DAILY_AGG"] + [
+    _insert_select_sql(date_kbn) for date_kbn in PRD_AGG_DATE_KBNS
+]
+
+
+def _to_date(value):
+    """datetime/dateを日付に揃える（Noneはそのまま）"""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def new_affected_dates():
+    """再集計対象の日付を日付区分ごとに保持する辞書を作成"""
+    return {date_kbn: set() for date_kbn in PRD_AGG_DATE_KBNS}
+
+
+def add_affected_dates(affected, row):
+    """
+    生産実績1件分の日付を再集計対象に追加する
+
+    row: PRD_RECORDの列名をキーに持つ辞書（またはRowMapping）。
+         含まれない日付区分は対象にしない。
+    """
+    for date_kbn, date_col in PRD_AGG_DATE_KBNS.items():
+        if date_col in row:
+            affected[date_kbn].add(_to_date(row[date_col]))
+
+
+def collect_lot_dates(session, affected, lot_nos):
+    """更新・削除前のロットの日付（変更前の集計先）を再集計対象に追加する"""
+    if not lot_nos:
+        return
+    stmt = text(
+        f"SELECT {', '.join(PRD_AGG_DATE_KBNS.values())} FROM PRD_RECORD "
+        f"WHERE PRR_LOT_NO IN :lot_nos"
+    ).bindparams(bindparam('lot_nos', expanding=True))
+    for row in session.execute(stmt, {'lot_nos': list(lot_nos)}).mappings():
+        add_affected_dates(affected, row)
+
+
+def refresh_daily_agg(session, affected):
+    """
+    指定された日付区分・日付の集計行を削除し、PRD_RECORDから再集計する
+
+    コミットは呼び出し側で行う（取込処理と同じトランザクションで実行するため）。
+
+    戻り値:
+        int: 再集計した（日付区分, 日付）の数
+    """
+    refreshed = 0
+    for date_kbn, dates in affected.items():
+        if not dates:
+            continue
+        date_col = PRD_AGG_DATE_KBNS[date_kbn]
+        days = sorted(d for d in dates if d is not None)
+        params = {'date_kbn': date_kbn}
+        agg_conds = []
+        src_conds = []
+
+        if days:
+            # 範囲条件でインデックスを使い、DATE()で対象日に絞る
+            agg_conds.append("PDA_DATE IN :days")
+            src_conds.append(
+                f"({date_col} >= :day_from AND {date_col} < :day_to AND DATE({date_col}) IN :days)"
+            )
+            params.update({
+                'days': days,
+                'day_from': days[0],
+                'day_to': days[-1] + timedelta(days=1),
+            })
+        if None in dates:
+            agg_conds.append("PDA_DATE IS NULL")
+            src_conds.append(f"{date_col} IS NULL")
+
+        delete_stmt = text(
+            f"DELETE FROM PRD_DAILY_AGG WHERE PDA_DATE_KBN = :date_kbn AND ({' OR '.join(agg_conds)})"
+        )
+        insert_stmt = text(_insert_select_sql(date_kbn, ' OR '.join(src_conds), kbn_expr=':date_kbn'))
+        if days:
+            delete_stmt = delete_stmt.bindparams(bindparam('days', expanding=True))
+            insert_stmt = insert_stmt.bindparams(bindparam('days', expanding=True))
+
+        session.execute(delete_stmt, params)
+        session.execute(insert_stmt, params)
+        refreshed += len(dates)
+
+    return refreshed
+
+
+def rebuild_daily_agg(conn):
+    """集計テーブルを全件再作成する（コミットは呼び出し側で行う）"""
+    for sql in REBUILD_PRD_DAILY_AGG_SQL:
+        conn.execute(text(sql))
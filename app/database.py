@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from .utils import log_error
+
+# .envファイルの読み込み
+load_dotenv()
+
+
+def _env_int(name, default):
+    """環境変数を整数で取得する（未設定・不正値はデフォルト値）"""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name, default):
+    """環境変数を真偽値で取得する"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def get_database_url():
+    """接続先URLを取得（DATABASE_URLが設定されていればそれを優先）"""
+    return os.environ.get('DATABASE_URL') or (
+        f"mysql+pymysql://"
+        f"{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
+        f"{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+    )
+
+
+def get_pool_options():
+    """
+    コネクションプールの設定値を取得する（poolclassは計測用のMeteredQueuePool）
+
+    環境変数:
+        DB_POOL_SIZE: 常時保持する接続数（デフォルト5）
+        DB_MAX_OVERFLOW: プールサイズを超えて一時的に開ける接続数（デフォルト10）
+        DB_POOL_TIMEOUT: 空き接続を待つ最大秒数（デフォルト30）
+        DB_POOL_RECYCLE: 接続を再作成するまでの秒数（デフォルト3600、MySQLのwait_timeout対策）
+        DB_POOL_PRE_PING: 貸出前に接続の生存確認を行うか（デフォルトTrue）
+    """
+    return {
+        'poolclass': MeteredQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 3600),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    }
+
+
+# ==================== プール計測 ====================
+
+_stats_lock = threading.Lock()
+_pool_stats = {
+    'connects': 0,        # 物理接続の作成回数
+    'checkouts': 0,       # プールからの貸出回数
+    'checkins': 0,        # プールへの返却回数
+    'invalidated': 0,     # 無効化された接続数
+    'wait_count': 0,      # 貸出待ちの計測回数
+    'wait_total_ms': 0.0, # 貸出待ち時間の合計
+    'wait_max_ms': 0.0,   # 貸出待ち時間の最大
+}
+
+
+def _incr(key, value=1):
+    with _stats_lock:
+        _pool_stats[key] += value
+
+
+class MeteredQueuePool(QueuePool):
+    """貸出待ち時間を計測するQueuePool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with _stats_lock:
+                _pool_stats['wait_count'] += 1
+                _pool_stats['wait_total_ms'] += elapsed_ms
+                if elapsed_ms > _pool_stats['wait_max_ms']:
+                    _pool_stats['wait_max_ms'] = elapsed_ms
+
+
+# MeteredQueuePoolのすべてのプール（Flask-SQLAlchemyのエンジンを含む）で回数を計測する
+event.listen(MeteredQueuePool, 'connect', lambda dbapi_conn, rec: _incr('connects'))
+event.listen(MeteredQueuePool, 'checkout', lambda dbapi_conn, rec, proxy: _incr('checkouts'))
+event.listen(MeteredQueuePool, 'checkin', lambda dbapi_conn, rec: _incr('checkins'))
+event.listen(MeteredQueuePool, 'invalidate', lambda dbapi_conn, rec, exc: _incr('invalidated'))
+
+
+# ==================== 共有エンジン ====================
+#
+# アプリケーションコンテキスト内ではFlask-SQLAlchemyのエンジン（db.engine）を使い、
+# db.session と get_db_session() のセッションが同じプールから接続する。
+# コンテキスト外（manage_db.py 等のスクリプト）では同じ設定の単独エンジンを作成する。
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _app_engine():
+    """アプリケーションコンテキスト内であればFlask-SQLAlchemyのエンジンを返す"""
+    from flask import has_app_context
+    if not has_app_context():
+        return None
+    from app import db
+    return db.engine
+
+
+def get_engine():
+    """プロセス内で共有するエンジンを取得（コンテキスト外では初回呼び出し時に作成）"""
+    global _engine
+    engine = _app_engine()
+    if engine is not None:
+        return engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(get_database_url(), **get_pool_options())
+    return _engine
+
+
+def get_db_session():
+    """共有エンジンのプールからデータベースセッションを取得"""
+    try:
+        return Session(bind=get_engine())
+    except Exception as e:
+        log_error(f'データベースセッションの取得中にエラーが発生しました: {str(e)}')
+        return None
+
+
+def dispose_engine():
+    """コンテキスト外の共有エンジンを破棄する（fork後の子プロセスや設定変更時に使用）"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+
+
+def get_pool_stats():
+    """
+    コネクションプールの計測値を取得する
+
+    戻り値:
+        dict: 貸出・返却・接続作成の回数、貸出待ち時間（平均・最大ms）、
+              現在のプール状態（size, checked_in, checked_out, overflow。
+              アプリケーションコンテキスト内ではdb.engineのプール）
+    """
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    stats['wait_avg_ms'] = (
+        round(stats['wait_total_ms'] / stats['wait_count'], 3)
+        if stats['wait_count'] else 0.0
+    )
+    stats['wait_total_ms'] = round(stats['wait_total_ms'], 3)
+    stats['wait_max_ms'] = round(stats['wait_max_ms'], 3)
+
+    engine = _app_engine() or _engine
+    pool = engine.pool if engine is not None else None
+    if pool is not None:
+        stats['size'] = pool.size()
+        stats['checked_in'] = pool.checkedin()
+        stats['checked_out'] = pool.checkedout()
+        stats['overflow'] = pool.overflow()
+    return stats
@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+# ==================== 日付範囲の検索条件・月別集計 ====================
+#
+# 画面で指定された日付（両端を含む）を、日時列に対する半開区間 [開始日 0:00, 終了日の翌日 0:00) の
+# 条件に変換する。列に DATE() や date_format() をかけずに比較するため、日付列のインデックスで
+# 範囲検索でき、終了日の 0:00 以降の時刻を持つ行も漏れない。
+#
+# 形式が正しくない日付（画面から手入力されたもの等）は条件に含めず、その端は無制限として扱う。
+#
+# 月別集計は、列をそのまま（インデックスの順に）GROUP BY した日別の合計を月ごとにまとめ直す。
+
+
+def to_date(value):
+    """
+    日付文字列（YYYY-MM-DD）・date・datetimeをdateに変換
+
+    Returns:
+        date: 変換した日付（空の場合はNone）
+
+    Raises:
+        ValueError: 日付の形式が正しくない場合
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date()
+
+
+def _to_date_or_none(value):
+    """to_date と同じ変換（形式が正しくない場合はNone）"""
+    try:
+        return to_date(value)
+    except ValueError:
+        return None
+
+
+def invalid_dates(*values):
+    """
+    日付として解釈できない値を返す（画面で警告を表示するため）
+
+    Returns:
+        list: 空でなく、形式が正しくない値のリスト
+    """
+    return [value for value in values if value and _to_date_or_none(value) is None]
+
+
+def date_range(column, date_from=None, date_to=None):
+    """
+    日時列を期間（両端の日付を含む）で絞り込む条件を作成
+
+    Parameters:
+        column: 絞り込む日時列
+        date_from: 開始日（Noneは無制限）
+        date_to: 終了日（Noneは無制限）
+        （形式が正しくない日付は無制限として扱う）
+
+    Returns:
+        list: query.filter(*条件) に渡す条件のリスト
+    """
+    conditions = []
+    start = _to_date_or_none(date_from)
+    end = _to_date_or_none(date_to)
+    if start:
+        conditions.append(column >= datetime.combine(start, datetime.min.time()))
+    if end:
+        conditions.append(column < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+
+def group_by_month(rows, date_key):
+    """
+    日付ごとの集計行を月（YYYY-MM）ごとに合計する
+
+    Parameters:
+        rows: query.all() の集計行（日付列以外の列はすべて合計する。日付がNULLの行は除外）
+        date_key (str): 日付列のラベル
+
+    Returns:
+        list: 月の昇順に [SimpleNamespace(month='YYYY-MM', 列ラベル=合計, ...), ...]
+    """
+    months = {}
+    for row in rows:
+        day = getattr(row, date_key)
+        if day is None:
+            continue
+        month = day.strftime('%Y-%m')
+        totals = months.get(month)
+        if totals is None:
+            totals = months[month] = dict.fromkeys((key for key in row._fields if key != date_key), 0)
+        for key in totals:
+            value = getattr(row, key)
+            if value is not None:
+                totals[key] += value
+    return [SimpleNamespace(month=month, **months[month]) for month in sorted(months)]
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func
+
+from .defect_categories import DEFECT_LABELS, defect_sum_columns
+from .master_models import MnoMstModel
+from .models import db, PrdDailyAggModel
+from .response_cache import DEFAULT_TIMEOUT
+from .settings_service import data_generation
+
+# ==================== 不良率集計サービス ====================
+#
+# 高不良率画面（/api/high_defect_rate_data）のモノマー種別×不良項目の集計。
+# 日別集計テーブル（PRD_DAILY_AGG）のモノマー種ごとの合計を (日付区分, 期間) ごとにメモ化する。
+# メモはデータ世代（settings_service.data_generation）ごとに保持するため、
+# 同じプロセスでのCSV取込（SetMst.set_csv_import_time / invalidate_response_cache）で読み直される。
+# 取込ワーカーなど他のプロセスでの更新は検知できない場合があるため、応答キャッシュと同じく
+# RESPONSE_CACHE_TIMEOUT（秒）を有効期間の上限とする。
+# モノマー名・目標値はマスタキャッシュから毎回付け直す。
+
+MAX_MEMO_ENTRIES = 64
+
+
+class DefectAggregateService:
+    """モノマー種別の不良集計（日別集計テーブルから集計し、期間ごとにメモ化）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._generation = None
+
+    def invalidate(self):
+        """メモをすべて破棄する"""
+        with self._lock:
+            self._memo.clear()
+
+    def mono_totals(self, date_type, date_from=None, date_to=None):
+        """
+        モノマー種ごとの注入数・不良数の合計を取得
+
+        Parameters:
+            date_type (str): 'r2'（R2注入日） / 'chk'（検査日）
+            date_from, date_to (str): 期間（両端を含む。Noneは無制限）
+
+        Returns:
+            list: [{'mono_syu': モノマー種, 'total_inject': 注入数, 不良キー: 不良数, ...}, ...]
+        """
+        date_kbn = 'R2' if date_type == 'r2' else 'CHK'
+        generation = data_generation()
+        key = (date_kbn, date_from or None, date_to or None)
+
+        timeout = current_app.config.get('RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._generation != generation:
+                self._memo.clear()
+                self._generation = generation
+            entry = self._memo.get(key)
+        if entry is not None and now - entry[1] < timeout:
+            return entry[0]
+
+        totals = self._load_mono_totals(date_kbn, date_from, date_to)
+        with self._lock:
+            # 集計中にデータが更新された場合は保存しない
+            if self._generation == generation:
+                self._memo.pop(key, None)
+                if len(self._memo) >= MAX_MEMO_ENTRIES:
+                    self._memo.pop(next(iter(self._memo)))
+                self._memo[key] = (totals, now)
+        return totals
+
+    @staticmethod
+    def _load_mono_totals(date_kbn, date_from, date_to):
+        query = db.session.query(
+            PrdDailyAggModel.PRR_MONO_SYU,
+            func.sum(PrdDailyAggModel.PRR_INJECT_QTY).label('total_inject'),
+            # 各不良項目の合計
+            *defect_sum_columns(PrdDailyAggModel)
+        )
+        query = PrdDailyAggModel.filter_period(query, date_kbn, date_from, date_to)
+        rows = query.group_by(PrdDailyAggModel.PRR_MONO_SYU).all()
+
+        totals = []
+        for row in rows:
+            item = {'mono_syu': row.PRR_MONO_SYU, 'total_inject': float(row.total_inject or 0)}
+            for defect_key in DEFECT_LABELS:
+                item[defect_key] = float(getattr(row, defect_key) or 0)
+            totals.append(item)
+        return totals
+
+    def high_defect_rates(self, date_type, date_from=None, date_to=None):
+        """
+        モノマー種別×不良項目の不良率（不良率の降順）
+
+        Returns:
+            dict: {'defect_data': [...], 'mono_mst': {モノマー種: {'name', 'target'}}}
+        """
+        # モノマーマスタの取得
+        mono_mst = {m.MNO_SYU: {'name': m.MNO_NM, 'target': float(m.MNO_TARGET) if m.MNO_TARGET else None}
+                    for m in MnoMstModel.get_all()}
+
+        defect_data = []
+        for totals in self.mono_totals(date_type, date_from, date_to):
+            mono_syu = totals['mono_syu'] or 'Unknown'
+            total_inject = totals['total_inject']
+
+            # 各不良項目のデータを格納
+            for defect_key, defect_label in DEFECT_LABELS.items():
+                defect_count = totals[defect_key]
+                if defect_count > 0:  # 不良数が0より大きい場合のみ追加
+                    defect_rate = round((defect_count / total_inject * 100), 2) if total_inject > 0 else 0
+                    defect_data.append({
+                        'mono_syu': mono_syu,
+                        'mono_name': mono_mst.get(mono_syu, {}).get('name', 'Unknown'),
+                        'target': mono_mst.get(mono_syu, {}).get('target'),
+                        'defect_type': defect_key,
+                        'defect_label': defect_label,
+                        'total_inject': total_inject,
+                        'defect_count': defect_count,
+                        'defect_rate': defect_rate
+                    })
+
+        # 不良率でソート（降順）
+        defect_data.sort(key=lambda x: x['defect_rate'], reverse=True)
+
+        return {'defect_data': defect_data, 'mono_mst': mono_mst}
+
+
+defect_aggregates = DefectAggregateService()
@@ -0,0 +1,205 @@
+from array import array
+from collections import namedtuple
+from operator import itemgetter
+
+from sqlalchemy import func
+
+# ==================== 生産実績の不良カテゴリ定義 ====================
+#
+# 分析画面で表示する不良項目と、集計元となるPRD_RECORDの列の対応。
+# 集計SELECT・不良率の計算・日本語ラベルはすべてこの定義から生成する。
+#
+# key: APIで使用するキー / label: 表示名
+# columns: 合計する列（PRD_RECORDの列名。PrdDailyAggModelも同じ属性名）
+# stage: 不良を計上する工程（先頭の列の工程）
+
+DefectCategory = namedtuple('DefectCategory', ['key', 'label', 'columns', 'stage'])
+
+# 工程区分（CSVの不良列の並びに対応）
+STAGE_R1_CHK = 'R1検品'
+STAGE_RELEASE = '離型'
+STAGE_CHK1 = '一次検査'
+STAGE_CHK2 = '二次検査'
+STAGE_CHK3 = '三次検査'
+
+DEFECT_CATEGORIES = (
+    DefectCategory('roll_miss', '巻きミス', ('PRR_ROLL_MISS',), STAGE_R1_CHK),
+    DefectCategory('leak', 'モレ', ('PRR_LEAK',), STAGE_RELEASE),
+    DefectCategory('film_pull', '膜ひっぱり', ('PRR_FILM_PULL',), STAGE_RELEASE),
+    DefectCategory('crack', 'ワレ', ('PRR_CRACK',), STAGE_RELEASE),
+    DefectCategory('tear', 'チギレ', ('PRR_TEAR', 'PRR_TEAR_RLS'), STAGE_CHK1),
+    DefectCategory('peel', 'ハガレ', ('PRR_PEEL', 'PRR_PEEL_2ND'), STAGE_CHK1),
+    DefectCategory('chip', 'カケ', ('PRR_CHIP',), STAGE_CHK1),
+    DefectCategory('poly_crk', '重合ワレ', ('PRR_POLY_CRK',), STAGE_CHK1),
+    DefectCategory('mold_scr', '型キズ', ('PRR_MOLD_SCR', 'PRR_MOLD_2ND'), STAGE_CHK1),
+    DefectCategory('lens_scr', 'レンズキズ', ('PRR_LENS_SCR',), STAGE_CHK1),
+    DefectCategory('r1_bubble', 'R1泡', ('PRR_R1_BUBBLE', 'PRR_R1_BUB_CHK'), STAGE_CHK1),
+    DefectCategory('r2_bubble', 'R2泡', ('PRR_R2_BUBBLE', 'PRR_R2_BUB_REK'), STAGE_CHK1),
+    DefectCategory('defect', 'ブツ', ('PRR_DEFECT', 'PRR_DEFECT_2ND'), STAGE_CHK1),
+    DefectCategory('elution', '溶出', ('PRR_ELUTION',), STAGE_CHK1),
+    DefectCategory('haze', 'モヤ', ('PRR_HAZE',), STAGE_CHK1),
+    DefectCategory('curl', 'カール', ('PRR_CURL', 'PRR_CURL_INS'), STAGE_CHK1),
+    DefectCategory('film_float', '膜浮き', ('PRR_FILM_FLOAT', 'PRR_FILM_FLT_CK', 'PRR_FILM_3RD'), STAGE_CHK1),
+    DefectCategory('r1_defect', 'R1不良', ('PRR_R1_DEFECT',), STAGE_CHK1),
+    DefectCategory('film_ng', '膜不良', ('PRR_FILM_NG', 'PRR_FILM_NG_CK', 'PRR_FILM_2ND'), STAGE_CHK1),
+    DefectCategory('foreign', 'イブツ', ('PRR_FOREIGN',), STAGE_CHK1),
+    DefectCategory('cut_waste', 'カットくず', ('PRR_CUT_WASTE',), STAGE_CHK1),
+    DefectCategory('fiber', 'センイ', ('PRR_FIBER',), STAGE_CHK1),
+    DefectCategory('mold_dirt', 'モールド汚れ', ('PRR_MOLD_DIRT',), STAGE_CHK1),
+    DefectCategory('film_dirt', '膜汚れ', ('PRR_FILM_DIRT', 'PRR_EDGE_DEF_3'), STAGE_CHK1),
+    DefectCategory('axis_1st', '片軸', ('PRR_AXIS_1ST', 'PRR_AXIS_3RD'), STAGE_CHK1),
+    DefectCategory('stripe_1st', '脈理', ('PRR_STRIPE_1ST', 'PRR_STRIPE_2ND'), STAGE_CHK1),
+    DefectCategory('edge_defect', 'コバスリ不良', ('PRR_EDGE_DEFECT',), STAGE_CHK1),
+    DefectCategory('wash_drop', '洗浄落下', ('PRR_WASH_DROP',), STAGE_CHK1),
+    DefectCategory('unknown', '不明', ('PRR_UNKNOWN',), STAGE_CHK1),
+    DefectCategory('other_1', 'その他', ('PRR_OTHER_1', 'PRR_OTHER_2', 'PRR_OTHER_3RD', 'PRR_OTHER_2ND', 'PRR_OTHER_1ST'), STAGE_CHK1),
+    DefectCategory('ecc_defect', '偏心不良', ('PRR_ECC_DEFECT', 'PRR_ECC_3RD', 'PRR_ECC_1ST'), STAGE_CHK1),
+    DefectCategory('drop', '落下', ('PRR_DROP',), STAGE_CHK1),
+    DefectCategory('count_err', '員数違い', ('PRR_COUNT_ERR',), STAGE_CHK1),
+    DefectCategory('suction', '吸い込み', ('PRR_SUCTION',), STAGE_CHK2),
+    DefectCategory('axis_def', '軸不良', ('PRR_AXIS_DEF',), STAGE_CHK3),
+    DefectCategory('color_def', 'カラー不良', ('PRR_COLOR_DEF',), STAGE_CHK3),
+    DefectCategory('trans_def', '透過率不良', ('PRR_TRANS_DEF',), STAGE_CHK3),
+    DefectCategory('curve_def', 'カーブ不良', ('PRR_CURVE_DEF',), STAGE_CHK3),
+    DefectCategory('cen_th_def', '中心厚不良', ('PRR_CEN_TH_DEF',), STAGE_CHK3),
+    DefectCategory('diam_def', '径不良', ('PRR_DIAM_DEF',), STAGE_CHK3),
+    DefectCategory('r1_th_def', 'R1厚み不良', ('PRR_R1_TH_DEF',), STAGE_CHK3),
+)
+
+# キー → カテゴリ
+DEFECT_CATEGORY_MAP = {category.key: category for category in DEFECT_CATEGORIES}
+
+# キー → 日本語ラベル（表示順）
+DEFECT_LABELS = {category.key: category.label for category in DEFECT_CATEGORIES}
+
+# 全カテゴリの集計元の列（合計不良数の算出に使用）
+DEFECT_COLUMNS = tuple(col for category in DEFECT_CATEGORIES for col in category.columns)
+
+
+# ==================== 集計式の生成 ====================
+#
+# 集計式はモデル（PrdRecordModel / PrdDailyAggModel）ごとに一度だけ生成して使い回す。
+# SQLAlchemyの式は不変なので、複数のクエリで共有しても問題ない。
+
+_expression_cache = {}
+
+
+def _column_sum(model, columns):
+    """列の合計式（col1 + col2 + ...）"""
+    expr = getattr(model, columns[0])
+    for col in columns[1:]:
+        expr = expr + getattr(model, col)
+    return expr
+
+
+def defect_sum_columns(model, keys=None):
+    """
+    不良カテゴリごとの集計列（func.sum(...).label(キー)）のリストを取得する
+
+    引数:
+        model: PrdRecordModel または PrdDailyAggModel
+        keys: 対象のカテゴリキー（省略時は全カテゴリ）
+    """
+    cache_key = ('categories', model, tuple(keys) if keys else None)
+    columns = _expression_cache.get(cache_key)
+    if columns is None:
+        categories = [DEFECT_CATEGORY_MAP[key] for key in keys] if keys else DEFECT_CATEGORIES
+        columns = [
+            func.sum(_column_sum(model, category.columns)).label(category.key)
+            for category in categories
+        ]
+        _expression_cache[cache_key] = columns
+    return columns
+
+
+def total_defect_column(model):
+    """全不良項目の合計不良数の集計列（ラベル total_defect）を取得する"""
+    cache_key = ('total_defect', model)
+    column = _expression_cache.get(cache_key)
+    if column is None:
+        column = func.sum(_column_sum(model, DEFECT_COLUMNS)).label('total_defect')
+        _expression_cache[cache_key] = column
+    return column
+
+
+# ==================== 集計結果の変換 ====================
+
+def defect_counts(row, keys=None):
+    """集計結果の行から不良カテゴリごとの不良数を取得する（{キー: 不良数}）"""
+    return {
+        key: float(getattr(row, key) or 0)
+        for key in (keys or DEFECT_LABELS)
+    }
+
+
+def defect_rates(counts, total_inject, digits=2):
+    """不良数の辞書から不良率（%）の辞書を計算する（注入数が0の場合は0）"""
+    total_inject = float(total_inject or 0)
+    if total_inject <= 0:
+        return {key: 0 for key in counts}
+    return {
+        key: round(count / total_inject * 100, digits) if count else 0.0
+        for key, count in counts.items()
+    }
+
+
+class DefectMatrix:
+    """
+    不良集計結果の配列表現
+
+    集計行の不良数を「行 × 不良カテゴリ」の順に array('d') へ詰め、注入数も array('d') で保持する。
+    列は行ごとに getattr せず位置（itemgetter）でまとめて取り出し、不良率は行単位でまとめて計算する。
+    日別×モノマー種のように行数が多い集計で、行ごとに不良数・不良率の辞書を組み立てる処理を軽くする。
+
+    引数:
+        rows: 集計結果の行（query.all()。各不良カテゴリのキーと total_key のラベルを持つ）
+        keys: 対象のカテゴリキー（省略時は全カテゴリ）
+        total_key: 注入数の列のラベル
+    """
+
+    __slots__ = ('keys', 'counts', 'totals', '_width')
+
+    def __init__(self, rows, keys=None, total_key='total_inject'):
+        self.keys = tuple(keys or DEFECT_LABELS)
+        self._width = len(self.keys)
+        self.counts = array('d')
+        self.totals = array('d')
+        if not rows:
+            return
+
+        fields = rows[0]._fields
+        positions = [fields.index(key) for key in self.keys]
+        getter = itemgetter(*positions) if len(positions) > 1 else (lambda row: (row[positions[0]],))
+        total_position = fields.index(total_key)
+
+        counts = self.counts
+        totals = self.totals
+        for row in rows:
+            # NULL（None）は0として格納する
+            counts.fromlist([float(value) if value else 0.0 for value in getter(row)])
+            totals.append(float(row[total_position] or 0))
+
+    def __len__(self):
+        return len(self.totals)
+
+    def _slice(self, index):
+        start = index * self._width
+        return self.counts[start:start + self._width]
+
+    def row_counts(self, index):
+        """index行目の不良数（{キー: 不良数}。defect_counts と同じ形式）"""
+        return dict(zip(self.keys, self._slice(index)))
+
+    def row_total_defect(self, index):
+        """index行目の全カテゴリの不良数の合計"""
+        return sum(self._slice(index))
+
+    def row_rates(self, index, digits=2):
+        """index行目の不良率（%）（{キー: 不良率}。defect_rates と同じ値。注入数が0の場合は0）"""
+        total_inject = self.totals[index]
+        if total_inject <= 0:
+            return dict.fromkeys(self.keys, 0)
+        return dict(zip(self.keys, [
+            round(count / total_inject * 100, digits) if count else 0.0
+            for count in self._slice(index)
+        ]))
@@ -0,0 +1,427 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import db
+from .database import get_db_session
+from .settings_service import publish_data_generation
+from .utils import log_error
+
+# ==================== CSV取込ジョブ（IMP_JOB） ====================
+#
+# アップロード画面はCSVファイルを保存してジョブを登録するだけにし、
+# 取込はワーカープロセス（import_worker.py）が登録順に実行する。
+# 進捗（読込件数・登録件数・エラー）はIMP_JOBに書き込み、/api/import_jobs/<id> で参照する。
+
+# ジョブの状態
+JOB_QUEUED = 'queued'     # 待機中
+JOB_RUNNING = 'running'   # 実行中
+JOB_DONE = 'done'         # 完了
+JOB_FAILED = 'failed'     # エラー
+
+JOB_STATUS_LABELS = {
+    JOB_QUEUED: '待機中',
+    JOB_RUNNING: '実行中',
+    JOB_DONE: '完了',
+    JOB_FAILED: 'エラー',
+}
+
+# 実行中の進捗をIMP_JOBへ書き込む間隔（秒）
+IMPORT_PROGRESS_INTERVAL = float(os.getenv('IMPORT_PROGRESS_INTERVAL', 2))
+
+# ワーカーがキューを確認する間隔（秒）
+IMPORT_WORKER_POLL_INTERVAL = float(os.getenv('IMPORT_WORKER_POLL_INTERVAL', 5))
+
+# ワーカー起動時に待機中へ戻す実行中ジョブの経過時間（秒）。
+# ワーカーが1つの場合は0（実行中のまま残ったジョブをすべて戻す）。複数起動する場合は最長の取込時間より長くする
+IMPORT_STALE_JOB_TIMEOUT = float(os.getenv('IMPORT_STALE_JOB_TIMEOUT', 0))
+
+CREATE_IMP_JOB_SQL = """
+    CREATE TABLE IF NOT EXISTS IMP_JOB (
+        IMJ_ID int NOT NULL AUTO_INCREMENT COMMENT 'ジョブID',
+        IMJ_KIND varchar(20) NOT NULL COMMENT '取込種類',
+        IMJ_STATUS varchar(10) NOT NULL COMMENT '状態(queued/running/done/failed)',
+        IMJ_FILE_PATH varchar(255) NOT NULL COMMENT '保存したCSVファイルのパス',
+        IMJ_FILE_NM varchar(255) COMMENT 'アップロード時のファイル名',
+        IMJ_ENCODING varchar(20) COMMENT '文字コード',
+        IMJ_USER varchar(20) COMMENT '登録ユーザー',
+        IMJ_STAGE varchar(20) COMMENT '処理段階',
+        IMJ_READ_ROWS int COMMENT '読込件数',
+        IMJ_WRITTEN_ROWS int COMMENT '登録件数',
+        IMJ_SKIPPED_ROWS int COMMENT 'スキップ件数',
+        IMJ_MESSAGE text COMMENT '結果メッセージ・エラー内容',
+        IMJ_CREATED_DT datetime COMMENT '登録日時',
+        IMJ_STARTED_DT datetime COMMENT '開始日時',
+        IMJ_FINISHED_DT datetime COMMENT '終了日時',
+        PRIMARY KEY (IMJ_ID),
+        KEY IX_IMJ_STATUS (IMJ_STATUS, IMJ_ID)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='CSV取込ジョブ'
+"""
+
+
+class ImportJobModel(db.Model):
+    """CSV取込ジョブテーブルのSQLAlchemyモデル"""
+    __tablename__ = 'IMP_JOB'
+
+    IMJ_ID = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='ジョブID')
+    IMJ_KIND = db.Column(db.String(20), nullable=False, comment='取込種類')
+    IMJ_STATUS = db.Column(db.String(10), nullable=False, comment='状態')
+    IMJ_FILE_PATH = db.Column(db.String(255), nullable=False, comment='保存したCSVファイルのパス')
+    IMJ_FILE_NM = db.Column(db.String(255), comment='アップロード時のファイル名')
+    IMJ_ENCODING = db.Column(db.String(20), comment='文字コード')
+    IMJ_USER = db.Column(db.String(20), comment='登録ユーザー')
+    IMJ_STAGE = db.Column(db.String(20), comment='処理段階')
+    IMJ_READ_ROWS = db.Column(db.Integer, comment='読込件数')
+    IMJ_WRITTEN_ROWS = db.Column(db.Integer, comment='登録件数')
+    IMJ_SKIPPED_ROWS = db.Column(db.Integer, comment='スキップ件数')
+    IMJ_MESSAGE = db.Column(db.Text, comment='結果メッセージ・エラー内容')
+    IMJ_CREATED_DT = db.Column(db.DateTime, comment='登録日時')
+    IMJ_STARTED_DT = db.Column(db.DateTime, comment='開始日時')
+    IMJ_FINISHED_DT = db.Column(db.DateTime, comment='終了日時')
+
+    def to_dict(self):
+        """ステータスAPI用の辞書に変換（処理速度は登録件数 / 経過秒数）"""
+        elapsed = None
+        if self.IMJ_STARTED_DT:
+            end = self.IMJ_FINISHED_DT or datetime.now()
+            elapsed = max((end - self.IMJ_STARTED_DT).total_seconds(), 0)
+
+        rows_per_sec = None
+        if elapsed and self.IMJ_WRITTEN_ROWS is not None:
+            rows_per_sec = round(self.IMJ_WRITTEN_ROWS / elapsed, 1)
+
+        def fmt(dt):
+            return dt.strftime('%Y/%m/%d %H:%M:%S') if dt else None
+
+        return {
+            'id': self.IMJ_ID,
+            'kind': self.IMJ_KIND,
+            'kind_label': IMPORT_KIND_LABELS.get(self.IMJ_KIND, self.IMJ_KIND),
+            'file_name': self.IMJ_FILE_NM,
+            'status': self.IMJ_STATUS,
+            'status_label': JOB_STATUS_LABELS.get(self.IMJ_STATUS, self.IMJ_STATUS),
+            'stage': self.IMJ_STAGE,
+            'rows_parsed': self.IMJ_READ_ROWS,
+            'rows_written': self.IMJ_WRITTEN_ROWS,
+            'rows_skipped': self.IMJ_SKIPPED_ROWS,
+            'errors': self.IMJ_MESSAGE if self.IMJ_STATUS == JOB_FAILED else None,
+            'message': self.IMJ_MESSAGE,
+            'elapsed_sec': round(elapsed, 1) if elapsed is not None else None,
+            'rows_per_sec': rows_per_sec,
+            'created_at': fmt(self.IMJ_CREATED_DT),
+            'started_at': fmt(self.IMJ_STARTED_DT),
+            'finished_at': fmt(self.IMJ_FINISHED_DT),
+        }
+
+
+# ==================== 取込種類 ====================
+
+# 取込種類 → 表示名
+IMPORT_KIND_LABELS = {
+    'prd': '生産実績',
+    'prd_process': '生産実績（工程日付）',
+    'sji': '指示データ',
+    'fmc': '膜カット',
+    'fmp': '膜加工',
+    'prd_mst': '製品マスタ',
+    'spc': 'スピンコート',
+    'hdc': 'ハードコート',
+}
+
+
+def _get_importer(kind):
+    """
+    取込種類から取込関数を取得する
+
+    戻り値:
+        取込関数。進捗の辞書（progress）を受け取り、(成否, メッセージ) を返す。
+    """
+    from .models import PrdRecord, SjiDatModel
+    from .master_models import PrdMstModel
+    from .ishida_models import FmcDat, FmpDat, SpcDat, HdcDat
+
+    importers = {
+        'prd': PrdRecord.import_from_csv,
+        'prd_process': PrdRecord.import_from_csv2,
+        'sji': SjiDatModel.import_from_csv,
+        'fmc': FmcDat.import_from_csv,
+        'fmp': FmpDat.import_from_csv,
+        'prd_mst': PrdMstModel.import_from_csv,
+        'spc': SpcDat.import_from_csv,
+        'hdc': HdcDat.import_from_csv,
+    }
+    return importers[kind]
+
+
+# ==================== ジョブの登録・参照 ====================
+
+def _job_dir():
+    """取込待ちのCSVファイルの保存先（UPLOAD_DIR/import_jobs）"""
+    path = os.path.join(os.path.abspath(current_app.config['UPLOAD_DIR']), 'import_jobs')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def enqueue_import(kind, file, user_id=None, encoding='shift_jis'):
+    """
+    アップロードされたCSVファイルを保存し、取込ジョブを登録する
+
+    Parameters:
+        kind (str): 取込種類（IMPORT_KIND_LABELSのキー）
+        file: アップロードされたファイル（werkzeugのFileStorage）
+        user_id (str): 登録ユーザー
+        encoding (str): CSVの文字コード
+
+    Returns:
+        int: ジョブID
+    """
+    if kind not in IMPORT_KIND_LABELS:
+        raise ValueError(f'不明な取込種類です: {kind}')
+
+    file_path = os.path.join(_job_dir(), f'{uuid.uuid4().hex}.csv')
+    file.save(file_path)
+
+    session = get_db_session()
+    try:
+        job = ImportJobModel(
+            IMJ_KIND=kind,
+            IMJ_STATUS=JOB_QUEUED,
+            IMJ_FILE_PATH=file_path,
+            IMJ_FILE_NM=file.filename,
+            IMJ_ENCODING=encoding,
+            IMJ_USER=user_id,
+            IMJ_CREATED_DT=datetime.now(),
+        )
+        session.add(job)
+        session.commit()
+        return job.IMJ_ID
+    except Exception as e:
+        session.rollback()
+        log_error(f'取込ジョブの登録中にエラーが発生しました: {str(e)}')
+        _remove_file(file_path)
+        raise
+    finally:
+        session.close()
+
+
+def get_import_job(job_id):
+    """ジョブの状態を辞書で取得（存在しない場合はNone）"""
+    session = get_db_session()
+    if not session:
+        return None
+    try:
+        job = session.get(ImportJobModel, job_id)
+        return job.to_dict() if job else None
+    except Exception as e:
+        log_error(f'取込ジョブの取得中にエラーが発生しました: {str(e)}')
+        return None
+    finally:
+        session.close()
+
+
+def _remove_file(file_path):
+    """取込済みのCSVファイルを削除"""
+    try:
+        os.unlink(file_path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log_error(f'取込ファイルの削除中にエラーが発生しました: {str(e)}')
+
+
+# ==================== ワーカー ====================
+
+def claim_next_job():
+    """
+    待機中のジョブを登録順に1件取得し、実行中にする
+
+    状態がqueuedのままの場合のみ更新するため、ワーカーを複数起動しても
+    同じジョブを二重に実行しない。
+
+    戻り値:
+        ImportJobModel: 取得したジョブ（セッションから切り離し済み）。待機中のジョブがなければNone
+    """
+    session = get_db_session()
+    try:
+        job_ids = [row[0] for row in session.query(ImportJobModel.IMJ_ID).filter(
+            ImportJobModel.IMJ_STATUS == JOB_QUEUED
+        ).order_by(ImportJobModel.IMJ_ID).limit(10)]
+
+        for job_id in job_ids:
+            claimed = session.execute(text("""
+                UPDATE IMP_JOB
+                SET IMJ_STATUS = :running, IMJ_STARTED_DT = :started_dt, IMJ_STAGE = '読込'
+                WHERE IMJ_ID = :job_id AND IMJ_STATUS = :queued
+            """), {
+                'running': JOB_RUNNING,
+                'queued': JOB_QUEUED,
+                'started_dt': datetime.now(),
+                'job_id': job_id,
+            }).rowcount
+            session.commit()
+            if claimed == 1:
+                job = session.get(ImportJobModel, job_id)
+                session.expunge(job)
+                return job
+        return None
+    except Exception as e:
+        session.rollback()
+        log_error(f'取込ジョブの取得中にエラーが発生しました: {str(e)}')
+        return None
+    finally:
+        session.close()
+
+
+def requeue_stale_jobs(timeout=IMPORT_STALE_JOB_TIMEOUT):
+    """
+    実行中のまま残ったジョブを待機中に戻す（ワーカーの起動時に呼び出す）
+
+    ワーカーが取込中に異常終了するとジョブは実行中のまま残るため、
+    開始からtimeout秒以上経過したジョブを再実行の対象にする。
+    CSVファイルが残っていないジョブはエラーにする。
+
+    戻り値:
+        int: 待機中に戻したジョブ数
+    """
+    session = get_db_session()
+    try:
+        started_before = datetime.now() - timedelta(seconds=timeout)
+        jobs = session.query(ImportJobModel).filter(
+            ImportJobModel.IMJ_STATUS == JOB_RUNNING,
+            ImportJobModel.IMJ_STARTED_DT <= started_before
+        ).all()
+
+        requeued = 0
+        for job in jobs:
+            if os.path.exists(job.IMJ_FILE_PATH):
+                job.IMJ_STATUS = JOB_QUEUED
+                job.IMJ_STAGE = None
+                job.IMJ_STARTED_DT = None
+                requeued += 1
+            else:
+                job.IMJ_STATUS = JOB_FAILED
+                job.IMJ_FINISHED_DT = datetime.now()
+                job.IMJ_MESSAGE = '取込中にワーカーが停止し、取込ファイルが見つかりません'
+        session.commit()
+
+        if jobs:
+            log_error(f'実行中のまま残った取込ジョブを{requeued}件待機中に戻しました（対象: {len(jobs)}件）')
+        return requeued
+    except Exception as e:
+        session.rollback()
+        log_error(f'取込ジョブの再登録中にエラーが発生しました: {str(e)}')
+        return 0
+    finally:
+        session.close()
+
+
+def _update_job(job_id, **values):
+    """ジョブの列を更新する"""
+    session = get_db_session()
+    try:
+        session.query(ImportJobModel).filter(ImportJobModel.IMJ_ID == job_id).update(values)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        log_error(f'取込ジョブ(ID:{job_id})の更新中にエラーが発生しました: {str(e)}')
+    finally:
+        session.close()
+
+
+def _progress_values(progress):
+    """進捗の辞書（new_import_progress()）からIMP_JOBの更新値を作成"""
+    return {
+        'IMJ_STAGE': progress['stage'],
+        'IMJ_READ_ROWS': progress['read_rows'],
+        'IMJ_WRITTEN_ROWS': progress['written_rows'],
+        'IMJ_SKIPPED_ROWS': progress['skipped_rows'],
+    }
+
+
+def run_import_job(app, job):
+    """
+    ジョブを1件実行する
+
+    取込は別スレッドで実行し、IMPORT_PROGRESS_INTERVAL秒ごとに進捗をIMP_JOBへ書き込む。
+    終了後は結果を記録し、保存したCSVファイルを削除する。
+    """
+    from .models import new_import_progress
+
+    result = {'success': False, 'message': None}
+
+    try:
+        importer = _get_importer(job.IMJ_KIND)
+    except KeyError:
+        _update_job(job.IMJ_ID, IMJ_STATUS=JOB_FAILED, IMJ_FINISHED_DT=datetime.now(),
+                    IMJ_MESSAGE=f'不明な取込種類です: {job.IMJ_KIND}')
+        _remove_file(job.IMJ_FILE_PATH)
+        return False
+
+    progress = new_import_progress()
+    kwargs = {'encoding': job.IMJ_ENCODING or 'shift_jis', 'progress': progress}
+
+    def target():
+        with app.app_context():
+            try:
+                result['success'], result['message'] = importer(job.IMJ_FILE_PATH, **kwargs)
+            except Exception as e:
+                log_error(f'取込ジョブ(ID:{job.IMJ_ID})の実行中にエラーが発生しました: {str(e)}')
+                result['message'] = str(e)
+
+    started = time.perf_counter()
+    thread = threading.Thread(target=target, name=f'import-job-{job.IMJ_ID}', daemon=True)
+    thread.start()
+    while True:
+        thread.join(IMPORT_PROGRESS_INTERVAL)
+        if not thread.is_alive():
+            break
+        _update_job(job.IMJ_ID, **_progress_values(progress))
+
+    values = _progress_values(progress)
+    values.update({
+        'IMJ_STATUS': JOB_DONE if result['success'] else JOB_FAILED,
+        'IMJ_MESSAGE': result['message'],
+        'IMJ_FINISHED_DT': datetime.now(),
+    })
+    _update_job(job.IMJ_ID, **values)
+    _remove_file(job.IMJ_FILE_PATH)
+
+    if result['success']:
+        # 取込での応答・マスタキャッシュの無効化はこのプロセス内でしか効かないため、
+        # 共有のデータ世代を進めてWebのプロセスへ伝える
+        publish_data_generation()
+
+    log_error(
+        f'取込ジョブ(ID:{job.IMJ_ID}, {job.IMJ_KIND})終了: '
+        f'{"完了" if result["success"] else "エラー"} {time.perf_counter() - started:.2f}秒'
+    )
+    return result['success']
+
+
+def run_worker(app, once=False, poll_interval=IMPORT_WORKER_POLL_INTERVAL):
+    """
+    取込ジョブを登録順に実行し続ける
+
+    once=Trueの場合は待機中のジョブがなくなった時点で終了する（cronからの定期実行用）。
+    開始時に、前回のワーカーの停止で実行中のまま残ったジョブを待機中に戻す。
+
+    戻り値:
+        int: 実行したジョブ数
+    """
+    processed = 0
+    with app.app_context():
+        requeue_stale_jobs()
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    return processed
+                time.sleep(poll_interval)
+                continue
+            run_import_job(app, job)
+            processed += 1
@@ -8,6 +8,8 @@ from app.ishida_models import FmpDat, FngDat
 from .master_models import KbnMst
 from .models import db
 from .utils import log_error
+from .date_range import date_range, group_by_month
+from .response_cache import cached_response, invalidate_response_cache
 from flask_login import login_required
 from sqlalchemy import   func
 
@@ -127,6 +129,7 @@ def color_trans_defects_input():
                 db.session.add(fng_dat)
 
             db.session.commit()
+            invalidate_response_cache()
             flash('データを保存しました')
             return redirect(url_for('ishida1.color_trans_defects'))
 
@@ -155,6 +158,7 @@ def color_trans_defects_slide():
     return render_template('color_trans_defects_slide.html')
 
 @ishida1.route('/api/color_trans_defects_slide')
+@cached_response
 def api_color_trans_defects_slide():
     """カラー不良・透過率不良データのAPI"""
     try:
@@ -399,16 +403,13 @@ def api_fmp_defect_monthly_data():
         
         # 月別集計のクエリビルド
         query = db.session.query(
-            func.date_format(FmpDat.FMP_INSP_DATE, '%Y-%m').label('month'),
+            FmpDat.FMP_INSP_DATE.label('day'),
             *[func.sum(getattr(FmpDat, k)).label(k) for k in primary_keys + secondary_keys],
             func.sum(FmpDat.FMP_PROC_SHTS).label('total_sheets'),
             func.sum(FmpDat.FMP_PRM_GOOD_QTY).label('total_primary_good')
         )
         
-        if start_date:
-            query = query.filter(FmpDat.FMP_INSP_DATE >= start_date)
-        if end_date:
-            query = query.filter(FmpDat.FMP_INSP_DATE <= end_date)
+        query = query.filter(*date_range(FmpDat.FMP_INSP_DATE, start_date, end_date))
         if color:
             query = query.filter(FmpDat.FMP_COLOR == color)
         if film_curve:
@@ -416,10 +417,10 @@ def api_fmp_defect_monthly_data():
         if pva_lot_no:
             query = query.filter(FmpDat.FMP_PVA_LOT_NO == pva_lot_no)
             
-        query = query.group_by(func.date_format(FmpDat.FMP_INSP_DATE, '%Y-%m'))
-        query = query.order_by(func.date_format(FmpDat.FMP_INSP_DATE, '%Y-%m'))
+        query = query.group_by(FmpDat.FMP_INSP_DATE)
+        query = query.order_by(FmpDat.FMP_INSP_DATE)
         
-        results = query.all()
+        results = group_by_month(query.all(), 'day')
 
         # データ整形
         months = []
@@ -4,13 +4,15 @@ from datetime import datetime, timedelta
 import locale
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app as app, jsonify
 
-from .models import db, SetMst
+from .models import db
 
 from .utils import log_error
+from .date_range import date_range, group_by_month
+from .response_cache import cached_response
+from .settings_service import get_settings
+from .import_jobs import enqueue_import
 from app.ishida_models import HdcDat, SpcDat
-import tempfile
-import os
-from flask_login import login_required
+from flask_login import login_required, current_user
 from sqlalchemy import func
 
 ishida2 = Blueprint('ishida2', __name__)
@@ -31,22 +33,10 @@ def import_spc():
             return redirect(request.url)
         if file:
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    file.save(temp_path)
-                try:
-                    success, message = SpcDat.import_from_csv(temp_path, encoding='shift_jis')
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                finally:
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('spc', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
@@ -69,22 +59,10 @@ def import_hdc():
             return redirect(request.url)
         if file:
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    file.save(temp_path)
-                try:
-                    success, message = HdcDat.import_from_csv(temp_path, encoding='shift_jis')
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                finally:
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('hdc', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
@@ -689,16 +667,13 @@ def api_hdc_defect_monthly_data():
     try:
         # クエリの構築
         query = db.session.query(
-            func.date_format(HdcDat.HDC_COAT_DATE, '%Y-%m').label('month'),
+            HdcDat.HDC_COAT_DATE.label('day'),
             *[func.sum(getattr(HdcDat, k)).label(k) for k in defect_keys],
             func.sum(HdcDat.HDC_COAT_CNT).label('total_cnt')
         )
         
         # フィルター適用
-        if start_date:
-            query = query.filter(HdcDat.HDC_COAT_DATE >= start_date)
-        if end_date:
-            query = query.filter(HdcDat.HDC_COAT_DATE <= end_date)
+        query = query.filter(*date_range(HdcDat.HDC_COAT_DATE, start_date, end_date))
         if ct_type:
             query = query.filter(HdcDat.HDC_TYPE == ct_type)
         if color:
@@ -707,11 +682,11 @@ def api_hdc_defect_monthly_data():
         # 種類5を除外
         query = query.filter(HdcDat.HDC_TYPE != 5)
         
-        # 月別グループ化とソート
-        query = query.group_by(func.date_format(HdcDat.HDC_COAT_DATE, '%Y-%m'))
-        query = query.order_by(func.date_format(HdcDat.HDC_COAT_DATE, '%Y-%m'))
+        # 日付列のままグループ化し（インデックス順）、月ごとにまとめる
+        query = query.group_by(HdcDat.HDC_COAT_DATE)
+        query = query.order_by(HdcDat.HDC_COAT_DATE)
         
-        results = query.all()
+        results = group_by_month(query.all(), 'day')
         
         # データ整形
         months = []
@@ -783,17 +758,14 @@ def api_spc_defect_monthly_data():
     try:
         # クエリの構築
         query = db.session.query(
-            func.date_format(SpcDat.SPC_COAT_DATE, '%Y-%m').label('month'),
+            SpcDat.SPC_COAT_DATE.label('day'),
             *[func.sum(getattr(SpcDat, k)).label(k) for k in pre_keys + pst_keys],
             func.sum(SpcDat.SPC_SHEETS).label('total_sheets'),
             func.sum(SpcDat.SPC_PRE_GOOD_QTY).label('total_pre_good')
         )
         
         # フィルター適用
-        if start_date:
-            query = query.filter(SpcDat.SPC_COAT_DATE >= start_date)
-        if end_date:
-            query = query.filter(SpcDat.SPC_COAT_DATE <= end_date)
+        query = query.filter(*date_range(SpcDat.SPC_COAT_DATE, start_date, end_date))
         if ct_type:
             query = query.filter(SpcDat.SPC_TYPE == ct_type)
         if color:
@@ -802,11 +774,11 @@ def api_spc_defect_monthly_data():
         # 種類4を除外
         query = query.filter(SpcDat.SPC_TYPE != 4)
         
-        # 月別グループ化とソート
-        query = query.group_by(func.date_format(SpcDat.SPC_COAT_DATE, '%Y-%m'))
-        query = query.order_by(func.date_format(SpcDat.SPC_COAT_DATE, '%Y-%m'))
+        # 日付列のままグループ化し（インデックス順）、月ごとにまとめる
+        query = query.group_by(SpcDat.SPC_COAT_DATE)
+        query = query.order_by(SpcDat.SPC_COAT_DATE)
         
-        results = query.all()
+        results = group_by_month(query.all(), 'day')
         
         # データ整形
         months = []
@@ -857,11 +829,12 @@ def api_spc_defect_monthly_data():
 
 @ishida2.route('/api/hdc_spc_slide')
 @login_required
+@cached_response
 def api_hdc_spc_slide():
     """ハードコートスピンコートスライダーのデータを取得するAPI"""
     try:
         
-        setmst = SetMst.query.first()
+        setmst = get_settings()
         infoData = {
             'SET_INFO_H1': setmst.SET_INFO_H1 or '',
             'SET_INFO_1': setmst.SET_INFO_1 or '',
@@ -1,25 +1,165 @@
 from sqlalchemy import text
 from sqlalchemy.orm import declarative_base
 from datetime import datetime, timedelta
-import logging
 import csv
+import os
 from app import db
 
-from app.models import PrdRecordModel, get_db_session, parse_date, str_to_flt
+from app.models import PrdRecordModel, get_db_session, parse_date, str_to_flt, new_import_progress
 from .master_models import PrdMstModel
 from .utils import log_error
-
-# ロギング設定
-logging.basicConfig(
-    filename='app.log',
-    level=logging.ERROR,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+from .response_cache import invalidate_response_cache
 
 Base = declarative_base()
 
 
+def _daily_totals(model, date_column, sum_columns, group_column=None, filters=()):
+    """
+    日付（＋グループ列）ごとに列の合計をSQLで集計する
+
+    行を読み込まずにGROUP BYで集計するため、期間の長さによらずメモリ使用量は集計結果の件数分のみ。
+
+    Parameters:
+        model: 集計対象のモデル
+        date_column: 日付で集計する日時列（NULLの行は除外）
+        sum_columns (list): 合計する列名のリスト
+        group_column: 日付の前に集計するグループ列（回数など）
+        filters (list): 追加の検索条件
+
+    Returns:
+        list: [(日付文字列, グループ値, {列名: 合計}), ...]
+    """
+    from sqlalchemy import func
+    agg_date = func.date(date_column, type_=db.Date)
+    group_by = [agg_date] if group_column is None else [group_column, agg_date]
+    entities = [agg_date.label('agg_date')]
+    if group_column is not None:
+        entities.append(group_column.label('agg_group'))
+    entities += [func.sum(getattr(model, col)).label(col) for col in sum_columns]
+
+    rows = db.session.query(*entities).filter(
+        date_column.isnot(None), *filters
+    ).group_by(*group_by).order_by(*group_by).all()
+
+    return [
+        (
+            row.agg_date.strftime('%Y-%m-%d'),
+            row.agg_group if group_column is not None else None,
+            {col: getattr(row, col) if getattr(row, col) is not None else 0 for col in sum_columns}
+        )
+        for row in rows
+    ]
+
+
+# CSV取込の一括登録件数（1回のINSERT/UPDATE・コミットの単位）
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 1000))
+
+
+def _natural_key_value(column, value):
+    """自然キーの比較用に値を正規化する（DBに保存・比較される型に合わせる）"""
+    if value is None:
+        return None
+    if isinstance(column.type, db.String):
+        return str(value).rstrip()
+    if isinstance(column.type, (db.Numeric, db.Integer)):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+    if isinstance(column.type, db.DateTime) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _upsert_by_natural_key(session, model, key_columns, date_column, rows, chunk_size=IMPORT_CHUNK_SIZE,
+                           progress=None):
+    """
+    自然キー（複数列の一致）で既存データを判定し、INSERT/UPDATEを一括で行う
+
+    取込ファイルの日付範囲にある既存データのキーを1回のクエリで取得し、
+    新規行は一括INSERT、既存行は主キー指定の一括UPDATEでchunk_size件ずつコミットする。
+    同じキーの行がファイル内に複数ある場合は後の行の値で登録する。
+    チャンクの登録に失敗した場合は、そのチャンクを1行ずつ登録し直してエラー行を特定する。
+
+    Parameters:
+        session: DBセッション
+        model: 登録先のモデル
+        key_columns (list): 自然キーの列名
+        date_column (str): 既存キーの取得範囲に使う日付列名（自然キーに含まれること）
+        rows (list): [(行番号, {列名: 値}), ...]（ファイルの順）
+        chunk_size (int): 1回に登録する件数
+        progress (dict): 進捗カウンタ（new_import_progress()）。チャンクごとに登録件数を加算する
+
+    Returns:
+        list: エラーメッセージのリスト
+    """
+    from sqlalchemy import insert, or_, update
+    if progress is None:
+        progress = new_import_progress()
+    progress['stage'] = '登録'
+    if not rows:
+        return []
+
+    columns = [model.__table__.columns[col] for col in key_columns]
+    pk_attr = getattr(model, model.__mapper__.primary_key[0].key)
+
+    def make_key(values):
+        return tuple(_natural_key_value(col, values[col.key]) for col in columns)
+
+    # 取込ファイルの日付範囲にある既存データのキーを取得
+    date_attr = getattr(model, date_column)
+    dates = [values[date_column] for _, values in rows]
+    known_dates = [d for d in dates if d is not None]
+    date_conds = []
+    if known_dates:
+        date_conds.append(date_attr.between(min(known_dates), max(known_dates)))
+    if len(known_dates) < len(dates):
+        date_conds.append(date_attr.is_(None))
+
+    existing = {}
+    query = session.query(pk_attr, *[getattr(model, col) for col in key_columns]).filter(
+        or_(*date_conds)
+    ).order_by(pk_attr)
+    for row in query:
+        # 同じキーの既存データが複数ある場合は最初の1件を更新対象とする
+        existing.setdefault(make_key(row._mapping), row[0])
+
+    # 新規・更新に振り分け
+    inserts = {}
+    updates = {}
+    for row_number, values in rows:
+        key = make_key(values)
+        pk = existing.get(key)
+        if pk is None:
+            inserts[key] = (row_number, values)
+        else:
+            updates[pk] = (row_number, {pk_attr.key: pk, **values})
+    # ファイル内で同じキーの行は後の行にまとめたため、登録件数に含める（結果メッセージの件数と合わせる）
+    progress['written_rows'] += len(rows) - len(inserts) - len(updates)
+
+    errors = []
+    for stmt, batch in ((insert(model), list(inserts.values())), (update(model), list(updates.values()))):
+        for i in range(0, len(batch), chunk_size):
+            chunk = batch[i:i + chunk_size]
+            try:
+                session.execute(stmt, [values for _, values in chunk])
+                session.commit()
+                progress['written_rows'] += len(chunk)
+            except Exception:
+                session.rollback()
+                for row_number, values in chunk:
+                    try:
+                        session.execute(stmt, [values])
+                        session.commit()
+                        progress['written_rows'] += 1
+                    except Exception as e:
+                        session.rollback()
+                        errors.append(f"行 {row_number}: {str(e)}")
+                        progress['skipped_rows'] += 1
+            progress['chunks'] += 1
+    return errors
+
+
     
 class FmcDat(db.Model):
     __tablename__ = 'FMC_DAT'
@@ -57,9 +197,22 @@ class FmcDat(db.Model):
     FMC_PASS_QTY = db.Column(db.Numeric(4), comment='合格数')
     FMC_MONTH = db.Column(db.Numeric(2), comment='月')
     
+    # 取込時に同一データと判定する列（自然キー）
+    NATURAL_KEY_COLUMNS = [
+        'FMC_CUT_DATE', 'FMC_R1_INJ_DATE', 'FMC_MONOMER', 'FMC_ANNEAL_NO', 'FMC_CUT_MACH_NO',
+        'FMC_ITEM', 'FMC_CUT_MENU', 'FMC_FILM_PROC_DT', 'FMC_CR_FILM', 'FMC_HEAT_PROC_DT',
+        'FMC_FILM_CURVE', 'FMC_COLOR'
+    ]
+
     @staticmethod
-    def import_from_csv(file_path, encoding='shift_jis'):
-        """CSVファイルから膜カットデータをインポート"""
+    def import_from_csv(file_path, encoding='shift_jis', progress=None):
+        """
+        CSVファイルから膜カットデータをインポート
+
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
+        if progress is None:
+            progress = new_import_progress()
         session = None
         try:
             session = get_db_session()
@@ -113,8 +266,8 @@ class FmcDat(db.Model):
             log_error(f'読み取り開始')
             
             # CSVファイルを読み込みながら処理
-            records = []
             error_rows = []
+            rows = []
             row_number = 0
             
             import codecs
@@ -124,6 +277,7 @@ class FmcDat(db.Model):
                 
                 for row in reader:
                     row_number += 1
+                    progress['read_rows'] = row_number
                     try:
                         # 行が空でないことを確認
                         if not row or len(row) < 30:  # 必要な列数
@@ -186,32 +340,18 @@ class FmcDat(db.Model):
                         edit_row['FMC_PASS_QTY'] = str_to_flt(row[28])
                         edit_row['FMC_MONTH'] = str_to_flt(row[29].replace('月', ''))
                         
-                        existing = session.query(FmcDat).filter(
-                            FmcDat.FMC_CUT_DATE == edit_row['FMC_CUT_DATE'],
-                            FmcDat.FMC_R1_INJ_DATE == edit_row['FMC_R1_INJ_DATE'],
-                            FmcDat.FMC_MONOMER == edit_row['FMC_MONOMER'],
-                            FmcDat.FMC_ANNEAL_NO == edit_row['FMC_ANNEAL_NO'],
-                            FmcDat.FMC_CUT_MACH_NO == edit_row['FMC_CUT_MACH_NO'],
-                            FmcDat.FMC_ITEM == edit_row['FMC_ITEM'],
-                            FmcDat.FMC_CUT_MENU == edit_row['FMC_CUT_MENU'],
-                            FmcDat.FMC_FILM_PROC_DT == edit_row['FMC_FILM_PROC_DT'],
-                            FmcDat.FMC_CR_FILM == edit_row['FMC_CR_FILM'],
-                            FmcDat.FMC_HEAT_PROC_DT == edit_row['FMC_HEAT_PROC_DT'],
-                            FmcDat.FMC_FILM_CURVE == edit_row['FMC_FILM_CURVE'],
-                            FmcDat.FMC_COLOR == edit_row['FMC_COLOR']
-                        ).first()
-                        if existing:
-                            for k, v in edit_row.items():
-                                setattr(existing, k, v)
-                        else:
-                            session.add(FmcDat(**edit_row))
-                        session.commit()
-                        records.append(edit_row)
+                        # 自然キーでの登録は読み込み後にまとめて行う
+                        rows.append((row_number, edit_row))
                         
                     except Exception as e:
-                        session.rollback()
                         error_rows.append(f"行 {row_number}: {str(e)}")
                         continue
+            # 読み込んだ行を自然キーで一括登録
+            progress['skipped_rows'] = row_number - len(rows)
+            error_rows += _upsert_by_natural_key(
+                session, FmcDat, FmcDat.NATURAL_KEY_COLUMNS, 'FMC_CUT_DATE', rows, progress=progress
+            )
+            progress['stage'] = '完了'
             if error_rows:
                 log_error("以下の行でエラーが発生しました:")
                 for error in error_rows:
@@ -669,6 +809,55 @@ class FmpDat(db.Model):
     FMP_GRADE_B = db.Column(db.DECIMAL(5), comment='B品')
     FMP_GRADE_C = db.Column(db.DECIMAL(5), comment='C品')
 
+    # 一次検査の不良項目（加工枚数を分母）
+    PRIMARY_DEFECT_COLUMNS = {
+        'シワA': 'FMP_WRINKLE_A',
+        'シワB': 'FMP_WRINKLE_B',
+        '裂け': 'FMP_TEAR',
+        'ブツ': 'FMP_FOREIGN',
+        '繊維': 'FMP_FIBER',
+        'キズ': 'FMP_SCRATCH',
+        '穴': 'FMP_HOLE',
+        'その他': 'FMP_PRM_OTHERS'
+    }
+
+    # 二次検査の不良項目（一次良品数を分母）
+    SECONDARY_DEFECT_COLUMNS = {
+        '色抜け': 'FMP_CLR_FADE',
+        '色ムラ': 'FMP_CLR_IRREG',
+        '染スジ': 'FMP_DYE_STREAK',
+        '汚れ': 'FMP_DIRT',
+        'その他': 'FMP_OTHERS'
+    }
+
+    # 等級
+    GRADE_COLUMNS = {
+        'A品': 'FMP_GRADE_A',
+        'B品': 'FMP_GRADE_B',
+        'C品': 'FMP_GRADE_C'
+    }
+
+    # 取込時に同一データと判定する列（自然キー）
+    NATURAL_KEY_COLUMNS = [
+        'FMP_INSP_DATE', 'FMP_PROC_DATE', 'FMP_COLOR', 'FMP_PVA_LOT_NO', 'FMP_BIKO',
+        'FMP_FILM_CURVE'
+    ]
+
+    @staticmethod
+    def _sum_columns():
+        """集計対象の列の合計式（ラベルは列名）"""
+        from sqlalchemy import func
+        columns = ['FMP_PROC_SHTS', 'FMP_PRM_GOOD_QTY']
+        columns += list(FmpDat.PRIMARY_DEFECT_COLUMNS.values())
+        columns += list(FmpDat.SECONDARY_DEFECT_COLUMNS.values())
+        columns += list(FmpDat.GRADE_COLUMNS.values())
+        return [func.sum(getattr(FmpDat, col)).label(col) for col in columns]
+
+    @staticmethod
+    def _row_totals(row):
+        """集計結果の行を{列名: 合計}に変換（対象行がない列は0）"""
+        return {key: value if value is not None else 0 for key, value in row._mapping.items()}
+
     @staticmethod
     def get_defect_analysis(start_date=None, end_date=None, proc_date=None,
                           color=None, pva_lot_no=None, film_curve=None):
@@ -703,11 +892,11 @@ class FmpDat(db.Model):
             if film_curve:
                 query = query.filter(FmpDat.FMP_FILM_CURVE == film_curve)
             
-            # データの集計
-            results = query.all()
+            # データの集計（SQLで合計のみ取得）
+            totals = FmpDat._row_totals(query.with_entities(*FmpDat._sum_columns()).one())
             
-            total_sheets = sum(r.FMP_PROC_SHTS for r in results)
-            primary_good = sum(r.FMP_PRM_GOOD_QTY for r in results)
+            total_sheets = totals['FMP_PROC_SHTS']
+            primary_good = totals['FMP_PRM_GOOD_QTY']
             
             if total_sheets == 0:
                 return {
@@ -721,14 +910,8 @@ class FmpDat(db.Model):
             
             # 一次検査の不良率計算（加工枚数を分母）
             primary_defect_rates = {
-                'シワA': sum(r.FMP_WRINKLE_A for r in results) / total_sheets * 100,
-                'シワB': sum(r.FMP_WRINKLE_B for r in results) / total_sheets * 100,
-                '裂け': sum(r.FMP_TEAR for r in results) / total_sheets * 100,
-                'ブツ': sum(r.FMP_FOREIGN for r in results) / total_sheets * 100,
-                '繊維': sum(r.FMP_FIBER for r in results) / total_sheets * 100,
-                'キズ': sum(r.FMP_SCRATCH for r in results) / total_sheets * 100,
-                '穴': sum(r.FMP_HOLE for r in results) / total_sheets * 100,
-                'その他': sum(r.FMP_PRM_OTHERS for r in results) / total_sheets * 100
+                name: totals[col] / total_sheets * 100
+                for name, col in FmpDat.PRIMARY_DEFECT_COLUMNS.items()
             }
             
             if primary_good == 0:
@@ -743,39 +926,23 @@ class FmpDat(db.Model):
             
             # 二次検査の不良率計算（一次良品数を分母）
             secondary_defect_rates = {
-                '色抜け': sum(r.FMP_CLR_FADE for r in results) / primary_good * 100,
-                '色ムラ': sum(r.FMP_CLR_IRREG for r in results) / primary_good * 100,
-                '染スジ': sum(r.FMP_DYE_STREAK for r in results) / primary_good * 100,
-                '汚れ': sum(r.FMP_DIRT for r in results) / primary_good * 100,
-                'その他': sum(r.FMP_OTHERS for r in results) / primary_good * 100
+                name: totals[col] / primary_good * 100
+                for name, col in FmpDat.SECONDARY_DEFECT_COLUMNS.items()
             }
             
             # 等級別情報の計算
-            total_graded = sum(
-                (r.FMP_GRADE_A or 0) + (r.FMP_GRADE_B or 0) + (r.FMP_GRADE_C or 0)
-                for r in results
-            )
+            total_graded = sum(totals[col] for col in FmpDat.GRADE_COLUMNS.values())
             
             grade_info = {
-                'A品': {
-                    'quantity': sum(r.FMP_GRADE_A or 0 for r in results),
-                    'rate': sum(r.FMP_GRADE_A or 0 for r in results) / total_graded * 100 if total_graded > 0 else 0
-                },
-                'B品': {
-                    'quantity': sum(r.FMP_GRADE_B or 0 for r in results),
-                    'rate': sum(r.FMP_GRADE_B or 0 for r in results) / total_graded * 100 if total_graded > 0 else 0
-                },
-                'C品': {
-                    'quantity': sum(r.FMP_GRADE_C or 0 for r in results),
-                    'rate': sum(r.FMP_GRADE_C or 0 for r in results) / total_graded * 100 if total_graded > 0 else 0
+                name: {
+                    'quantity': totals[col],
+                    'rate': totals[col] / total_graded * 100 if total_graded > 0 else 0
                 }
+                for name, col in FmpDat.GRADE_COLUMNS.items()
             }
             
             # 収率の計算（FMP_GRADE_A + FMP_GRADE_B + FMP_GRADE_C）/ FMP_PROC_SHTS
-            total_grade_a = sum(r.FMP_GRADE_A or 0 for r in results)
-            total_grade_b = sum(r.FMP_GRADE_B or 0 for r in results)
-            total_grade_c = sum(r.FMP_GRADE_C or 0 for r in results)
-            total_good = total_grade_a + total_grade_b + total_grade_c
+            total_good = total_graded
             good_rate = total_good / total_sheets * 100 if total_sheets > 0 else 0
             
             return {
@@ -792,65 +959,71 @@ class FmpDat(db.Model):
             return None
 
     @staticmethod
-    def get_recent_defect_trend(days=10):
+    def get_recent_defect_trend(days=10, fill_gaps=False):
         """
         直近の不良率推移データを取得するメソッド
         
+        期間全体を検査日ごとに1回のクエリで集計するため、日数によらずクエリ数は一定。
+        
         Parameters:
-            days (int): 取得する日数（デフォルト: 5日）
+            days (int): 取得する日数（デフォルト: 10日、当日を含む）
+            fill_gaps (bool): データのない日も空の不良率で含めるか
             
         Returns:
             list: 日付ごとの不良率データ
         """
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days-1)
+            from sqlalchemy import func
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            start_date = today - timedelta(days=days-1)
+            end_date = today + timedelta(days=1)
+            
+            # 検査日ごとの合計を取得
+            insp_date = func.date(FmpDat.FMP_INSP_DATE, type_=db.Date)
+            rows = db.session.query(
+                insp_date.label('insp_date'),
+                *FmpDat._sum_columns()
+            ).filter(
+                FmpDat.FMP_INSP_DATE >= start_date,
+                FmpDat.FMP_INSP_DATE < end_date
+            ).group_by(insp_date).all()
             
-            # 日付ごとのデータを取得
-            daily_data = []
-            current_date = start_date
+            daily_totals = {}
+            for row in rows:
+                totals = FmpDat._row_totals(row)
+                daily_totals[totals.pop('insp_date').strftime('%Y-%m-%d')] = totals
             
-            while current_date <= end_date:
-                next_date = current_date + timedelta(days=1)
-                
-                # その日のデータを取得
-                day_results = FmpDat.query.filter(
-                    FmpDat.FMP_INSP_DATE >= current_date,
-                    FmpDat.FMP_INSP_DATE < next_date
-                ).all()
+            # 期間内の日付ごとに不良率を計算
+            daily_data = []
+            for offset in range(days):
+                date_str = (start_date + timedelta(days=offset)).strftime('%Y-%m-%d')
+                totals = daily_totals.get(date_str)
+                total_sheets = totals['FMP_PROC_SHTS'] if totals else 0
                 
-                if day_results:
-                    total_sheets = sum(r.FMP_PROC_SHTS for r in day_results)
-                    primary_good = sum(r.FMP_PRM_GOOD_QTY for r in day_results)
+                if total_sheets > 0:
+                    primary_good = totals['FMP_PRM_GOOD_QTY']
                     
-                    if total_sheets > 0:
-                        # 一次検査の不良率
-                        primary_defect_rates = {
-                            'シワA': sum(r.FMP_WRINKLE_A for r in day_results) / total_sheets * 100,
-                            'シワB': sum(r.FMP_WRINKLE_B for r in day_results) / total_sheets * 100,
-                            '裂け': sum(r.FMP_TEAR for r in day_results) / total_sheets * 100,
-                            'ブツ': sum(r.FMP_FOREIGN for r in day_results) / total_sheets * 100,
-                            '繊維': sum(r.FMP_FIBER for r in day_results) / total_sheets * 100,
-                            'キズ': sum(r.FMP_SCRATCH for r in day_results) / total_sheets * 100,
-                            '穴': sum(r.FMP_HOLE for r in day_results) / total_sheets * 100,
-                            'その他': sum(r.FMP_PRM_OTHERS for r in day_results) / total_sheets * 100
-                        }
-                        
-                        # 二次検査の不良率（一次良品数が0の場合は0%）
-                        secondary_defect_rates = {
-                            '色抜け': sum(r.FMP_CLR_FADE for r in day_results) / primary_good * 100 if primary_good > 0 else 0,
-                            '色ムラ': sum(r.FMP_CLR_IRREG for r in day_results) / primary_good * 100 if primary_good > 0 else 0,
-                            '染スジ': sum(r.FMP_DYE_STREAK for r in day_results) / primary_good * 100 if primary_good > 0 else 0,
-                            '汚れ': sum(r.FMP_DIRT for r in day_results) / primary_good * 100 if primary_good > 0 else 0,
-                            'その他': sum(r.FMP_OTHERS for r in day_results) / primary_good * 100 if primary_good > 0 else 0
-                        }
-                        
-                        daily_data.append({
-                            'date': current_date.strftime('%Y-%m-%d'),
-                            'defect_rates': {**primary_defect_rates, **secondary_defect_rates}
-                        })
-                
-                current_date = next_date
+                    # 一次検査の不良率
+                    primary_defect_rates = {
+                        name: totals[col] / total_sheets * 100
+                        for name, col in FmpDat.PRIMARY_DEFECT_COLUMNS.items()
+                    }
+                    
+                    # 二次検査の不良率（一次良品数が0の場合は0%）
+                    secondary_defect_rates = {
+                        name: totals[col] / primary_good * 100 if primary_good > 0 else 0
+                        for name, col in FmpDat.SECONDARY_DEFECT_COLUMNS.items()
+                    }
+                    
+                    daily_data.append({
+                        'date': date_str,
+                        'defect_rates': {**primary_defect_rates, **secondary_defect_rates}
+                    })
+                elif fill_gaps:
+                    daily_data.append({
+                        'date': date_str,
+                        'defect_rates': {}
+                    })
             
             return daily_data
             
@@ -859,8 +1032,14 @@ class FmpDat(db.Model):
             return []
 
     @staticmethod
-    def import_from_csv(file_path, encoding='shift_jis'):
-        """CSVファイルから膜加工データをインポート"""
+    def import_from_csv(file_path, encoding='shift_jis', progress=None):
+        """
+        CSVファイルから膜加工データをインポート
+
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
+        if progress is None:
+            progress = new_import_progress()
         session = None
         try:
             session = get_db_session()
@@ -887,8 +1066,8 @@ class FmpDat(db.Model):
             log_error(f'読み取り開始')
             
             # CSVファイルを読み込みながら処理
-            records = []
             error_rows = []
+            rows = []
             row_number = 0
             
             with open(file_path, 'r', encoding=encoding) as f:
@@ -896,6 +1075,7 @@ class FmpDat(db.Model):
                 
                 for row in reader:
                     row_number += 1
+                    progress['read_rows'] = row_number
                     try:
                         # 行が空でないことを確認
                         if not row or len(row) < 23:  # 必要な列数
@@ -946,24 +1126,17 @@ class FmpDat(db.Model):
                         edit_row['FMP_GRADE_B'] = str_to_flt(row[22])
                         edit_row['FMP_GRADE_C'] = str_to_flt(row[23])
                         
-                        existing = session.query(FmpDat).filter(
-                            FmpDat.FMP_INSP_DATE == edit_row['FMP_INSP_DATE'],
-                            FmpDat.FMP_PROC_DATE == edit_row['FMP_PROC_DATE'],
-                            FmpDat.FMP_COLOR == edit_row['FMP_COLOR'],
-                            FmpDat.FMP_PVA_LOT_NO == edit_row['FMP_PVA_LOT_NO'],
-                            FmpDat.FMP_BIKO == edit_row['FMP_BIKO'],
-                            FmpDat.FMP_FILM_CURVE == edit_row['FMP_FILM_CURVE']
-                        ).first()
-                        if existing:
-                            for k, v in edit_row.items():
-                                setattr(existing, k, v)
-                        else:
-                            session.add(FmpDat(**edit_row))
-                        session.commit()
+                        # 自然キーでの登録は読み込み後にまとめて行う
+                        rows.append((row_number, edit_row))
                     except Exception as e:
-                        session.rollback()
                         error_rows.append(f"行 {row_number}: {str(e)}")
                         continue
+            # 読み込んだ行を自然キーで一括登録
+            progress['skipped_rows'] = row_number - len(rows)
+            error_rows += _upsert_by_natural_key(
+                session, FmpDat, FmpDat.NATURAL_KEY_COLUMNS, 'FMP_INSP_DATE', rows, progress=progress
+            )
+            progress['stage'] = '完了'
             if error_rows:
                 log_error("以下の行でエラーが発生しました:")
                 for error in error_rows:
@@ -1170,9 +1343,48 @@ class SpcDat(db.Model):
     SPC_PST_OTHERS = db.Column(db.Numeric(5), comment='硬化後その他')
     SPC_FNL_GD_QTY = db.Column(db.Numeric(5), comment='最終良品数')
 
+    # 硬化前不良項目（枚数を分母）
+    PRE_DEFECT_ITEMS = [
+        'SPC_PRE_BLK_DUST', 'SPC_PRE_WHT_DUST', 'SPC_PRE_EDGE_FAIL', 'SPC_PRE_COAT_FAIL',
+        'SPC_PRE_DARK_SPOT', 'SPC_PRE_SNAIL', 'SPC_PRE_MIST', 'SPC_PRE_WRINKLE',
+        'SPC_PRE_BRRL_BUB', 'SPC_PRE_STICK', 'SPC_PRE_TRBL_FIL', 'SPC_PRE_BASE_FIL'
+    ]
+    # 硬化後不良項目（硬化前良品数を分母）
+    PST_DEFECT_ITEMS = [
+        'SPC_PST_SCRATCH', 'SPC_PST_COAT_FIL', 'SPC_PST_SNAIL', 'SPC_PST_DARK_SPOT',
+        'SPC_PST_WRINKLE', 'SPC_PST_BUBBLE', 'SPC_PST_EDGE_FAIL', 'SPC_PST_WHT_DUST',
+        'SPC_PST_BLK_DUST', 'SPC_PST_STICK', 'SPC_PST_PRM_STICK', 'SPC_PST_BASE_FAIL', 'SPC_PST_OTHERS'
+    ]
+
+    # 取込時に同一データと判定する列（自然キー）
+    NATURAL_KEY_COLUMNS = [
+        'SPC_COAT_DATE', 'SPC_INSTR', 'SPC_BRANCH_NO', 'SPC_TYPE', 'SPC_NAME_1', 'SPC_REF_IDX',
+        'SPC_COAT_COLOR', 'SPC_TIMES'
+    ]
+
+    @staticmethod
+    def _filters(start_date=None, end_date=None, ct_type=None, color=None):
+        """検索条件のリストを作成"""
+        filters = []
+        if start_date:
+            filters.append(SpcDat.SPC_COAT_DATE >= start_date)
+        if end_date:
+            filters.append(SpcDat.SPC_COAT_DATE <= end_date)
+        if ct_type:
+            filters.append(SpcDat.SPC_TYPE == ct_type)
+        if color:
+            filters.append(SpcDat.SPC_COAT_COLOR == color)
+        return filters
+
     @staticmethod
-    def import_from_csv(file_path, encoding='shift_jis'):
-        """CSVファイルからスピンコートデータをインポート（8項目一致ならUPDATE、なければINSERT、区分マスタ変換あり）"""
+    def import_from_csv(file_path, encoding='shift_jis', progress=None):
+        """
+        CSVファイルからスピンコートデータをインポート（8項目一致ならUPDATE、なければINSERT、区分マスタ変換あり）
+
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
+        if progress is None:
+            progress = new_import_progress()
         session = None
         try:
             session = get_db_session()
@@ -1191,6 +1403,7 @@ class SpcDat(db.Model):
                 color_map[row.KBN_NM] = row.KBN_ID
 
             error_rows = []
+            rows = []
             row_number = 0
             import csv
             with open(file_path, 'r', encoding=encoding) as f:
@@ -1198,6 +1411,7 @@ class SpcDat(db.Model):
                 next(reader, None)  # ヘッダー行スキップ
                 for row in reader:
                     row_number += 1
+                    progress['read_rows'] = row_number
                     try:
                         if not row or len(row) < 41:
                             error_rows.append(f"行 {row_number}: 列数が不足しています ({len(row)} 列)")
@@ -1268,27 +1482,19 @@ class SpcDat(db.Model):
                         edit_row['SPC_PST_BASE_FAIL'] = str_to_flt(row[39])
                         edit_row['SPC_PST_OTHERS'] = str_to_flt(row[40])
                         edit_row['SPC_FNL_GD_QTY'] = str_to_flt(row[41])
-                        # 8項目一致で既存レコード検索
-                        existing = session.query(SpcDat).filter(
-                            SpcDat.SPC_COAT_DATE == edit_row['SPC_COAT_DATE'],
-                            SpcDat.SPC_INSTR == edit_row['SPC_INSTR'],
-                            SpcDat.SPC_BRANCH_NO == edit_row['SPC_BRANCH_NO'],
-                            SpcDat.SPC_TYPE == edit_row['SPC_TYPE'],
-                            SpcDat.SPC_NAME_1 == edit_row['SPC_NAME_1'],
-                            SpcDat.SPC_REF_IDX == edit_row['SPC_REF_IDX'],
-                            SpcDat.SPC_COAT_COLOR == edit_row['SPC_COAT_COLOR'],
-                            SpcDat.SPC_TIMES == edit_row['SPC_TIMES']
-                        ).first()
-                        if existing:
-                            for k, v in edit_row.items():
-                                setattr(existing, k, v)
-                        else:
-                            session.add(SpcDat(**edit_row))
-                        session.commit()
+                        # 自然キーでの登録は読み込み後にまとめて行う
+                        rows.append((row_number, edit_row))
                     except Exception as e:
-                        session.rollback()
                         error_rows.append(f"行 {row_number}: {str(e)}")
                         continue
+            # 読み込んだ行を自然キーで一括登録
+            progress['skipped_rows'] = row_number - len(rows)
+            error_rows += _upsert_by_natural_key(
+                session, SpcDat, SpcDat.NATURAL_KEY_COLUMNS, 'SPC_COAT_DATE', rows, progress=progress
+            )
+            progress['stage'] = '完了'
+            # 取り込んだデータをスライドAPIに反映する
+            invalidate_response_cache()
             if error_rows:
                 log_error("以下の行でエラーが発生しました:")
                 for error in error_rows:
@@ -1394,72 +1600,40 @@ class SpcDat(db.Model):
             dict: {SPC_TIMES: {日付: { 'pre_total_rate':..., 'pst_total_rate':..., 'pre_items':..., 'pst_items':..., 'total_sheets':..., 'total_pre_good':... }, ...}, ...}
         """
         try:
-            pre_items = [
-                'SPC_PRE_BLK_DUST', 'SPC_PRE_WHT_DUST', 'SPC_PRE_EDGE_FAIL', 'SPC_PRE_COAT_FAIL',
-                'SPC_PRE_DARK_SPOT', 'SPC_PRE_SNAIL', 'SPC_PRE_MIST', 'SPC_PRE_WRINKLE',
-                'SPC_PRE_BRRL_BUB', 'SPC_PRE_STICK', 'SPC_PRE_TRBL_FIL', 'SPC_PRE_BASE_FIL'
-            ]
-            pst_items = [
-                'SPC_PST_SCRATCH', 'SPC_PST_COAT_FIL', 'SPC_PST_SNAIL', 'SPC_PST_DARK_SPOT',
-                'SPC_PST_WRINKLE', 'SPC_PST_BUBBLE', 'SPC_PST_EDGE_FAIL', 'SPC_PST_WHT_DUST',
-                'SPC_PST_BLK_DUST', 'SPC_PST_STICK', 'SPC_PST_PRM_STICK', 'SPC_PST_BASE_FAIL', 'SPC_PST_OTHERS'
-            ]
-            query = SpcDat.query
-            if start_date:
-                query = query.filter(SpcDat.SPC_COAT_DATE >= start_date)
-            if end_date:
-                query = query.filter(SpcDat.SPC_COAT_DATE <= end_date)
-            if ct_type:
-                query = query.filter(SpcDat.SPC_TYPE == ct_type)
-            if color:
-                query = query.filter(SpcDat.SPC_COAT_COLOR == color)
-            results = query.all()
-            from collections import defaultdict
-            summary = defaultdict(lambda: defaultdict(lambda: {
-                'total_sheets': 0, 'total_pre_good': 0,
-                'pre_items': defaultdict(float), 'pst_items': defaultdict(float),
-                'pre_total_defect': 0, 'pst_total_defect': 0
-            }))
-            for r in results:
-                date_str = r.SPC_COAT_DATE.strftime('%Y-%m-%d') if r.SPC_COAT_DATE else None
-                if not date_str:
-                    continue
-                times = r.SPC_TIMES
-                sheets = r.SPC_SHEETS or 0
-                pre_good = r.SPC_PRE_GOOD_QTY or 0
-                summary[times][date_str]['total_sheets'] += sheets
-                summary[times][date_str]['total_pre_good'] += pre_good
-                for item in pre_items:
-                    val = float(getattr(r, item, 0) or 0)
-                    summary[times][date_str]['pre_items'][item] += val
-                    summary[times][date_str]['pre_total_defect'] += val
-                for item in pst_items:
-                    val = float(getattr(r, item, 0) or 0)
-                    summary[times][date_str]['pst_items'][item] += val
-                    summary[times][date_str]['pst_total_defect'] += val
+            pre_items = SpcDat.PRE_DEFECT_ITEMS
+            pst_items = SpcDat.PST_DEFECT_ITEMS
+            # 回数・日付ごとの合計をSQLで集計
+            rows = _daily_totals(
+                SpcDat, SpcDat.SPC_COAT_DATE,
+                ['SPC_SHEETS', 'SPC_PRE_GOOD_QTY'] + pre_items + pst_items,
+                group_column=SpcDat.SPC_TIMES,
+                filters=SpcDat._filters(start_date, end_date, ct_type, color)
+            )
             # 不良率計算
             result = {}
-            for times, daily in summary.items():
-                result[times] = {}
-                for date_str, v in daily.items():
-                    total_sheets = float(v['total_sheets'])
-                    total_pre_good = float(v['total_pre_good'])
-                    pre_items_rate = {}
-                    pst_items_rate = {}
-                    for item, val in v['pre_items'].items():
-                        pre_items_rate[item] = round((val / total_sheets * 100) if total_sheets else 0, 2)
-                    for item, val in v['pst_items'].items():
-                        pst_items_rate[item] = round((val / total_pre_good * 100) if total_pre_good else 0, 2)
-                    pre_total_rate = round((v['pre_total_defect'] / total_sheets * 100) if total_sheets else 0, 2)
-                    pst_total_rate = round((v['pst_total_defect'] / total_pre_good * 100) if total_pre_good else 0, 2)
-                    result[times][date_str] = {
-                        'pre_total_rate': pre_total_rate,
-                        'pst_total_rate': pst_total_rate,
-                        'pre_items': pre_items_rate,
-                        'pst_items': pst_items_rate,
-                        'total_sheets': total_sheets,
-                        'total_pre_good': total_pre_good
-                    }
+            for date_str, times, totals in rows:
+                total_sheets = float(totals['SPC_SHEETS'])
+                total_pre_good = float(totals['SPC_PRE_GOOD_QTY'])
+                pre_values = {item: float(totals[item]) for item in pre_items}
+                pst_values = {item: float(totals[item]) for item in pst_items}
+                pre_items_rate = {}
+                pst_items_rate = {}
+                for item, val in pre_values.items():
+                    pre_items_rate[item] = round((val / total_sheets * 100) if total_sheets else 0, 2)
+                for item, val in pst_values.items():
+                    pst_items_rate[item] = round((val / total_pre_good * 100) if total_pre_good else 0, 2)
+                pre_total_defect = sum(pre_values.values())
+                pst_total_defect = sum(pst_values.values())
+                pre_total_rate = round((pre_total_defect / total_sheets * 100) if total_sheets else 0, 2)
+                pst_total_rate = round((pst_total_defect / total_pre_good * 100) if total_pre_good else 0, 2)
+                result.setdefault(times, {})[date_str] = {
+                    'pre_total_rate': pre_total_rate,
+                    'pst_total_rate': pst_total_rate,
+                    'pre_items': pre_items_rate,
+                    'pst_items': pst_items_rate,
+                    'total_sheets': total_sheets,
+                    'total_pre_good': total_pre_good
+                }
             return result
         except Exception as e:
             log_error(f'SPC_TIMESごと日別不良率集計中にエラーが発生しました: {str(e)}')
@@ -1501,9 +1675,42 @@ class HdcDat(db.Model):
     HDC_PRJ_STREAK = db.Column(db.Float, comment='投影スジ')
     HDC_PASS_QTY = db.Column(db.Float, comment='合格数')
 
+    # 不良項目（コート数を分母）
+    DEFECT_ITEMS = [
+        'HDC_PRE_FOREIGN', 'HDC_PRE_DROP', 'HDC_PRE_CHIP', 'HDC_PRE_STREAK', 'HDC_PRE_OTHERS',
+        'HDC_TRS_BASE_FAIL', 'HDC_TRS_FOREIGN', 'HDC_TRS_INCL', 'HDC_TRS_SCRATCH', 'HDC_TRS_COAT_FAIL',
+        'HDC_TRS_DROP', 'HDC_TRS_STREAK', 'HDC_TRS_DIRT', 'HDC_TRS_CHIP', 'HDC_PRJ_BASE',
+        'HDC_PRJ_FOREIGN', 'HDC_PRJ_DUST', 'HDC_PRJ_SCRATCH', 'HDC_PRJ_DROP', 'HDC_PRJ_CHIP', 'HDC_PRJ_STREAK'
+    ]
+
+    # 取込時に同一データと判定する列（自然キー）
+    NATURAL_KEY_COLUMNS = [
+        'HDC_COAT_DATE', 'HDC_TIMES', 'HDC_TYPE', 'HDC_BASE', 'HDC_ADD_PWR', 'HDC_LR', 'HDC_COLOR'
+    ]
+
+    @staticmethod
+    def _filters(start_date=None, end_date=None, ct_type=None, color=None):
+        """検索条件のリストを作成"""
+        filters = []
+        if start_date:
+            filters.append(HdcDat.HDC_COAT_DATE >= start_date)
+        if end_date:
+            filters.append(HdcDat.HDC_COAT_DATE <= end_date)
+        if ct_type:
+            filters.append(HdcDat.HDC_TYPE == ct_type)
+        if color:
+            filters.append(HdcDat.HDC_COLOR == color)
+        return filters
+
     @staticmethod
-    def import_from_csv(file_path, encoding='shift_jis'):
-        """CSVファイルからハードコートデータをインポート（区分マスタ変換あり、7項目一致ならUPDATE、なければINSERT）"""
+    def import_from_csv(file_path, encoding='shift_jis', progress=None):
+        """
+        CSVファイルからハードコートデータをインポート（区分マスタ変換あり、7項目一致ならUPDATE、なければINSERT）
+
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
+        if progress is None:
+            progress = new_import_progress()
         session = None
         try:
             session = get_db_session()
@@ -1518,12 +1725,14 @@ class HdcDat(db.Model):
                 color_map[row.KBN_NM] = row.KBN_ID
 
             error_rows = []
+            rows = []
             row_number = 0
             with open(file_path, 'r', encoding=encoding) as f:
                 reader = csv.reader(f)
                 next(reader, None)  # ヘッダー行スキップ
                 for row in reader:
                     row_number += 1
+                    progress['read_rows'] = row_number
                     try:
                         if not row or len(row) < 37:
                             error_rows.append(f"行 {row_number}: 列数が不足しています ({len(row)} 列)")
@@ -1576,26 +1785,19 @@ class HdcDat(db.Model):
                         edit_row['HDC_PRJ_CHIP'] = str_to_flt(row[34])
                         edit_row['HDC_PRJ_STREAK'] = str_to_flt(row[35])
                         edit_row['HDC_PASS_QTY'] = str_to_flt(row[36])
-                        # 7項目一致で既存レコード検索
-                        existing = session.query(HdcDat).filter(
-                            HdcDat.HDC_COAT_DATE == edit_row['HDC_COAT_DATE'],
-                            HdcDat.HDC_TIMES == edit_row['HDC_TIMES'],
-                            HdcDat.HDC_TYPE == edit_row['HDC_TYPE'],
-                            HdcDat.HDC_BASE == edit_row['HDC_BASE'],
-                            HdcDat.HDC_ADD_PWR == edit_row['HDC_ADD_PWR'],
-                            HdcDat.HDC_LR == edit_row['HDC_LR'],
-                            HdcDat.HDC_COLOR == edit_row['HDC_COLOR']
-                        ).first()
-                        if existing:
-                            for k, v in edit_row.items():
-                                setattr(existing, k, v)
-                        else:
-                            session.add(HdcDat(**edit_row))
-                        session.commit()
+                        # 自然キーでの登録は読み込み後にまとめて行う
+                        rows.append((row_number, edit_row))
                     except Exception as e:
-                        session.rollback()
                         error_rows.append(f"行 {row_number}: {str(e)}")
                         continue
+            # 読み込んだ行を自然キーで一括登録
+            progress['skipped_rows'] = row_number - len(rows)
+            error_rows += _upsert_by_natural_key(
+                session, HdcDat, HdcDat.NATURAL_KEY_COLUMNS, 'HDC_COAT_DATE', rows, progress=progress
+            )
+            progress['stage'] = '完了'
+            # 取り込んだデータをスライドAPIに反映する
+            invalidate_response_cache()
             if error_rows:
                 log_error("以下の行でエラーが発生しました:")
                 for error in error_rows:
@@ -1617,42 +1819,43 @@ class HdcDat(db.Model):
             dict: {日付: {HDC_TIMES: 不良率, ...}, ...}
         """
         try:
-            query = HdcDat.query
-            if start_date:
-                query = query.filter(HdcDat.HDC_COAT_DATE >= start_date)
-            if end_date:
-                query = query.filter(HdcDat.HDC_COAT_DATE <= end_date)
-            if ct_type:
-                query = query.filter(HdcDat.HDC_TYPE == ct_type)
-            if color:
-                query = query.filter(HdcDat.HDC_COLOR == color)
-            results = query.all()
-
-            # 日付・HDC_TIMESごとに集計
-            from collections import defaultdict
-            trend = defaultdict(lambda: defaultdict(lambda: {'defect': 0, 'cnt': 0}))
-            for r in results:
-                date_str = r.HDC_COAT_DATE.strftime('%Y-%m-%d') if r.HDC_COAT_DATE else None
-                if not date_str:
-                    continue
-                times = r.HDC_TIMES
-                cnt = r.HDC_COAT_CNT or 0
-                defect = getattr(r, item, 0) or 0
-                trend[date_str][times]['defect'] += defect
-                trend[date_str][times]['cnt'] += cnt
+            # HDC_DATの列でない項目は不良数0として扱う
+            item_columns = [item] if item in HdcDat.__table__.columns else []
+            # 日付・HDC_TIMESごとにSQLで集計
+            rows = _daily_totals(
+                HdcDat, HdcDat.HDC_COAT_DATE,
+                ['HDC_COAT_CNT'] + item_columns,
+                group_column=HdcDat.HDC_TIMES,
+                filters=HdcDat._filters(start_date, end_date, ct_type, color)
+            )
 
             # 不良率計算
             trend_rates = {}
-            for date_str, times_dict in trend.items():
-                trend_rates[date_str] = {}
-                for times, v in times_dict.items():
-                    rate = (v['defect'] / v['cnt'] * 100) if v['cnt'] else 0
-                    trend_rates[date_str][times] = round(rate, 2)
+            for date_str, times, totals in rows:
+                cnt = totals['HDC_COAT_CNT']
+                defect = totals.get(item, 0)
+                rate = (defect / cnt * 100) if cnt else 0
+                trend_rates.setdefault(date_str, {})[times] = round(rate, 2)
             return trend_rates
         except Exception as e:
             log_error(f'HDC不良率推移分析中にエラーが発生しました: {str(e)}')
             return None
 
+    @staticmethod
+    def _daily_summary_entry(totals):
+        """集計結果1件分から合計不良率・各不良項目不良率を計算"""
+        total_cnt = totals['HDC_COAT_CNT']
+        items_rate = {}
+        for item in HdcDat.DEFECT_ITEMS:
+            items_rate[item] = round((totals[item] / total_cnt * 100) if total_cnt else 0, 2)
+        total_defect = sum(totals[item] for item in HdcDat.DEFECT_ITEMS)
+        total_rate = round((total_defect / total_cnt * 100) if total_cnt else 0, 2)
+        return {
+            'total_rate': total_rate,
+            'items': items_rate,
+            'total_cnt': total_cnt
+        }
+
     @staticmethod
     def get_daily_defect_summary(start_date=None, end_date=None, ct_type=None, color=None):
         """
@@ -1661,48 +1864,16 @@ class HdcDat(db.Model):
             dict: {日付: { 'total_rate': 合計不良率, 'items': {項目名: 不良率, ...}, 'total_cnt': コート数 }, ...}
         """
         try:
-            defect_items = [
-                'HDC_PRE_FOREIGN', 'HDC_PRE_DROP', 'HDC_PRE_CHIP', 'HDC_PRE_STREAK', 'HDC_PRE_OTHERS',
-                'HDC_TRS_BASE_FAIL', 'HDC_TRS_FOREIGN', 'HDC_TRS_INCL', 'HDC_TRS_SCRATCH', 'HDC_TRS_COAT_FAIL',
-                'HDC_TRS_DROP', 'HDC_TRS_STREAK', 'HDC_TRS_DIRT', 'HDC_TRS_CHIP', 'HDC_PRJ_BASE',
-                'HDC_PRJ_FOREIGN', 'HDC_PRJ_DUST', 'HDC_PRJ_SCRATCH', 'HDC_PRJ_DROP', 'HDC_PRJ_CHIP', 'HDC_PRJ_STREAK'
-            ]
-            query = HdcDat.query
-            if start_date:
-                query = query.filter(HdcDat.HDC_COAT_DATE >= start_date)
-            if end_date:
-                query = query.filter(HdcDat.HDC_COAT_DATE <= end_date)
-            if ct_type:
-                query = query.filter(HdcDat.HDC_TYPE == ct_type)
-            if color:
-                query = query.filter(HdcDat.HDC_COLOR == color)
-            results = query.all()
-            from collections import defaultdict
-            daily = defaultdict(lambda: {'total_cnt': 0, 'items': defaultdict(float), 'total_defect': 0})
-            for r in results:
-                date_str = r.HDC_COAT_DATE.strftime('%Y-%m-%d') if r.HDC_COAT_DATE else None
-                if not date_str:
-                    continue
-                cnt = r.HDC_COAT_CNT or 0
-                daily[date_str]['total_cnt'] += cnt
-                for item in defect_items:
-                    val = getattr(r, item, 0) or 0
-                    daily[date_str]['items'][item] += val
-                    daily[date_str]['total_defect'] += val
+            # 日付ごとの合計をSQLで集計
+            rows = _daily_totals(
+                HdcDat, HdcDat.HDC_COAT_DATE,
+                ['HDC_COAT_CNT'] + HdcDat.DEFECT_ITEMS,
+                filters=HdcDat._filters(start_date, end_date, ct_type, color)
+            )
             # 不良率計算
             summary = {}
-            for date_str, v in daily.items():
-                total_cnt = v['total_cnt']
-                total_defect = v['total_defect']
-                items_rate = {}
-                for item, val in v['items'].items():
-                    items_rate[item] = round((val / total_cnt * 100) if total_cnt else 0, 2)
-                total_rate = round((total_defect / total_cnt * 100) if total_cnt else 0, 2)
-                summary[date_str] = {
-                    'total_rate': total_rate,
-                    'items': items_rate,
-                    'total_cnt': total_cnt
-                }
+            for date_str, _, totals in rows:
+                summary[date_str] = HdcDat._daily_summary_entry(totals)
             return summary
         except Exception as e:
             log_error(f'HDC日別不良率集計中にエラーが発生しました: {str(e)}')
@@ -1716,51 +1887,17 @@ class HdcDat(db.Model):
             dict: {HDC_TIMES: {日付: { 'total_rate':..., 'items':..., 'total_cnt':... }, ...}, ...}
         """
         try:
-            defect_items = [
-                'HDC_PRE_FOREIGN', 'HDC_PRE_DROP', 'HDC_PRE_CHIP', 'HDC_PRE_STREAK', 'HDC_PRE_OTHERS',
-                'HDC_TRS_BASE_FAIL', 'HDC_TRS_FOREIGN', 'HDC_TRS_INCL', 'HDC_TRS_SCRATCH', 'HDC_TRS_COAT_FAIL',
-                'HDC_TRS_DROP', 'HDC_TRS_STREAK', 'HDC_TRS_DIRT', 'HDC_TRS_CHIP', 'HDC_PRJ_BASE',
-                'HDC_PRJ_FOREIGN', 'HDC_PRJ_DUST', 'HDC_PRJ_SCRATCH', 'HDC_PRJ_DROP', 'HDC_PRJ_CHIP', 'HDC_PRJ_STREAK'
-            ]
-            query = HdcDat.query
-            if start_date:
-                query = query.filter(HdcDat.HDC_COAT_DATE >= start_date)
-            if end_date:
-                query = query.filter(HdcDat.HDC_COAT_DATE <= end_date)
-            if ct_type:
-                query = query.filter(HdcDat.HDC_TYPE == ct_type)
-            if color:
-                query = query.filter(HdcDat.HDC_COLOR == color)
-            results = query.all()
-            from collections import defaultdict
-            summary = defaultdict(lambda: defaultdict(lambda: {'total_cnt': 0, 'items': defaultdict(float), 'total_defect': 0}))
-            for r in results:
-                date_str = r.HDC_COAT_DATE.strftime('%Y-%m-%d') if r.HDC_COAT_DATE else None
-                if not date_str:
-                    continue
-                times = r.HDC_TIMES
-                cnt = r.HDC_COAT_CNT or 0
-                summary[times][date_str]['total_cnt'] += cnt
-                for item in defect_items:
-                    val = getattr(r, item, 0) or 0
-                    summary[times][date_str]['items'][item] += val
-                    summary[times][date_str]['total_defect'] += val
+            # 回数・日付ごとの合計をSQLで集計
+            rows = _daily_totals(
+                HdcDat, HdcDat.HDC_COAT_DATE,
+                ['HDC_COAT_CNT'] + HdcDat.DEFECT_ITEMS,
+                group_column=HdcDat.HDC_TIMES,
+                filters=HdcDat._filters(start_date, end_date, ct_type, color)
+            )
             # 不良率計算
             result = {}
-            for times, daily in summary.items():
-                result[times] = {}
-                for date_str, v in daily.items():
-                    total_cnt = v['total_cnt']
-                    total_defect = v['total_defect']
-                    items_rate = {}
-                    for item, val in v['items'].items():
-                        items_rate[item] = round((val / total_cnt * 100) if total_cnt else 0, 2)
-                    total_rate = round((total_defect / total_cnt * 100) if total_cnt else 0, 2)
-                    result[times][date_str] = {
-                        'total_rate': total_rate,
-                        'items': items_rate,
-                        'total_cnt': total_cnt
-                    }
+            for date_str, times, totals in rows:
+                result.setdefault(times, {})[date_str] = HdcDat._daily_summary_entry(totals)
             return result
         except Exception as e:
             log_error(f'HDC_TIMESごと日別不良率集計中にエラーが発生しました: {str(e)}')
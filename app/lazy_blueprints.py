@@ -0,0 +1,143 @@
+import ast
+import importlib
+import importlib.util
+import json
+import os
+
+from flask import Blueprint
+
+from .utils import log_error
+
+# ==================== ブループリントの遅延読み込み ====================
+#
+# 利用頻度の低い画面（CSV取込・マスタメンテナンス・石田工程の分析）のモジュールは、
+# 起動時にはインポートせず、最初にそのURLへアクセスされた時点でインポートする。
+#
+# 画面のテンプレートはメニューで全画面のurl_forを使うため、URLルールだけは起動時に登録する。
+# ルールはモジュールのソースから @<ブループリント>.route(...) を読み取って作成し
+# （インポートはしない）、読み取り結果はソースの更新日時ごとに __pycache__ にキャッシュする。
+
+
+class LazyView:
+    """最初の呼び出し時にモジュールをインポートし、本来のビュー関数に処理を渡す"""
+
+    def __init__(self, module_name, func_name):
+        self.module_name = module_name
+        self.func_name = func_name
+        self.__name__ = func_name
+        self.__module__ = module_name
+        self._view = None
+
+    @property
+    def view(self):
+        if self._view is None:
+            # モジュール側で付けたデコレータ（login_requiredなど）も含めて取得する
+            module = importlib.import_module(self.module_name)
+            self._view = getattr(module, self.func_name)
+        return self._view
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+def _literal(node):
+    return ast.literal_eval(node)
+
+
+def _parse_routes(source_path, blueprint_attr):
+    """
+    モジュールのソースからブループリントとルートの定義を読み取る
+
+    戻り値:
+        dict: {'name': ブループリント名, 'options': Blueprint()のキーワード引数,
+               'routes': [[ルール, 関数名, route()のキーワード引数], ...]}
+    """
+    with open(source_path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=source_path)
+
+    manifest = {'name': None, 'options': {}, 'routes': []}
+    for node in tree.body:
+        # upload_bp = Blueprint('upload', __name__)
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)
+                and any(isinstance(t, ast.Name) and t.id == blueprint_attr for t in node.targets)):
+            manifest['name'] = _literal(node.value.args[0])
+            manifest['options'] = {kw.arg: _literal(kw.value) for kw in node.value.keywords}
+
+        # @upload_bp.route('/upload', methods=['GET', 'POST'])
+        if isinstance(node, ast.FunctionDef):
+            for decorator in node.decorator_list:
+                if (isinstance(decorator, ast.Call)
+                        and isinstance(decorator.func, ast.Attribute)
+                        and decorator.func.attr == 'route'
+                        and isinstance(decorator.func.value, ast.Name)
+                        and decorator.func.value.id == blueprint_attr):
+                    manifest['routes'].append([
+                        _literal(decorator.args[0]),
+                        node.name,
+                        {kw.arg: _literal(kw.value) for kw in decorator.keywords},
+                    ])
+
+    if manifest['name'] is None:
+        raise ValueError(f'{source_path}にブループリント {blueprint_attr} が見つかりません')
+    return manifest
+
+
+def _load_manifest(module_name, blueprint_attr):
+    """ルート定義を取得（ソースが更新されていなければキャッシュを使用）"""
+    source_path = importlib.util.find_spec(module_name).origin
+    stat = os.stat(source_path)
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    cache_path = os.path.join(
+        os.path.dirname(source_path), '__pycache__',
+        f'{module_name.rsplit(".", 1)[-1]}.{blueprint_attr}.routes.json'
+    )
+
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('stamp') == stamp:
+            return cached['manifest']
+    except (OSError, ValueError):
+        pass
+
+    manifest = _parse_routes(source_path, blueprint_attr)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'stamp': stamp, 'manifest': manifest}, f, ensure_ascii=False)
+    except OSError as e:
+        log_error(f'ルート定義のキャッシュの保存中にエラーが発生しました: {str(e)}')
+    return manifest
+
+
+def register_lazy_blueprint(app, module_name, blueprint_attr):
+    """
+    ブループリントをURLルールだけ登録し、モジュールのインポートは最初のリクエストまで遅らせる
+
+    LAZY_BLUEPRINTS設定がFalseの場合や、ルートが読み取れない場合（デコレータに変数を使っているなど）は
+    通常どおりインポートして登録する。
+
+    Parameters:
+        app: Flaskアプリケーション
+        module_name (str): ビューのモジュール名（例: 'app.upload_routes'）
+        blueprint_attr (str): モジュール内のブループリントの変数名（例: 'upload_bp'）
+    """
+    if not app.config.get('LAZY_BLUEPRINTS', True):
+        app.register_blueprint(getattr(importlib.import_module(module_name), blueprint_attr))
+        return
+
+    try:
+        manifest = _load_manifest(module_name, blueprint_attr)
+    except Exception as e:
+        log_error(f'{module_name}のルート定義の読み取りに失敗したため通常どおり読み込みます: {str(e)}')
+        app.register_blueprint(getattr(importlib.import_module(module_name), blueprint_attr))
+        return
+
+    blueprint = Blueprint(manifest['name'], module_name, **manifest['options'])
+    views = {}
+    for rule, func_name, options in manifest['routes']:
+        options = dict(options)
+        endpoint = options.pop('endpoint', func_name)
+        view = views.setdefault(func_name, LazyView(module_name, func_name))
+        blueprint.add_url_rule(rule, endpoint=endpoint, view_func=view, **options)
+    app.register_blueprint(blueprint)
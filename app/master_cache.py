@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+# ==================== マスタデータのキャッシュ ====================
+#
+# 区分マスタ・モノマーマスタ・製品マスタ・従業員マスタの一覧をプロセス内で共有する。
+# 各マスタのsave()/delete()/CSV取込がinvalidate_master_cache(テーブル名)を呼び出して
+# 世代を進めるため、同じプロセスでの更新はすぐに反映される。
+# 取込ワーカーでの取込は共有のデータ世代（SET_MST.SET_DATA_GEN）の変化で、設定の読み直し時に
+# すべて破棄する（settings_service.refresh_settings）。直接のSQLでの更新はMASTER_CACHE_TIMEOUT（秒）で反映される。
+#
+# キャッシュする値はセッションを閉じた（切り離し済みの）モデルのリストとし、
+# 呼び出し側には毎回リストのコピーを返す。
+# 更新頻度の高いテーブルの件数（特記事項の検索件数など）も、短い有効期間を指定して保持できる。
+
+MASTER_CACHE_TIMEOUT = int(os.getenv('MASTER_CACHE_TIMEOUT', 600))
+
+_lock = threading.Lock()
+_cache = {}
+_version = 0
+
+
+def master_cache_version():
+    """マスタキャッシュの世代（いずれかのマスタが更新されるたびに増える）"""
+    return _version
+
+
+def invalidate_master_cache(table_name=None):
+    """
+    マスタキャッシュを無効化する（マスタの更新時に呼び出す）
+
+    Parameters:
+        table_name (str): 無効化するテーブル名（省略時はすべて）
+    """
+    global _version
+    with _lock:
+        _version += 1
+        for key in [k for k in _cache if table_name is None or k[0] == table_name]:
+            del _cache[key]
+
+
+def cached_master(key, loader, timeout=None):
+    """
+    マスタデータをキャッシュから取得する（なければloaderで読み込んで保存）
+
+    Parameters:
+        key (tuple): (テーブル名, 条件...)
+        loader: 引数なしで値を返す関数。例外の場合はキャッシュせずに呼び出し元へ送出する
+        timeout (int): 有効期間（秒）。省略時はMASTER_CACHE_TIMEOUT
+
+    Returns:
+        キャッシュした値（リストの場合はコピー）
+    """
+    timeout = MASTER_CACHE_TIMEOUT if timeout is None else timeout
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        version = _version
+    if entry is None or now - entry['loaded'] >= timeout:
+        value = loader()
+        entry = {'value': value, 'loaded': now}
+        with _lock:
+            # 読み込み中に更新された場合は古い値を保存しない
+            if version == _version:
+                _cache[key] = entry
+    value = entry['value']
+    return list(value) if isinstance(value, list) else value
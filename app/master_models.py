@@ -1,33 +1,14 @@
-from sqlalchemy import create_engine, distinct
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import distinct
+from sqlalchemy.orm import declarative_base
 import csv
-import os
-from dotenv import load_dotenv
 from app import db
 from decimal import Decimal
 from .utils import log_error
-
-# .envファイルの読み込み
-load_dotenv()
+from .database import get_db_session
+from .master_cache import cached_master, invalidate_master_cache
 
 Base = declarative_base()
 
-def get_db_session():
-    """データベースセッションを取得"""
-    try:
-        DATABASE_URL = (
-            f"mysql+pymysql://"
-            f"{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
-            f"{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
-        )
-        
-        engine = create_engine(DATABASE_URL)
-        Session = sessionmaker(bind=engine)
-        return Session()
-    except Exception as e:
-        log_error(f'データベースセッションの取得中にエラーが発生しました: {str(e)}')
-        return None
-
 # ==================== PRD_MST (製品マスタ) モデル ====================
 
 class PrdMstModel(db.Model):
@@ -43,53 +24,66 @@ class PrdMstModel(db.Model):
     
     @staticmethod
     def get_distinct_prd_nm():
-        """製品名をDISTINCTで取得する"""
-        try:
+        """製品名をDISTINCTで取得する（マスタキャッシュを使用）"""
+        def load():
             session = get_db_session()
             if not session:
-                return []
-            # PRD_TYPとPRD_NMでDISTINCTを取得
-            distinct_items = session.query(
-                distinct(PrdMstModel.PRD_NM)
-            ).all()
-            session.close()
+                raise RuntimeError('データベースセッションの取得に失敗しました')
+            try:
+                # PRD_TYPとPRD_NMでDISTINCTを取得
+                distinct_items = session.query(
+                    distinct(PrdMstModel.PRD_NM)
+                ).all()
+            finally:
+                session.close()
             
             # タプルのリストから値のリストに変換
             return [item[0] for item in distinct_items if item[0]]
+        
+        try:
+            return cached_master(('PRD_MST', 'PRD_NM'), load)
         except Exception as e:
             log_error(f'製品名の取得中にエラーが発生しました: {str(e)}')
             return []
         
     @staticmethod
     def get_distinct_prd_color():
-        """膜カラーをDISTINCTで取得する"""
-        try:
+        """膜カラーをDISTINCTで取得する（マスタキャッシュを使用）"""
+        def load():
             session = get_db_session()
             if not session:
-                return []
-            # PRD_COLORでDISTINCTを取得
-            distinct_items = session.query(
-                distinct(PrdMstModel.PRD_COLOR)
-            ).all()
-            session.close()
+                raise RuntimeError('データベースセッションの取得に失敗しました')
+            try:
+                # PRD_COLORでDISTINCTを取得
+                distinct_items = session.query(
+                    distinct(PrdMstModel.PRD_COLOR)
+                ).all()
+            finally:
+                session.close()
             
             # タプルのリストから値のリストに変換
             return [item[0] for item in distinct_items if item[0]]
+        
+        try:
+            return cached_master(('PRD_MST', 'PRD_COLOR'), load)
         except Exception as e:
             log_error(f'膜カラーの取得中にエラーが発生しました: {str(e)}')
             return []
     
     @staticmethod
     def get_all():
-        """全ての製品マスタデータを取得"""
-        try:
+        """全ての製品マスタデータを取得（マスタキャッシュを使用）"""
+        def load():
             session = get_db_session()
             if not session:
-                return []
-            
-            records = session.query(PrdMstModel).order_by(PrdMstModel.PRD_ID).all()
-            session.close()
-            return records
+                raise RuntimeError('データベースセッションの取得に失敗しました')
+            try:
+                return session.query(PrdMstModel).order_by(PrdMstModel.PRD_ID).all()
+            finally:
+                session.close()
+        
+        try:
+            return cached_master(('PRD_MST',), load)
         except Exception as e:
             log_error(f'製品マスタデータの取得中にエラーが発生しました: {str(e)}')
             return []
@@ -135,6 +129,7 @@ class PrdMstModel(db.Model):
             
             session.commit()
             session.close()
+            invalidate_master_cache('PRD_MST')
             return True
         except Exception as e:
             log_error(f'製品マスタデータの保存中にエラーが発生しました: {str(e)}')
@@ -151,6 +146,7 @@ class PrdMstModel(db.Model):
             if record:
                 session.delete(record)
                 session.commit()
+                invalidate_master_cache('PRD_MST')
             
             session.close()
             return True
@@ -185,8 +181,15 @@ class PrdMstModel(db.Model):
             return []
     
     @staticmethod
-    def import_from_csv(file_path, encoding='shift_jis'):
-        """CSVファイルから製品マスタデータをインポートする（ヘッダーなし、列順固定）"""
+    def import_from_csv(file_path, encoding='shift_jis', progress=None):
+        """
+        CSVファイルから製品マスタデータをインポートする（ヘッダーなし、列順固定）
+
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
+        from .models import new_import_progress
+        if progress is None:
+            progress = new_import_progress()
         try:
             session = get_db_session()
             if not session:
@@ -201,6 +204,8 @@ class PrdMstModel(db.Model):
                 
                 # 列順固定: PRD_ID, PRD_KBN, PRD_TYP, PRD_NM, PRD_COLOR, PRD_PLY_DAYS
                 for row_num, row in enumerate(reader, start=1):
+                    progress['read_rows'] = row_num
+                    progress['skipped_rows'] = error_count
                     try:
                         # 最低限PRD_IDが必要
                         if len(row) < 1:
@@ -269,8 +274,14 @@ class PrdMstModel(db.Model):
                         error_count += 1
                         continue
                         
+            progress['stage'] = '登録'
+            progress['skipped_rows'] = error_count
             session.commit()
             session.close()
+            progress['written_rows'] = imported_count + updated_count
+            progress['chunks'] = 1
+            invalidate_master_cache('PRD_MST')
+            progress['stage'] = '完了'
             
             message = f'データのインポートが完了しました。新規追加: {imported_count}件、更新: {updated_count}件'
             if error_count > 0:
@@ -293,7 +304,17 @@ class KbnMst(db.Model):
     
     @staticmethod
     def get_kbn_list(kbn_typ):
-        return KbnMst.query.filter_by(KBN_TYP=kbn_typ).all()
+        """区分種別の区分一覧を取得（マスタキャッシュを使用）"""
+        def load():
+            session = get_db_session()
+            if not session:
+                raise RuntimeError('データベースセッションの取得に失敗しました')
+            try:
+                return session.query(KbnMst).filter_by(KBN_TYP=kbn_typ).all()
+            finally:
+                session.close()
+        
+        return cached_master(('KBN_MST', kbn_typ), load)
     
     @staticmethod
     def get_all():
@@ -332,6 +353,7 @@ class KbnMst(db.Model):
         try:
             db.session.add(self)
             db.session.commit()
+            invalidate_master_cache('KBN_MST')
             return True
         except Exception as e:
             log_error(f'KBN_MSTの保存中にエラーが発生しました: {str(e)}')
@@ -343,6 +365,7 @@ class KbnMst(db.Model):
         try:
             db.session.delete(self)
             db.session.commit()
+            invalidate_master_cache('KBN_MST')
             return True
         except Exception as e:
             log_error(f'KBN_MSTの削除中にエラーが発生しました: {str(e)}')
@@ -370,15 +393,18 @@ class MnoMstModel(db.Model):
     
     @staticmethod
     def get_all():
-        """全てのモノマーマスタデータを取得"""
-        try:
+        """全てのモノマーマスタデータを取得（マスタキャッシュを使用）"""
+        def load():
             session = get_db_session()
             if not session:
-                return []
-            
-            records = session.query(MnoMstModel).order_by(MnoMstModel.MNO_SYU).all()
-            session.close()
-            return records
+                raise RuntimeError('データベースセッションの取得に失敗しました')
+            try:
+                return session.query(MnoMstModel).order_by(MnoMstModel.MNO_SYU).all()
+            finally:
+                session.close()
+        
+        try:
+            return cached_master(('MNO_MST',), load)
         except Exception as e:
             log_error(f'モノマーマスタデータの取得中にエラーが発生しました: {str(e)}')
             return []
@@ -421,6 +447,7 @@ class MnoMstModel(db.Model):
             
             session.commit()
             session.close()
+            invalidate_master_cache('MNO_MST')
             return True
         except Exception as e:
             log_error(f'モノマーマスタデータの保存中にエラーが発生しました: {str(e)}')
@@ -437,6 +464,7 @@ class MnoMstModel(db.Model):
             if record:
                 session.delete(record)
                 session.commit()
+                invalidate_master_cache('MNO_MST')
             
             session.close()
             return True
@@ -1,38 +1,22 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import text
+from sqlalchemy.orm import declarative_base
 from datetime import datetime, timedelta
 import csv
 import os
-from dotenv import load_dotenv
+import time
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
 
 
 from .utils import log_error
-
-# .envファイルの読み込み
-load_dotenv()
+from .response_cache import invalidate_response_cache
+from .database import get_db_session
+from .master_cache import cached_master, invalidate_master_cache
+from .daily_agg import new_affected_dates, add_affected_dates, collect_lot_dates, refresh_daily_agg
 
 Base = declarative_base()
 
-def get_db_session():
-    """データベースセッションを取得"""
-    try:
-        DATABASE_URL = (
-            f"mysql+pymysql://"
-            f"{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
-            f"{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
-        )
-        
-        engine = create_engine(DATABASE_URL)
-        Session = sessionmaker(bind=engine)
-        return Session()
-    except Exception as e:
-        log_error(f'データベースセッションの取得中にエラーが発生しました: {str(e)}')
-        return None
-
-
     
 class WorkerModel(db.Model):
     """従業員テーブルのSQLAlchemyモデル"""
@@ -41,6 +25,23 @@ class WorkerModel(db.Model):
     WRK_ID = db.Column(db.DECIMAL(3), primary_key=True, comment='従業員ID')
     WRK_NM = db.Column(db.String(100), comment='従業員名')
     
+    @staticmethod
+    def get_all():
+        """全ての従業員を取得（マスタキャッシュを使用）"""
+        def load():
+            session = get_db_session()
+            if not session:
+                raise RuntimeError('データベースセッションの取得に失敗しました')
+            try:
+                return session.query(WorkerModel).all()
+            finally:
+                session.close()
+        
+        try:
+            return cached_master(('WRK_MST',), load)
+        except Exception as e:
+            log_error(f'従業員データの取得中にエラーが発生しました: {str(e)}')
+            return []
 
 
 class SjiDatModel(db.Model):
@@ -58,8 +59,14 @@ class SjiDatModel(db.Model):
     prd_mst = db.relationship('PrdMstModel', backref='sji_records', foreign_keys=[SJI_PRD_ID])
     
     @staticmethod
-    def import_from_csv(file_path, encoding='shift_jis'):
-        """CSVファイルから指示データをインポートする"""
+    def import_from_csv(file_path, encoding='shift_jis', progress=None):
+        """
+        CSVファイルから指示データをインポートする
+
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
+        if progress is None:
+            progress = new_import_progress()
         try:
             session = get_db_session()
             if not session:
@@ -70,6 +77,7 @@ class SjiDatModel(db.Model):
                 next(reader)  # ヘッダー行をスキップ
                 
                 for row in reader:
+                    progress['read_rows'] += 1
                     prd_id = row[1]
                     sji_date = row[2]
                     sji_qty = row[13]
@@ -78,6 +86,7 @@ class SjiDatModel(db.Model):
                         SjiDatModel.SJI_PRD_ID == prd_id, 
                         SjiDatModel.SJI_DATE == sji_date).first()
                     if query:
+                        progress['skipped_rows'] += 1
                         continue
                     
                     sji_record = SjiDatModel(
@@ -87,8 +96,12 @@ class SjiDatModel(db.Model):
                     )
                     session.add(sji_record)     
                     
+            progress['stage'] = '登録'
             session.commit()
             session.close()
+            progress['written_rows'] = progress['read_rows'] - progress['skipped_rows']
+            progress['chunks'] = 1
+            progress['stage'] = '完了'
             return True, 'データのインポートが完了しました'
         except Exception as e:
             log_error(f'指示データのインポート中にエラーが発生しました: {str(e)}')
@@ -251,439 +264,469 @@ class PrdRecordModel(db.Model):
             log_error(f'未検査品データの取得中にエラーが発生しました: {str(e)}')
             return []
 
+
+class PrdDailyAggModel(db.Model):
+    """
+    生産実績日別集計テーブル（PRD_DAILY_AGG）のSQLAlchemyモデル
+
+    数量の属性名はPrdRecordModelと同じにしてあり（列名はPDA_）、
+    PRD_RECORDと同じ集計式をそのまま適用できる。
+    """
+    __tablename__ = 'PRD_DAILY_AGG'
+
+    PDA_ID = db.Column(db.BigInteger, primary_key=True, autoincrement=True, comment='ID')
+    PDA_DATE_KBN = db.Column(db.String(3), nullable=False, comment='日付区分(R1/R2/CHK)')
+    PDA_DATE = db.Column(db.Date, comment='日付')
+    PRR_MONO_SYU = db.Column('PDA_MONO_SYU', db.String(1), comment='モノマー種')
+    PRR_PRD_ID = db.Column('PDA_PRD_ID', db.String(5), comment='製品ID')
+    PDA_CHK3_FLG = db.Column(db.DECIMAL(1), nullable=False, default=0, comment='三次検査済み')
+    PDA_LOT_CNT = db.Column(db.Integer, nullable=False, default=0, comment='ロット数')
+    PRR_INJECT_QTY = db.Column('PDA_INJECT_QTY', db.DECIMAL(10), comment='注入数')
+    PRR_ROLL_MISS = db.Column('PDA_ROLL_MISS', db.DECIMAL(10), comment='巻きミス')
+    PRR_R1_BUB_CHK = db.Column('PDA_R1_BUB_CHK', db.DECIMAL(10), comment='R1泡(検品)')
+    PRR_CURL_INS = db.Column('PDA_CURL_INS', db.DECIMAL(10), comment='カール(検品)')
+    PRR_FILM_FLT_CK = db.Column('PDA_FILM_FLT_CK', db.DECIMAL(10), comment='膜浮き(検品)')
+    PRR_LEAK = db.Column('PDA_LEAK', db.DECIMAL(10), comment='モレ')
+    PRR_FILM_PULL = db.Column('PDA_FILM_PULL', db.DECIMAL(10), comment='膜ひっぱり')
+    PRR_FILM_NG_CK = db.Column('PDA_FILM_NG_CK', db.DECIMAL(10), comment='膜不良(検品)')
+    PRR_R2_BUB_REK = db.Column('PDA_R2_BUB_REK', db.DECIMAL(10), comment='R2泡(離型)')
+    PRR_CRACK = db.Column('PDA_CRACK', db.DECIMAL(10), comment='ワレ')
+    PRR_TEAR_RLS = db.Column('PDA_TEAR_RLS', db.DECIMAL(10), comment='チギレ(離型)')
+    PRR_TEAR = db.Column('PDA_TEAR', db.DECIMAL(10), comment='チギレ')
+    PRR_PEEL = db.Column('PDA_PEEL', db.DECIMAL(10), comment='ハガレ')
+    PRR_CHIP = db.Column('PDA_CHIP', db.DECIMAL(10), comment='カケ')
+    PRR_POLY_CRK = db.Column('PDA_POLY_CRK', db.DECIMAL(10), comment='重合ワレ')
+    PRR_MOLD_SCR = db.Column('PDA_MOLD_SCR', db.DECIMAL(10), comment='型キズ')
+    PRR_LENS_SCR = db.Column('PDA_LENS_SCR', db.DECIMAL(10), comment='レンズキズ')
+    PRR_R1_BUBBLE = db.Column('PDA_R1_BUBBLE', db.DECIMAL(10), comment='R1泡')
+    PRR_R2_BUBBLE = db.Column('PDA_R2_BUBBLE', db.DECIMAL(10), comment='R2泡')
+    PRR_DEFECT = db.Column('PDA_DEFECT', db.DECIMAL(10), comment='ブツ')
+    PRR_ELUTION = db.Column('PDA_ELUTION', db.DECIMAL(10), comment='溶出')
+    PRR_HAZE = db.Column('PDA_HAZE', db.DECIMAL(10), comment='モヤ')
+    PRR_CURL = db.Column('PDA_CURL', db.DECIMAL(10), comment='カール')
+    PRR_FILM_FLOAT = db.Column('PDA_FILM_FLOAT', db.DECIMAL(10), comment='膜浮き')
+    PRR_R1_DEFECT = db.Column('PDA_R1_DEFECT', db.DECIMAL(10), comment='R1不良')
+    PRR_FILM_NG = db.Column('PDA_FILM_NG', db.DECIMAL(10), comment='膜不良')
+    PRR_FOREIGN = db.Column('PDA_FOREIGN', db.DECIMAL(10), comment='イブツ')
+    PRR_CUT_WASTE = db.Column('PDA_CUT_WASTE', db.DECIMAL(10), comment='カットくず')
+    PRR_FIBER = db.Column('PDA_FIBER', db.DECIMAL(10), comment='センイ')
+    PRR_MOLD_DIRT = db.Column('PDA_MOLD_DIRT', db.DECIMAL(10), comment='モールド汚れ')
+    PRR_FILM_DIRT = db.Column('PDA_FILM_DIRT', db.DECIMAL(10), comment='膜汚れ')
+    PRR_AXIS_1ST = db.Column('PDA_AXIS_1ST', db.DECIMAL(10), comment='片軸(一次)')
+    PRR_STRIPE_1ST = db.Column('PDA_STRIPE_1ST', db.DECIMAL(10), comment='脈理(一次)')
+    PRR_EDGE_DEFECT = db.Column('PDA_EDGE_DEFECT', db.DECIMAL(10), comment='コバスリ不良')
+    PRR_ECC_1ST = db.Column('PDA_ECC_1ST', db.DECIMAL(10), comment='偏心不良(一次)')
+    PRR_WASH_DROP = db.Column('PDA_WASH_DROP', db.DECIMAL(10), comment='洗浄落下')
+    PRR_UNKNOWN = db.Column('PDA_UNKNOWN', db.DECIMAL(10), comment='不明')
+    PRR_OTHER_1 = db.Column('PDA_OTHER_1', db.DECIMAL(10), comment='その他1')
+    PRR_OTHER_2 = db.Column('PDA_OTHER_2', db.DECIMAL(10), comment='その他2')
+    PRR_ECC_DEFECT = db.Column('PDA_ECC_DEFECT', db.DECIMAL(10), comment='偏心不良')
+    PRR_DROP = db.Column('PDA_DROP', db.DECIMAL(10), comment='落下')
+    PRR_COUNT_ERR = db.Column('PDA_COUNT_ERR', db.DECIMAL(10), comment='員数違い')
+    PRR_OTHER_1ST = db.Column('PDA_OTHER_1ST', db.DECIMAL(10), comment='その他(一次)')
+    PRR_PEEL_2ND = db.Column('PDA_PEEL_2ND', db.DECIMAL(10), comment='ハガレ(二次)')
+    PRR_STRIPE_2ND = db.Column('PDA_STRIPE_2ND', db.DECIMAL(10), comment='脈理(二次)')
+    PRR_SUCTION = db.Column('PDA_SUCTION', db.DECIMAL(10), comment='吸い込み')
+    PRR_MOLD_2ND = db.Column('PDA_MOLD_2ND', db.DECIMAL(10), comment='型キズ(二次)')
+    PRR_FILM_2ND = db.Column('PDA_FILM_2ND', db.DECIMAL(10), comment='膜不良(二次)')
+    PRR_DEFECT_2ND = db.Column('PDA_DEFECT_2ND', db.DECIMAL(10), comment='ブツ(二次)')
+    PRR_OTHER_2ND = db.Column('PDA_OTHER_2ND', db.DECIMAL(10), comment='その他(二次)')
+    PRR_AXIS_DEF = db.Column('PDA_AXIS_DEF', db.DECIMAL(10), comment='軸不良')
+    PRR_FILM_3RD = db.Column('PDA_FILM_3RD', db.DECIMAL(10), comment='膜浮き(三次)')
+    PRR_COLOR_DEF = db.Column('PDA_COLOR_DEF', db.DECIMAL(10), comment='カラー不良')
+    PRR_TRANS_DEF = db.Column('PDA_TRANS_DEF', db.DECIMAL(10), comment='透過率不良')
+    PRR_CURVE_DEF = db.Column('PDA_CURVE_DEF', db.DECIMAL(10), comment='カーブ不良')
+    PRR_CEN_TH_DEF = db.Column('PDA_CEN_TH_DEF', db.DECIMAL(10), comment='中心厚不良')
+    PRR_DIAM_DEF = db.Column('PDA_DIAM_DEF', db.DECIMAL(10), comment='径不良')
+    PRR_R1_TH_DEF = db.Column('PDA_R1_TH_DEF', db.DECIMAL(10), comment='R1厚み不良')
+    PRR_ECC_3RD = db.Column('PDA_ECC_3RD', db.DECIMAL(10), comment='偏心不良(三次)')
+    PRR_EDGE_DEF_3 = db.Column('PDA_EDGE_DEF_3', db.DECIMAL(10), comment='膜汚れ(三次)')
+    PRR_AXIS_3RD = db.Column('PDA_AXIS_3RD', db.DECIMAL(10), comment='片軸(三次)')
+    PRR_OTHER_3RD = db.Column('PDA_OTHER_3RD', db.DECIMAL(10), comment='その他(三次)')
+    PRR_A_GRADE = db.Column('PDA_A_GRADE', db.DECIMAL(10), comment='A品')
+    PRR_B_GRADE = db.Column('PDA_B_GRADE', db.DECIMAL(10), comment='B品')
+
+    @staticmethod
+    def filter_period(query, date_kbn, date_from=None, date_to=None, chk3_only=False):
+        """
+        日付区分と期間で集計行を絞り込む
+
+        引数:
+            date_kbn: 日付区分（'R1': R1注入日, 'R2': R2注入日, 'CHK': 検査日）
+            date_from, date_to: 期間（両端を含む。Noneは無制限）
+            chk3_only: 三次検査済みの実績に限定するか
+        """
+        query = query.filter(PrdDailyAggModel.PDA_DATE_KBN == date_kbn)
+        if date_from:
+            query = query.filter(PrdDailyAggModel.PDA_DATE >= date_from)
+        if date_to:
+            query = query.filter(PrdDailyAggModel.PDA_DATE <= date_to)
+        if chk3_only:
+            query = query.filter(PrdDailyAggModel.PDA_CHK3_FLG == 1)
+        return query
+
+
+# 生産実績CSV取込で1回のexecutemanyにまとめる件数
+PRD_IMPORT_CHUNK_SIZE = int(os.getenv('PRD_IMPORT_CHUNK_SIZE', 1000))
+
+# 生産実績CSV取込でINSERTする列（バインド名は列名と同じ）
+PRD_RECORD_IMPORT_COLUMNS = (
+    'PRR_LOT_NO', 'PRR_PRD_ID', 'PRR_R1_IN_DATE', 'PRR_R1_TANK', 'PRR_R2_TANK',
+    'PRR_MONO_BATCH', 'PRR_R2_INJECT', 'PRR_FILM_DATE', 'PRR_R1_INJECT',
+    'PRR_INJECT_QTY', 'PRR_ROLL_MISS', 'PRR_R1_BUB_CHK', 'PRR_CURL_INS',
+    'PRR_FILM_FLT_CK', 'PRR_LEAK', 'PRR_FILM_PULL', 'PRR_FILM_NG_CK',
+    'PRR_R2_BUB_REK', 'PRR_CRACK', 'PRR_TEAR_RLS', 'PRR_TEAR', 'PRR_PEEL',
+    'PRR_CHIP', 'PRR_POLY_CRK', 'PRR_MOLD_SCR', 'PRR_LENS_SCR', 'PRR_R1_BUBBLE',
+    'PRR_R2_BUBBLE', 'PRR_DEFECT', 'PRR_ELUTION', 'PRR_HAZE', 'PRR_CURL',
+    'PRR_FILM_FLOAT', 'PRR_R1_DEFECT', 'PRR_FILM_NG', 'PRR_FOREIGN',
+    'PRR_CUT_WASTE', 'PRR_FIBER', 'PRR_MOLD_DIRT', 'PRR_FILM_DIRT',
+    'PRR_AXIS_1ST', 'PRR_STRIPE_1ST', 'PRR_EDGE_DEFECT', 'PRR_ECC_1ST',
+    'PRR_WASH_DROP', 'PRR_UNKNOWN', 'PRR_OTHER_1', 'PRR_OTHER_2',
+    'PRR_ECC_DEFECT', 'PRR_DROP', 'PRR_COUNT_ERR', 'PRR_OTHER_1ST',
+    'PRR_PEEL_2ND', 'PRR_STRIPE_2ND', 'PRR_SUCTION', 'PRR_MOLD_2ND',
+    'PRR_FILM_2ND', 'PRR_DEFECT_2ND', 'PRR_OTHER_2ND', 'PRR_AXIS_DEF',
+    'PRR_FILM_3RD', 'PRR_COLOR_DEF', 'PRR_TRANS_DEF', 'PRR_CURVE_DEF',
+    'PRR_CEN_TH_DEF', 'PRR_DIAM_DEF', 'PRR_R1_TH_DEF', 'PRR_ECC_3RD',
+    'PRR_EDGE_DEF_3', 'PRR_AXIS_3RD', 'PRR_OTHER_3RD', 'PRR_A_GRADE',
+    'PRR_B_GRADE', 'PRR_R1_IN_COM', 'PRR_R1_CHK_COM', 'PRR_R2_IN_COM',
+    'PRR_REL_COM', 'PRR_RELEASE_BY', 'PRR_ANNEAL_BY', 'PRR_CHK1_BY',
+    'PRR_CHK2_BY', 'PRR_CHK3_BY', 'PRR_R1_GOOD_CNT', 'PRR_ANNEAL_TNK',
+    'PRR_R2_DATE', 'PRR_R2__QTY', 'PRR_RELEASE_DT', 'PRR_CHK_DT', 'PRR_MONO_SYU',
+)
+
+# 重複時に上書きしない列（工程日付・R2注入数はimport_from_csv2で更新する）
+_PRD_RECORD_KEEP_ON_DUPLICATE = ('PRR_LOT_NO', 'PRR_R2_DATE', 'PRR_R2__QTY', 'PRR_RELEASE_DT', 'PRR_CHK_DT')
+
+# PyMySQLのexecutemanyで複数行INSERTに展開される形式のUPSERT文
+PRD_RECORD_UPSERT_SQL = (
+    f"INSERT INTO PRD_RECORD ({', '.join(PRD_RECORD_IMPORT_COLUMNS)}) "
+    f"VALUES ({', '.join(':' + col for col in PRD_RECORD_IMPORT_COLUMNS)}) "
+    f"ON DUPLICATE KEY UPDATE "
+    + ', '.join(
+        f'{col} = VALUES({col})'
+        for col in PRD_RECORD_IMPORT_COLUMNS
+        if col not in _PRD_RECORD_KEEP_ON_DUPLICATE
+    )
+)
+
+# import_from_csv2の工程区分（CSV11列目）ごとの更新内容（実行順）
+PRD_STAGE_UPDATES = {
+    '4': ('R2注入', 'p.PRR_R2_DATE = s.STG_DATE, p.PRR_R2__QTY = s.STG_QTY, p.PRR_R2_DATETIME = s.STG_DATETIME'),
+    '10': ('検査', 'p.PRR_CHK_DT = s.STG_DATE'),
+    '5': ('R2重合', 'p.PRR_R2_JG_DT = s.STG_DATE'),
+    '6': ('離型', 'p.PRR_RELEASE_DT = s.STG_DATE'),
+    '7': ('アニール', 'p.PRR_ANNEAL_DT = s.STG_DATE'),
+    '8': ('一次検査', 'p.PRR_CHK1_DT = s.STG_DATE'),
+    '9': ('二次検査', 'p.PRR_CHK2_DT = s.STG_DATE'),
+    '2': ('R1重合', 'p.PRR_R1_JG_DT = s.STG_DATE'),
+    '3': ('R1検品', 'p.PRR_R1_CHK_DT = s.STG_DATE'),
+}
+
+# 日別集計の日付区分に影響する工程（工程区分 → 更新されるPRD_RECORDの日付列）
+PRD_STAGE_AGG_COLUMNS = {
+    '4': 'PRR_R2_DATE',
+    '10': 'PRR_CHK_DT',
+}
+
+def _batched(iterable, size):
+    """イテラブルをsize件ずつのリストに分けて返すジェネレータ"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def new_import_progress():
+    """CSV取込の進捗カウンタを作成（取込中に呼び出し側から参照できる）"""
+    return {
+        'stage': '読込',       # 処理中の段階
+        'read_rows': 0,        # 読み込んだ行数
+        'skipped_rows': 0,     # 列数不足・変換エラーで読み飛ばした行数
+        'written_rows': 0,     # 登録（INSERT/UPDATE）した行数
+        'chunks': 0,           # コミットしたチャンク数
+        'deleted_lots': 0,     # 削除対象の旧ロットNo数
+    }
+
+
 class PrdRecord:
     @staticmethod
-    def import_from_csv(file_path, encoding='shift_jis'):
-        """CSVファイルから生産実績データをインポート"""
+    def _load_import_masters(session):
+        """生産実績CSV取込で使うマスタ（作業者・機械・製品種別）を辞書で取得"""
+        masters = {}
+        for name, sql, key, value, label in (
+            ('worker', "SELECT WRK_ID, WRK_NM FROM WRK_MST", 'WRK_NM', 'WRK_ID', 'ワーカー情報'),
+            ('machine', "SELECT MCN_ID, MCN_NM FROM MCN_MST", 'MCN_NM', 'MCN_ID', 'マシン情報'),
+            ('prd_typ', "SELECT PRD_ID, PRD_TYP FROM PRD_MST", 'PRD_ID', 'PRD_TYP', '製品マスタ情報'),
+        ):
+            try:
+                masters[name] = {
+                    getattr(row, key): getattr(row, value)
+                    for row in session.execute(text(sql))
+                }
+            except Exception as e:
+                log_error(f'{label}の取得中にエラーが発生しました: {str(e)}')
+                raise
+        return masters
+
+    @staticmethod
+    def _normalize_csv_row(row, masters):
+        """
+        生産実績CSVの1行を登録用の辞書に変換する
+
+        Returns:
+            tuple: (登録用の辞書, 削除対象の旧ロットNo または None)
+        """
+        worker_map = masters['worker']
+        machine_map = masters['machine']
+        prd_typ_map = masters['prd_typ']
+        delete_key = None
+
+        siji_no = row[0].split('-')[0]
+        if len(siji_no) == 10:
+            edit_row = {}
+            monoSyu = row[0][:1] if len(row[0]) > 1 else row[0]
+            prdId = row[0][:4] if len(row[0]) > 4 else row[0]
+            if prdId in prd_typ_map:
+                monoSyu = prd_typ_map[prdId]
+                
+            if len(row[0]) > 13:
+                delete_key = row[0][:13]
+        elif len(siji_no) == 11:
+            edit_row = {}
+            monoSyu = row[0][:1] if len(row[0]) > 1 else row[0]
+            prdId = row[0][:5] if len(row[0]) > 5 else row[0]
+            if prdId in prd_typ_map:
+                monoSyu = prd_typ_map[prdId]
+                
+            if len(row[0]) > 14:
+                delete_key = row[0][:14]
+                
+        else:
+            raise ValueError(f'ロットNoの形式が不正です: {row[0]}')
+            
+        try:
+            r2_in = row[5].split(',')
+            r2_str = r2_in[0]
+        except:
+            r2_str = row[5]
+        
+        # データの変換と格納（元のコードを維持）
+        edit_row['PRR_LOT_NO'] = row[0]
+        edit_row['PRR_PRD_ID'] = prdId
+        edit_row['PRR_R1_IN_DATE'] = parse_date(row[1])
+        edit_row['PRR_R1_TANK'] = machine_map.get(row[2], None)
+        edit_row['PRR_R2_TANK'] = machine_map.get(row[3], None)
+        edit_row['PRR_MONO_BATCH'] = row[4]
+        edit_row['PRR_R2_INJECT'] = worker_map.get(r2_str, None)
+        edit_row['PRR_FILM_DATE'] = parse_date(row[6])
+        edit_row['PRR_R1_INJECT'] = worker_map.get(row[7], None)
+        edit_row['PRR_INJECT_QTY'] = str_to_flt(row[12])
+        edit_row['PRR_ROLL_MISS'] = str_to_flt(row[13])
+        edit_row['PRR_R1_BUB_CHK'] = str_to_flt(row[14])
+        edit_row['PRR_CURL_INS'] = str_to_flt(row[15])
+        edit_row['PRR_FILM_FLT_CK'] = str_to_flt(row[16])   
+        edit_row['PRR_LEAK'] = str_to_flt(row[17])
+        edit_row['PRR_FILM_PULL'] = str_to_flt(row[18])
+        edit_row['PRR_FILM_NG_CK'] = str_to_flt(row[19])
+        edit_row['PRR_R2_BUB_REK'] = str_to_flt(row[20])
+        edit_row['PRR_CRACK'] = str_to_flt(row[21])
+        edit_row['PRR_TEAR_RLS'] = str_to_flt(row[22])
+        edit_row['PRR_TEAR'] = str_to_flt(row[23])
+        edit_row['PRR_PEEL'] = str_to_flt(row[24])  
+        edit_row['PRR_CHIP'] = str_to_flt(row[25])
+        edit_row['PRR_POLY_CRK'] = str_to_flt(row[26])
+        edit_row['PRR_MOLD_SCR'] = str_to_flt(row[27])
+        edit_row['PRR_LENS_SCR'] = str_to_flt(row[28])
+        edit_row['PRR_R1_BUBBLE'] = str_to_flt(row[29])
+        edit_row['PRR_R2_BUBBLE'] = str_to_flt(row[30])
+        edit_row['PRR_DEFECT'] = str_to_flt(row[31])
+        edit_row['PRR_ELUTION'] = str_to_flt(row[32])    
+        edit_row['PRR_HAZE'] = str_to_flt(row[33])
+        edit_row['PRR_CURL'] = str_to_flt(row[34])
+        edit_row['PRR_FILM_FLOAT'] = str_to_flt(row[35])
+        edit_row['PRR_R1_DEFECT'] = str_to_flt(row[36])
+        edit_row['PRR_FILM_NG'] = str_to_flt(row[37])
+        edit_row['PRR_FOREIGN'] = str_to_flt(row[38])
+        edit_row['PRR_CUT_WASTE'] = str_to_flt(row[39])
+        edit_row['PRR_FIBER'] = str_to_flt(row[40])  
+        edit_row['PRR_MOLD_DIRT'] = str_to_flt(row[41])
+        edit_row['PRR_FILM_DIRT'] = str_to_flt(row[42])
+        edit_row['PRR_AXIS_1ST'] = str_to_flt(row[43])
+        edit_row['PRR_STRIPE_1ST'] = str_to_flt(row[44])
+        edit_row['PRR_EDGE_DEFECT'] = str_to_flt(row[45])
+        edit_row['PRR_ECC_1ST'] = str_to_flt(row[46])    
+        edit_row['PRR_WASH_DROP'] = str_to_flt(row[47])
+        edit_row['PRR_UNKNOWN'] = str_to_flt(row[48])
+        edit_row['PRR_OTHER_1'] = str_to_flt(row[49])
+        edit_row['PRR_OTHER_2'] = str_to_flt(row[50])
+        edit_row['PRR_ECC_DEFECT'] = str_to_flt(row[51])
+        edit_row['PRR_DROP'] = str_to_flt(row[52])   
+        edit_row['PRR_COUNT_ERR'] = str_to_flt(row[53])
+        edit_row['PRR_OTHER_1ST'] = str_to_flt(row[54])
+        edit_row['PRR_PEEL_2ND'] = str_to_flt(row[55])
+        edit_row['PRR_STRIPE_2ND'] = str_to_flt(row[56])
+        edit_row['PRR_SUCTION'] = str_to_flt(row[57])
+        edit_row['PRR_MOLD_2ND'] = str_to_flt(row[58])   
+        edit_row['PRR_FILM_2ND'] = str_to_flt(row[59])
+        edit_row['PRR_DEFECT_2ND'] = str_to_flt(row[60])
+        edit_row['PRR_OTHER_2ND'] = str_to_flt(row[61])
+        edit_row['PRR_AXIS_DEF'] = str_to_flt(row[62])
+        edit_row['PRR_FILM_3RD'] = str_to_flt(row[63])   
+        edit_row['PRR_COLOR_DEF'] = str_to_flt(row[64])
+        edit_row['PRR_TRANS_DEF'] = str_to_flt(row[65])
+        edit_row['PRR_CURVE_DEF'] = str_to_flt(row[66])
+        edit_row['PRR_CEN_TH_DEF'] = str_to_flt(row[67])
+        edit_row['PRR_DIAM_DEF'] = str_to_flt(row[68])
+        edit_row['PRR_R1_TH_DEF'] = str_to_flt(row[69])  
+        edit_row['PRR_ECC_3RD'] = str_to_flt(row[70])
+        edit_row['PRR_EDGE_DEF_3'] = str_to_flt(row[71])
+        edit_row['PRR_AXIS_3RD'] = str_to_flt(row[72])
+        edit_row['PRR_OTHER_3RD'] = str_to_flt(row[73])
+        edit_row['PRR_A_GRADE'] = str_to_flt(row[74])
+        edit_row['PRR_B_GRADE'] = str_to_flt(row[75])    
+        edit_row['PRR_R1_IN_COM'] = row[76]
+        edit_row['PRR_R1_CHK_COM'] = row[77]
+        edit_row['PRR_R2_IN_COM'] = row[78]
+        edit_row['PRR_REL_COM'] = row[79]
+        edit_row['PRR_RELEASE_BY'] = worker_map.get(row[80], None)
+        edit_row['PRR_ANNEAL_BY'] = worker_map.get(row[81], None)  
+        edit_row['PRR_CHK1_BY'] = worker_map.get(row[82], None)
+        edit_row['PRR_CHK2_BY'] = worker_map.get(row[83], None)
+        edit_row['PRR_CHK3_BY'] = worker_map.get(row[84], None)
+        edit_row['PRR_R1_GOOD_CNT'] = str_to_flt(row[87])
+        edit_row['PRR_ANNEAL_TNK'] = machine_map.get(row[88], None)
+        edit_row['PRR_R2_DATE'] = None
+        edit_row['PRR_R2__QTY'] = 0
+        edit_row['PRR_RELEASE_DT'] = None
+        edit_row['PRR_CHK_DT'] = None
+        edit_row['PRR_MONO_SYU'] = monoSyu
+        edit_row['PRR_R2_JG_DT'] = None
+        edit_row['PRR_ANNEAL_DT'] = None
+        edit_row['PRR_CHK1_DT'] = None
+        edit_row['PRR_CHK2_DT'] = None
+
+        return edit_row, delete_key
+
+    @staticmethod
+    def _iter_csv_records(file_path, encoding, masters, delete_keys, progress):
+        """
+        生産実績CSVを1行ずつ読み込み、登録用の辞書を順に返すジェネレータ
+
+        削除対象の旧ロットNoはdelete_keys（set）に追加する。
+        """
+        with open(file_path, 'r', encoding=encoding) as f:
+            for row in csv.reader(f):
+                progress['read_rows'] += 1
+                try:
+                    # 行が空でないことを確認
+                    if not row or len(row) < 89:  # 必要な列数
+                        progress['skipped_rows'] += 1
+                        continue
+                    edit_row, delete_key = PrdRecord._normalize_csv_row(row, masters)
+                except Exception as e:
+                    progress['skipped_rows'] += 1
+                    log_error(f'行の処理中にエラーが発生しました: {str(e)}, 行: {row}')
+                    continue
+                if delete_key:
+                    delete_keys.add(delete_key)
+                yield edit_row
+
+    @staticmethod
+    def import_from_csv(file_path, encoding='shift_jis', chunk_size=PRD_IMPORT_CHUNK_SIZE, progress=None):
+        """
+        CSVファイルから生産実績データをインポート
+        
+        読込 → 変換 → chunk_size件ずつのバッチ → 書き込み をジェネレータでつなぎ、
+        メモリ上には1バッチ分の行のみを保持する。
+        製品マスタは取込開始時に一度だけ辞書へ読み込み、行ごとの問い合わせは行わない。
+        書き込みは複数行INSERT（ON DUPLICATE KEY UPDATE）で行い、チャンクごとにコミットする。
+        結果メッセージには処理速度（件/秒）を含める。
+        取込・削除したロットの日付（変更前と変更後）について日別集計（PRD_DAILY_AGG）を再集計する。
+        再集計はチャンクと同じトランザクションで行うため、途中のチャンクで失敗しても
+        コミット済みの行と日別集計は一致する。
+        
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
         session = None
+        started = time.perf_counter()
+        if progress is None:
+            progress = new_import_progress()
         try:
             session = get_db_session()
             
             # マスタデータを一度だけ取得
-            worker_map = {}
-            worker_query = text("SELECT WRK_ID, WRK_NM FROM WRK_MST")
-            try:
-                for row in session.execute(worker_query):
-                    worker_map[row.WRK_NM] = row.WRK_ID
-            except Exception as e:
-                log_error(f'ワーカー情報の取得中にエラーが発生しました: {str(e)}')
-                raise
+            masters = PrdRecord._load_import_masters(session)
             
-            machine_map = {}
-            machine_query = text("SELECT MCN_ID, MCN_NM FROM MCN_MST")
-            try:
-                for row in session.execute(machine_query):
-                    machine_map[row.MCN_NM] = row.MCN_ID
-            except Exception as e:
-                log_error(f'マシン情報の取得中にエラーが発生しました: {str(e)}')
-                raise
-            log_error(f'読み取り開始')
-            
-            # CSVファイルを読み込みながら処理
-            records = []
-            delete_records = []
+            # 文字コードの確認（書き込み前に不正なファイルを検出するため、先に1行ずつ読み通す）
             try:
                 with open(file_path, 'r', encoding=encoding) as f:
-                    reader = csv.reader(f)
-                    
-                    for row in reader:
-                        try:
-                            # 行が空でないことを確認
-                            if not row or len(row) < 89:  # 必要な列数
-                                continue
-                            
-                            siji_no = row[0].split('-')[0]
-                            if len(siji_no) == 10:
-                            
-                                edit_row = {}
-                                monoSyu = row[0][:1] if len(row[0]) > 1 else row[0]
-                                prdId = row[0][:4] if len(row[0]) > 4 else row[0]
-                                from .master_models import PrdMstModel
-                                prdMst = PrdMstModel.query.filter_by(PRD_ID=prdId).first()
-                                if prdMst:
-                                    monoSyu = prdMst.PRD_TYP
-                                    
-                                if len(row[0]) > 13:
-                                    if not row[0][:13] in delete_records:
-                                        delete_records.append(row[0][:13])
-                            elif len(siji_no) == 11:
-                                edit_row = {}
-                                monoSyu = row[0][:1] if len(row[0]) > 1 else row[0]
-                                prdId = row[0][:5] if len(row[0]) > 5 else row[0]
-                                from .master_models import PrdMstModel
-                                prdMst = PrdMstModel.query.filter_by(PRD_ID=prdId).first()
-                                if prdMst:
-                                    monoSyu = prdMst.PRD_TYP
-                                    
-                                if len(row[0]) > 14:
-                                    if not row[0][:14] in delete_records:
-                                        delete_records.append(row[0][:14])
-                                        
-                            else:
-                                raise ValueError(f'ロットNoの形式が不正です: {row[0]}')
-                                    
-                            try:
-                                r2_in = row[5].split(',')
-                                r2_str = r2_in[0]
-                            except:
-                                r2_str = row[5]
-                            
-                            # データの変換と格納（元のコードを維持）
-                            edit_row['PRR_LOT_NO'] = row[0]
-                            edit_row['PRR_PRD_ID'] = prdId
-                            edit_row['PRR_R1_IN_DATE'] = parse_date(row[1])
-                            edit_row['PRR_R1_TANK'] = machine_map.get(row[2], None)
-                            edit_row['PRR_R2_TANK'] = machine_map.get(row[3], None)
-                            edit_row['PRR_MONO_BATCH'] = row[4]
-                            edit_row['PRR_R2_INJECT'] = worker_map.get(r2_str, None)
-                            edit_row['PRR_FILM_DATE'] = parse_date(row[6])
-                            edit_row['PRR_R1_INJECT'] = worker_map.get(row[7], None)
-                            edit_row['PRR_INJECT_QTY'] = str_to_flt(row[12])
-                            edit_row['PRR_ROLL_MISS'] = str_to_flt(row[13])
-                            edit_row['PRR_R1_BUB_CHK'] = str_to_flt(row[14])
-                            edit_row['PRR_CURL_INS'] = str_to_flt(row[15])
-                            edit_row['PRR_FILM_FLT_CK'] = str_to_flt(row[16])   
-                            edit_row['PRR_LEAK'] = str_to_flt(row[17])
-                            edit_row['PRR_FILM_PULL'] = str_to_flt(row[18])
-                            edit_row['PRR_FILM_NG_CK'] = str_to_flt(row[19])
-                            edit_row['PRR_R2_BUB_REK'] = str_to_flt(row[20])
-                            edit_row['PRR_CRACK'] = str_to_flt(row[21])
-                            edit_row['PRR_TEAR_RLS'] = str_to_flt(row[22])
-                            edit_row['PRR_TEAR'] = str_to_flt(row[23])
-                            edit_row['PRR_PEEL'] = str_to_flt(row[24])  
-                            edit_row['PRR_CHIP'] = str_to_flt(row[25])
-                            edit_row['PRR_POLY_CRK'] = str_to_flt(row[26])
-                            edit_row['PRR_MOLD_SCR'] = str_to_flt(row[27])
-                            edit_row['PRR_LENS_SCR'] = str_to_flt(row[28])
-                            edit_row['PRR_R1_BUBBLE'] = str_to_flt(row[29])
-                            edit_row['PRR_R2_BUBBLE'] = str_to_flt(row[30])
-                            edit_row['PRR_DEFECT'] = str_to_flt(row[31])
-                            edit_row['PRR_ELUTION'] = str_to_flt(row[32])    
-                            edit_row['PRR_HAZE'] = str_to_flt(row[33])
-                            edit_row['PRR_CURL'] = str_to_flt(row[34])
-                            edit_row['PRR_FILM_FLOAT'] = str_to_flt(row[35])
-                            edit_row['PRR_R1_DEFECT'] = str_to_flt(row[36])
-                            edit_row['PRR_FILM_NG'] = str_to_flt(row[37])
-                            edit_row['PRR_FOREIGN'] = str_to_flt(row[38])
-                            edit_row['PRR_CUT_WASTE'] = str_to_flt(row[39])
-                            edit_row['PRR_FIBER'] = str_to_flt(row[40])  
-                            edit_row['PRR_MOLD_DIRT'] = str_to_flt(row[41])
-                            edit_row['PRR_FILM_DIRT'] = str_to_flt(row[42])
-                            edit_row['PRR_AXIS_1ST'] = str_to_flt(row[43])
-                            edit_row['PRR_STRIPE_1ST'] = str_to_flt(row[44])
-                            edit_row['PRR_EDGE_DEFECT'] = str_to_flt(row[45])
-                            edit_row['PRR_ECC_1ST'] = str_to_flt(row[46])    
-                            edit_row['PRR_WASH_DROP'] = str_to_flt(row[47])
-                            edit_row['PRR_UNKNOWN'] = str_to_flt(row[48])
-                            edit_row['PRR_OTHER_1'] = str_to_flt(row[49])
-                            edit_row['PRR_OTHER_2'] = str_to_flt(row[50])
-                            edit_row['PRR_ECC_DEFECT'] = str_to_flt(row[51])
-                            edit_row['PRR_DROP'] = str_to_flt(row[52])   
-                            edit_row['PRR_COUNT_ERR'] = str_to_flt(row[53])
-                            edit_row['PRR_OTHER_1ST'] = str_to_flt(row[54])
-                            edit_row['PRR_PEEL_2ND'] = str_to_flt(row[55])
-                            edit_row['PRR_STRIPE_2ND'] = str_to_flt(row[56])
-                            edit_row['PRR_SUCTION'] = str_to_flt(row[57])
-                            edit_row['PRR_MOLD_2ND'] = str_to_flt(row[58])   
-                            edit_row['PRR_FILM_2ND'] = str_to_flt(row[59])
-                            edit_row['PRR_DEFECT_2ND'] = str_to_flt(row[60])
-                            edit_row['PRR_OTHER_2ND'] = str_to_flt(row[61])
-                            edit_row['PRR_AXIS_DEF'] = str_to_flt(row[62])
-                            edit_row['PRR_FILM_3RD'] = str_to_flt(row[63])   
-                            edit_row['PRR_COLOR_DEF'] = str_to_flt(row[64])
-                            edit_row['PRR_TRANS_DEF'] = str_to_flt(row[65])
-                            edit_row['PRR_CURVE_DEF'] = str_to_flt(row[66])
-                            edit_row['PRR_CEN_TH_DEF'] = str_to_flt(row[67])
-                            edit_row['PRR_DIAM_DEF'] = str_to_flt(row[68])
-                            edit_row['PRR_R1_TH_DEF'] = str_to_flt(row[69])  
-                            edit_row['PRR_ECC_3RD'] = str_to_flt(row[70])
-                            edit_row['PRR_EDGE_DEF_3'] = str_to_flt(row[71])
-                            edit_row['PRR_AXIS_3RD'] = str_to_flt(row[72])
-                            edit_row['PRR_OTHER_3RD'] = str_to_flt(row[73])
-                            edit_row['PRR_A_GRADE'] = str_to_flt(row[74])
-                            edit_row['PRR_B_GRADE'] = str_to_flt(row[75])    
-                            edit_row['PRR_R1_IN_COM'] = row[76]
-                            edit_row['PRR_R1_CHK_COM'] = row[77]
-                            edit_row['PRR_R2_IN_COM'] = row[78]
-                            edit_row['PRR_REL_COM'] = row[79]
-                            edit_row['PRR_RELEASE_BY'] = worker_map.get(row[80], None)
-                            edit_row['PRR_ANNEAL_BY'] = worker_map.get(row[81], None)  
-                            edit_row['PRR_CHK1_BY'] = worker_map.get(row[82], None)
-                            edit_row['PRR_CHK2_BY'] = worker_map.get(row[83], None)
-                            edit_row['PRR_CHK3_BY'] = worker_map.get(row[84], None)
-                            edit_row['PRR_R1_GOOD_CNT'] = str_to_flt(row[87])
-                            edit_row['PRR_ANNEAL_TNK'] = machine_map.get(row[88], None)
-                            edit_row['PRR_R2_DATE'] = None
-                            edit_row['PRR_R2__QTY'] = 0
-                            edit_row['PRR_RELEASE_DT'] = None
-                            edit_row['PRR_CHK_DT'] = None
-                            edit_row['PRR_MONO_SYU'] = monoSyu
-                            edit_row['PRR_R2_JG_DT'] = None
-                            edit_row['PRR_ANNEAL_DT'] = None
-                            edit_row['PRR_CHK1_DT'] = None
-                            edit_row['PRR_CHK2_DT'] = None
-                            
-                            records.append(edit_row)
-                            
-                        except Exception as e:
-                            log_error(f'行の処理中にエラーが発生しました: {str(e)}, 行: {row}')
-                            continue
-                
+                    for _ in f:
+                        pass
             except UnicodeDecodeError as e:
                 log_error(f'CSVファイルの文字コード変換中にエラーが発生しました: {str(e)}')
                 return False, 'CSVファイルの文字コードが正しくありません。Shift-JIS形式であることを確認してください。'
-
-            if not records:
-                return False, 'データが読み込めませんでした。CSVファイルの形式を確認してください。'
             
-            total_processed = 0
+            log_error(f'読み取り開始')
             
-            log_error(f'レコード処理')
-            # レコードを一括で処理
-            for record in records:
+            delete_records = set()
+            
+            # チャンク単位でexecutemany（複数行INSERT）を実行し、日別集計とあわせてチャンクごとにコミット
+            stmt = text(PRD_RECORD_UPSERT_SQL)
+            records = PrdRecord._iter_csv_records(file_path, encoding, masters, delete_records, progress)
+            for chunk in _batched(records, chunk_size):
+                progress['stage'] = '登録'
                 try:
-                    stmt = text("""
-                        INSERT INTO PRD_RECORD (
-                            PRR_LOT_NO, PRR_PRD_ID, PRR_R1_IN_DATE, PRR_R1_TANK, PRR_R2_TANK,
-                            PRR_MONO_BATCH, PRR_R2_INJECT, PRR_FILM_DATE, PRR_R1_INJECT,
-                            PRR_INJECT_QTY, PRR_ROLL_MISS, PRR_R1_BUB_CHK, PRR_CURL_INS,
-                            PRR_FILM_FLT_CK, PRR_LEAK, PRR_FILM_PULL, PRR_FILM_NG_CK,
-                            PRR_R2_BUB_REK, PRR_CRACK, PRR_TEAR_RLS, PRR_TEAR, PRR_PEEL,
-                            PRR_CHIP, PRR_POLY_CRK, PRR_MOLD_SCR, PRR_LENS_SCR, PRR_R1_BUBBLE,
-                            PRR_R2_BUBBLE, PRR_DEFECT, PRR_ELUTION, PRR_HAZE, PRR_CURL,
-                            PRR_FILM_FLOAT, PRR_R1_DEFECT, PRR_FILM_NG, PRR_FOREIGN,
-                            PRR_CUT_WASTE, PRR_FIBER, PRR_MOLD_DIRT, PRR_FILM_DIRT,
-                            PRR_AXIS_1ST, PRR_STRIPE_1ST, PRR_EDGE_DEFECT, PRR_ECC_1ST,
-                            PRR_WASH_DROP, PRR_UNKNOWN, PRR_OTHER_1, PRR_OTHER_2,
-                            PRR_ECC_DEFECT, PRR_DROP, PRR_COUNT_ERR, PRR_OTHER_1ST,
-                            PRR_PEEL_2ND, PRR_STRIPE_2ND, PRR_SUCTION, PRR_MOLD_2ND,
-                            PRR_FILM_2ND, PRR_DEFECT_2ND, PRR_OTHER_2ND, PRR_AXIS_DEF,
-                            PRR_FILM_3RD, PRR_COLOR_DEF, PRR_TRANS_DEF, PRR_CURVE_DEF,
-                            PRR_CEN_TH_DEF, PRR_DIAM_DEF, PRR_R1_TH_DEF, PRR_ECC_3RD,
-                            PRR_EDGE_DEF_3, PRR_AXIS_3RD, PRR_OTHER_3RD, PRR_A_GRADE,
-                            PRR_B_GRADE, PRR_R1_IN_COM, PRR_R1_CHK_COM, PRR_R2_IN_COM,
-                            PRR_REL_COM, PRR_RELEASE_BY, PRR_ANNEAL_BY, PRR_CHK1_BY,
-                            PRR_CHK2_BY, PRR_CHK3_BY, PRR_R1_GOOD_CNT, PRR_ANNEAL_TNK,
-                            PRR_R2_DATE, PRR_R2__QTY, PRR_RELEASE_DT, PRR_CHK_DT, PRR_MONO_SYU
-                        ) VALUES (
-                            :lot_no, :prd_id, :r1_in_date, :r1_tank, :r2_tank,
-                            :mono_batch, :r2_inject, :film_date, :r1_inject,
-                            :inject_qty, :roll_miss, :r1_bubble_chk, :curl_ins,
-                            :film_float_ck, :leak, :film_pull, :film_ng_ck,
-                            :r2_bubble_rek, :crack, :tear_rls, :tear, :peel,
-                            :chip, :poly_crk, :mold_scr, :lens_scr, :r1_bubble,
-                            :r2_bubble, :defect, :elution, :haze, :curl,
-                            :film_float, :r1_defect, :film_ng, :foreign,
-                            :cut_waste, :fiber, :mold_dirt, :film_dirt,
-                            :axis_1st, :stripe_1st, :edge_defect, :ecc_1st,
-                            :wash_drop, :unknown, :other_1, :other_2,
-                            :ecc_defect, :drop, :count_err, :other_1st,
-                            :peel_2nd, :stripe_2nd, :suction, :mold_2nd,
-                            :film_2nd, :defect_2nd, :other_2nd, :axis_def,
-                            :film_3rd, :color_def, :trans_def, :curve_def,
-                            :cen_th_def, :diam_def, :r1_th_def, :ecc_3rd,
-                            :edge_def_3, :axis_3rd, :other_3rd, :a_grade,
-                            :b_grade, :r1_in_com, :r1_chk_com, :r2_in_com,
-                            :rel_com, :release_by, :anneal_by, :chk1_by,
-                            :chk2_by, :chk3_by, :r1_good_cnt, :anneal_tnk,
-                            :r2_date, :r2__qty, :release_dt, :chk_dt, :mono_syu
-                        )
-                        ON DUPLICATE KEY UPDATE
-                            PRR_PRD_ID = VALUES(PRR_PRD_ID),
-                            PRR_R1_IN_DATE = VALUES(PRR_R1_IN_DATE),
-                            PRR_R1_TANK = VALUES(PRR_R1_TANK),
-                            PRR_R2_TANK = VALUES(PRR_R2_TANK),
-                            PRR_MONO_BATCH = VALUES(PRR_MONO_BATCH),
-                            PRR_R2_INJECT = VALUES(PRR_R2_INJECT),
-                            PRR_FILM_DATE = VALUES(PRR_FILM_DATE),
-                            PRR_R1_INJECT = VALUES(PRR_R1_INJECT),
-                            PRR_INJECT_QTY = VALUES(PRR_INJECT_QTY),
-                            PRR_ROLL_MISS = VALUES(PRR_ROLL_MISS),
-                            PRR_R1_BUB_CHK = VALUES(PRR_R1_BUB_CHK),
-                            PRR_CURL_INS = VALUES(PRR_CURL_INS),
-                            PRR_FILM_FLT_CK = VALUES(PRR_FILM_FLT_CK),
-                            PRR_LEAK = VALUES(PRR_LEAK),
-                            PRR_FILM_PULL = VALUES(PRR_FILM_PULL),
-                            PRR_FILM_NG_CK = VALUES(PRR_FILM_NG_CK),
-                            PRR_R2_BUB_REK = VALUES(PRR_R2_BUB_REK),
-                            PRR_CRACK = VALUES(PRR_CRACK),
-                            PRR_TEAR_RLS = VALUES(PRR_TEAR_RLS),
-                            PRR_TEAR = VALUES(PRR_TEAR),
-                            PRR_PEEL = VALUES(PRR_PEEL),
-                            PRR_CHIP = VALUES(PRR_CHIP),
-                            PRR_POLY_CRK = VALUES(PRR_POLY_CRK),
-                            PRR_MOLD_SCR = VALUES(PRR_MOLD_SCR),
-                            PRR_LENS_SCR = VALUES(PRR_LENS_SCR),
-                            PRR_R1_BUBBLE = VALUES(PRR_R1_BUBBLE),
-                            PRR_R2_BUBBLE = VALUES(PRR_R2_BUBBLE),
-                            PRR_DEFECT = VALUES(PRR_DEFECT),
-                            PRR_ELUTION = VALUES(PRR_ELUTION),
-                            PRR_HAZE = VALUES(PRR_HAZE),
-                            PRR_CURL = VALUES(PRR_CURL),
-                            PRR_FILM_FLOAT = VALUES(PRR_FILM_FLOAT),
-                            PRR_R1_DEFECT = VALUES(PRR_R1_DEFECT),
-                            PRR_FILM_NG = VALUES(PRR_FILM_NG),
-                            PRR_FOREIGN = VALUES(PRR_FOREIGN),
-                            PRR_CUT_WASTE = VALUES(PRR_CUT_WASTE),
-                            PRR_FIBER = VALUES(PRR_FIBER),
-                            PRR_MOLD_DIRT = VALUES(PRR_MOLD_DIRT),
-                            PRR_FILM_DIRT = VALUES(PRR_FILM_DIRT),
-                            PRR_AXIS_1ST = VALUES(PRR_AXIS_1ST),
-                            PRR_STRIPE_1ST = VALUES(PRR_STRIPE_1ST),
-                            PRR_EDGE_DEFECT = VALUES(PRR_EDGE_DEFECT),
-                            PRR_ECC_1ST = VALUES(PRR_ECC_1ST),
-                            PRR_WASH_DROP = VALUES(PRR_WASH_DROP),
-                            PRR_UNKNOWN = VALUES(PRR_UNKNOWN),
-                            PRR_OTHER_1 = VALUES(PRR_OTHER_1),
-                            PRR_OTHER_2 = VALUES(PRR_OTHER_2),
-                            PRR_ECC_DEFECT = VALUES(PRR_ECC_DEFECT),
-                            PRR_DROP = VALUES(PRR_DROP),
-                            PRR_COUNT_ERR = VALUES(PRR_COUNT_ERR),
-                            PRR_OTHER_1ST = VALUES(PRR_OTHER_1ST),
-                            PRR_PEEL_2ND = VALUES(PRR_PEEL_2ND),
-                            PRR_STRIPE_2ND = VALUES(PRR_STRIPE_2ND),
-                            PRR_SUCTION = VALUES(PRR_SUCTION),
-                            PRR_MOLD_2ND = VALUES(PRR_MOLD_2ND),
-                            PRR_FILM_2ND = VALUES(PRR_FILM_2ND),
-                            PRR_DEFECT_2ND = VALUES(PRR_DEFECT_2ND),
-                            PRR_OTHER_2ND = VALUES(PRR_OTHER_2ND),
-                            PRR_AXIS_DEF = VALUES(PRR_AXIS_DEF),
-                            PRR_FILM_3RD = VALUES(PRR_FILM_3RD),
-                            PRR_COLOR_DEF = VALUES(PRR_COLOR_DEF),
-                            PRR_TRANS_DEF = VALUES(PRR_TRANS_DEF),
-                            PRR_CURVE_DEF = VALUES(PRR_CURVE_DEF),
-                            PRR_CEN_TH_DEF = VALUES(PRR_CEN_TH_DEF),
-                            PRR_DIAM_DEF = VALUES(PRR_DIAM_DEF),
-                            PRR_R1_TH_DEF = VALUES(PRR_R1_TH_DEF),
-                            PRR_ECC_3RD = VALUES(PRR_ECC_3RD),
-                            PRR_EDGE_DEF_3 = VALUES(PRR_EDGE_DEF_3),
-                            PRR_AXIS_3RD = VALUES(PRR_AXIS_3RD),
-                            PRR_OTHER_3RD = VALUES(PRR_OTHER_3RD),
-                            PRR_A_GRADE = VALUES(PRR_A_GRADE),
-                            PRR_B_GRADE = VALUES(PRR_B_GRADE),
-                            PRR_R1_IN_COM = VALUES(PRR_R1_IN_COM),
-                            PRR_R1_CHK_COM = VALUES(PRR_R1_CHK_COM),
-                            PRR_R2_IN_COM = VALUES(PRR_R2_IN_COM),
-                            PRR_REL_COM = VALUES(PRR_REL_COM),
-                            PRR_RELEASE_BY = VALUES(PRR_RELEASE_BY),
-                            PRR_ANNEAL_BY = VALUES(PRR_ANNEAL_BY),
-                            PRR_CHK1_BY = VALUES(PRR_CHK1_BY),
-                            PRR_CHK2_BY = VALUES(PRR_CHK2_BY),
-                            PRR_CHK3_BY = VALUES(PRR_CHK3_BY),
-                            PRR_R1_GOOD_CNT = VALUES(PRR_R1_GOOD_CNT),
-                            PRR_ANNEAL_TNK = VALUES(PRR_ANNEAL_TNK),
-                            PRR_MONO_SYU = VALUES(PRR_MONO_SYU)
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'prd_id': record['PRR_PRD_ID'],
-                        'r1_in_date': record['PRR_R1_IN_DATE'],
-                        'r1_tank': record['PRR_R1_TANK'],
-                        'r2_tank': record['PRR_R2_TANK'],
-                        'mono_batch': record['PRR_MONO_BATCH'],
-                        'r2_inject': record['PRR_R2_INJECT'],
-                        'film_date': record['PRR_FILM_DATE'],
-                        'r1_inject': record['PRR_R1_INJECT'],
-                        'inject_qty': record['PRR_INJECT_QTY'],
-                        'roll_miss': record['PRR_ROLL_MISS'],
-                        'r1_bubble_chk': record['PRR_R1_BUB_CHK'],
-                        'curl_ins': record['PRR_CURL_INS'],
-                        'film_float_ck': record['PRR_FILM_FLT_CK'],
-                        'leak': record['PRR_LEAK'],
-                        'film_pull': record['PRR_FILM_PULL'],
-                        'film_ng_ck': record['PRR_FILM_NG_CK'],
-                        'r2_bubble_rek': record['PRR_R2_BUB_REK'],
-                        'crack': record['PRR_CRACK'],
-                        'tear_rls': record['PRR_TEAR_RLS'],
-                        'tear': record['PRR_TEAR'],
-                        'peel': record['PRR_PEEL'],
-                        'chip': record['PRR_CHIP'],
-                        'poly_crk': record['PRR_POLY_CRK'],
-                        'mold_scr': record['PRR_MOLD_SCR'],
-                        'lens_scr': record['PRR_LENS_SCR'],
-                        'r1_bubble': record['PRR_R1_BUBBLE'],
-                        'r2_bubble': record['PRR_R2_BUBBLE'],
-                        'defect': record['PRR_DEFECT'],
-                        'elution': record['PRR_ELUTION'],
-                        'haze': record['PRR_HAZE'],
-                        'curl': record['PRR_CURL'],
-                        'film_float': record['PRR_FILM_FLOAT'],
-                        'r1_defect': record['PRR_R1_DEFECT'],
-                        'film_ng': record['PRR_FILM_NG'],
-                        'foreign': record['PRR_FOREIGN'],
-                        'cut_waste': record['PRR_CUT_WASTE'],
-                        'fiber': record['PRR_FIBER'],
-                        'mold_dirt': record['PRR_MOLD_DIRT'],
-                        'film_dirt': record['PRR_FILM_DIRT'],
-                        'axis_1st': record['PRR_AXIS_1ST'],
-                        'stripe_1st': record['PRR_STRIPE_1ST'],
-                        'edge_defect': record['PRR_EDGE_DEFECT'],
-                        'ecc_1st': record['PRR_ECC_1ST'],
-                        'wash_drop': record['PRR_WASH_DROP'],
-                        'unknown': record['PRR_UNKNOWN'],
-                        'other_1': record['PRR_OTHER_1'],
-                        'other_2': record['PRR_OTHER_2'],
-                        'ecc_defect': record['PRR_ECC_DEFECT'],
-                        'drop': record['PRR_DROP'],
-                        'count_err': record['PRR_COUNT_ERR'],
-                        'other_1st': record['PRR_OTHER_1ST'],
-                        'peel_2nd': record['PRR_PEEL_2ND'],
-                        'stripe_2nd': record['PRR_STRIPE_2ND'],
-                        'suction': record['PRR_SUCTION'],
-                        'mold_2nd': record['PRR_MOLD_2ND'],
-                        'film_2nd': record['PRR_FILM_2ND'],
-                        'defect_2nd': record['PRR_DEFECT_2ND'],
-                        'other_2nd': record['PRR_OTHER_2ND'],
-                        'axis_def': record['PRR_AXIS_DEF'],
-                        'film_3rd': record['PRR_FILM_3RD'],
-                        'color_def': record['PRR_COLOR_DEF'],
-                        'trans_def': record['PRR_TRANS_DEF'],
-                        'curve_def': record['PRR_CURVE_DEF'],
-                        'cen_th_def': record['PRR_CEN_TH_DEF'],
-                        'diam_def': record['PRR_DIAM_DEF'],
-                        'r1_th_def': record['PRR_R1_TH_DEF'],
-                        'ecc_3rd': record['PRR_ECC_3RD'],
-                        'edge_def_3': record['PRR_EDGE_DEF_3'],
-                        'axis_3rd': record['PRR_AXIS_3RD'],
-                        'other_3rd': record['PRR_OTHER_3RD'],
-                        'a_grade': record['PRR_A_GRADE'],
-                        'b_grade': record['PRR_B_GRADE'],
-                        'r1_in_com': record['PRR_R1_IN_COM'],
-                        'r1_chk_com': record['PRR_R1_CHK_COM'],
-                        'r2_in_com': record['PRR_R2_IN_COM'],
-                        'rel_com': record['PRR_REL_COM'],
-                        'release_by': record['PRR_RELEASE_BY'],
-                        'anneal_by': record['PRR_ANNEAL_BY'],
-                        'chk1_by': record['PRR_CHK1_BY'],
-                        'chk2_by': record['PRR_CHK2_BY'],
-                        'chk3_by': record['PRR_CHK3_BY'],
-                        'r1_good_cnt': record['PRR_R1_GOOD_CNT'],
-                        'anneal_tnk': record['PRR_ANNEAL_TNK'],
-                        'r2_date': record['PRR_R2_DATE'],
-                        'r2__qty': record['PRR_R2__QTY'],
-                        'release_dt': record['PRR_RELEASE_DT'],
-                        'chk_dt': record['PRR_CHK_DT'],
-                        'mono_syu': record['PRR_MONO_SYU']
-                    })
-                    
+                    # 日別集計（PRD_DAILY_AGG）の再集計対象日
+                    # 更新前の日付と取込データの日付の両方を再集計対象にする
+                    affected = new_affected_dates()
+                    collect_lot_dates(session, affected, [record['PRR_LOT_NO'] for record in chunk])
+                    for record in chunk:
+                        add_affected_dates(affected, record)
+                    session.execute(stmt, chunk)
+                    refresh_daily_agg(session, affected)
                     session.commit()
-                    total_processed += 1
+                    progress['written_rows'] += len(chunk)
+                    progress['chunks'] += 1
                 except Exception as e:
                     session.rollback()
                     log_error(f'生産実績データのインポート/更新中にエラーが発生しました: {str(e)}')
                     raise
             
+            total_processed = progress['written_rows']
+            if not total_processed:
+                return False, 'データが読み込めませんでした。CSVファイルの形式を確認してください。'
+            
             if delete_records:
-                for record in delete_records:
+                progress['stage'] = '削除'
+                try:
+                    # 削除するロットの日付を再集計する（削除と同じトランザクション）
+                    affected = new_affected_dates()
+                    collect_lot_dates(session, affected, delete_records)
                     stmt = text("""
                         DELETE FROM PRD_RECORD WHERE PRR_LOT_NO = :lot_no
                     """)
-                    session.execute(stmt, {'lot_no': record})
+                    session.execute(stmt, [{'lot_no': record} for record in delete_records])
+                    progress['deleted_lots'] = len(delete_records)
+                    
+                    refresh_daily_agg(session, affected)
                     session.commit()
+                except Exception as e:
+                    session.rollback()
+                    log_error(f'生産実績データの削除中にエラーが発生しました: {str(e)}')
+                    raise
+            
+            elapsed = time.perf_counter() - started
+            rows_per_sec = total_processed / elapsed if elapsed > 0 else 0
+            log_error(f'生産実績データ取込: {total_processed}件 {elapsed:.2f}秒 ({rows_per_sec:.0f}件/秒)')
                     
             SetMst.set_csv_import_time()    
+            progress['stage'] = '完了'
             
-            return True, f'{total_processed}件のデータをインポートしました。'   
+            return True, f'{total_processed}件のデータをインポートしました。（{rows_per_sec:.0f}件/秒）'   
         
         except Exception as e:
             log_error(f'CSVファイルの読み込み中にエラーが発生しました: {str(e)}')
@@ -693,22 +736,25 @@ class PrdRecord:
                 session.close()
                 
     @staticmethod
-    def import_from_csv2(file_path, encoding='shift_jis'):
-        """CSVファイルから生産実績データをインポート"""
+    def import_from_csv2(file_path, encoding='shift_jis', progress=None):
+        """
+        CSVファイルから生産実績データ（工程日付）をインポート
+        
+        CSVの工程イベントを一時テーブルへ一括INSERTし、工程ごとに
+        PRD_RECORDとのJOIN UPDATEを1文ずつ実行する（1トランザクション）。
+        同一ロット・同一工程の行が複数ある場合は後の行を採用する。
+        R2注入日・検査日が変わった日付の日別集計（PRD_DAILY_AGG）も同じトランザクションで再集計する。
+        
+        progress: 進捗カウンタの辞書（new_import_progress()）。取込中に更新される。
+        """
         session = None
+        if progress is None:
+            progress = new_import_progress()
         try:
             session = get_db_session()
             
-            # CSVファイルを読み込み、11列目の値に基づいて振り分け
-            r2_inject_records = []  # 11列目が4（R2注入）
-            check_records = []      # 11列目が10（検査）
-            r2_jg_records = []      # 11列目が5（R2重合）
-            anneal_records = []     # 11列目が7（アニール）
-            chk1_records = []       # 11列目が8（一次検査）
-            chk2_records = []       # 11列目が9（二次検査）
-            release_records = []   # 11列目が6（離型）
-            r1_jg_records = []     # 11列目が2（R1重合）
-            r1_chk_records = []    # 11列目が3（R1検品）
+            # (工程区分, ロットNo) ごとのイベント。後勝ちにするため辞書で保持
+            stage_events = {}
 
             try:
                 with open(file_path, 'r', encoding=encoding) as f:
@@ -716,41 +762,35 @@ class PrdRecord:
                     next(reader)  # ヘッダー行をスキップ
                     
                     for row in reader:
+                        progress['read_rows'] += 1
                         try:
                             # 行が空でないことを確認
                             if not row or len(row) < 13:  # 必要な列数
+                                progress['skipped_rows'] += 1
                                 continue
                             
                             # 11列目のデータで振り分け
                             process_type = row[10] if len(row) > 10 else None
+                            if process_type not in PRD_STAGE_UPDATES:
+                                progress['skipped_rows'] += 1
+                                continue
                             
                             edit_row = {
-                                'PRR_LOT_NO': row[1],
-                                'DATE': parse_date(row[0])
+                                'stg_type': process_type,
+                                'lot_no': row[1],
+                                'date': parse_date(row[0]),
+                                'qty': None,
+                                'datetime': None
                             }
                             
                             if process_type == '4':  # R2注入
-                                edit_row['PRR_R2__QTY'] = str_to_flt(row[12]) if len(row) > 12 else 0
-                                edit_row['PRR_R2_DATETIME'] = parse_datetime(row[15]) if len(row) > 15 else None
-                                r2_inject_records.append(edit_row)
-                            elif process_type == '5':  # R2重合
-                                r2_jg_records.append(edit_row)
-                            elif process_type == '6':  # 離型
-                                release_records.append(edit_row)
-                            elif process_type == '7':  # アニール
-                                anneal_records.append(edit_row)
-                            elif process_type == '8':  # 一次検査
-                                chk1_records.append(edit_row)
-                            elif process_type == '9':  # 二次検査
-                                chk2_records.append(edit_row)
-                            elif process_type == '10': # 検査
-                                check_records.append(edit_row)
-                            elif process_type == '2': # R1重合
-                                r1_jg_records.append(edit_row)
-                            elif process_type == '3': # R1検品
-                                r1_chk_records.append(edit_row)
+                                edit_row['qty'] = str_to_flt(row[12]) if len(row) > 12 else 0
+                                edit_row['datetime'] = parse_datetime(row[15]) if len(row) > 15 else None
+                            
+                            stage_events[(process_type, row[1])] = edit_row
 
                         except Exception as e:
+                            progress['skipped_rows'] += 1
                             log_error(f'行の処理中にエラーが発生しました: {str(e)}, 行: {row}')
                             continue
                 
@@ -758,197 +798,75 @@ class PrdRecord:
                 log_error(f'CSVファイルの文字コード変換中にエラーが発生しました: {str(e)}')
                 return False, 'CSVファイルの文字コードが正しくありません。Shift-JIS形式であることを確認してください。'
 
-            if not (r2_inject_records or check_records or r2_jg_records or anneal_records or chk1_records or chk2_records):
+            if not stage_events:
                 return False, 'データが読み込めませんでした。CSVファイルの形式を確認してください。'
             
-            total_processed = 0
-            
             log_error(f'レコード処理')
             
-            # R2注入データの処理
-            for record in r2_inject_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_R2_DATE = :date,
-                            PRR_R2__QTY = :r2__qty,
-                            PRR_R2_DATETIME = :r2_datetime
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE'],
-                        'r2__qty': record.get('PRR_R2__QTY', 0),
-                        'r2_datetime': record.get('PRR_R2_DATETIME', None)
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'R2注入データの更新中にエラーが発生しました: {str(e)}')
-                    continue
-            
-            # 検査データの処理
-            for record in check_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_CHK_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'検査データの更新中にエラーが発生しました: {str(e)}')
-                    continue
-            
-            # R2重合データの処理
-            for record in r2_jg_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_R2_JG_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'R2重合データの更新中にエラーが発生しました: {str(e)}')
-                    continue
-            
-            # 離型データの処理
-            for record in release_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_RELEASE_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'離型データの更新中にエラーが発生しました: {str(e)}')
-                    continue
+            stage_name = '工程'
+            progress['stage'] = '登録'
+            try:
+                # 一時テーブルへ一括投入（異常終了時の残骸があれば先に削除）
+                session.execute(text("DROP TEMPORARY TABLE IF EXISTS PRD_STAGE_TMP"))
+                session.execute(text("""
+                    CREATE TEMPORARY TABLE PRD_STAGE_TMP (
+                        STG_TYPE VARCHAR(2) NOT NULL,
+                        STG_LOT_NO VARCHAR(17) NOT NULL,
+                        STG_DATE DATETIME NULL,
+                        STG_QTY DECIMAL(4) NULL,
+                        STG_DATETIME DATETIME NULL,
+                        PRIMARY KEY (STG_TYPE, STG_LOT_NO)
+                    )
+                """))
+                session.execute(text("""
+                    INSERT INTO PRD_STAGE_TMP (STG_TYPE, STG_LOT_NO, STG_DATE, STG_QTY, STG_DATETIME)
+                    VALUES (:stg_type, :lot_no, :date, :qty, :datetime)
+                """), list(stage_events.values()))
                 
-            # アニールデータの処理
-            for record in anneal_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_ANNEAL_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'アニールデータの更新中にエラーが発生しました: {str(e)}')
-                    continue
-            
-            # 一次検査データの処理
-            for record in chk1_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_CHK1_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'一次検査データの更新中にエラーが発生しました: {str(e)}')
-                    continue
-            
-            # 二次検査データの処理
-            for record in chk2_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_CHK2_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'二次検査データの更新中にエラーが発生しました: {str(e)}')
-                    continue
-            
-            # R1重合データの処理
-            for record in r1_jg_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_R1_JG_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'R1重合データの更新中にエラーが発生しました: {str(e)}')
-                    continue
-            
-            # R1検品データの処理
-            for record in r1_chk_records:
-                try:
-                    stmt = text("""
-                        UPDATE PRD_RECORD SET
-                            PRR_R1_CHK_DT = :date
-                        WHERE PRR_LOT_NO = :lot_no
-                    """)
-                    session.execute(stmt, {
-                        'lot_no': record['PRR_LOT_NO'],
-                        'date': record['DATE']
-                    })
-                    
-                    session.commit()
-                    total_processed += 1
-                except Exception as e:
-                    session.rollback()
-                    log_error(f'R1検品データの更新中にエラーが発生しました: {str(e)}')
-                    continue
+                # 日別集計の再集計対象日（R2注入日・検査日の変更前と変更後）
+                affected = new_affected_dates()
+                for row in session.execute(text("""
+                    SELECT s.STG_TYPE, p.PRR_R2_DATE, p.PRR_CHK_DT
+                    FROM PRD_RECORD p
+                    JOIN PRD_STAGE_TMP s ON s.STG_LOT_NO = p.PRR_LOT_NO
+                    WHERE s.STG_TYPE IN ('4', '10')
+                """)).mappings():
+                    date_col = PRD_STAGE_AGG_COLUMNS[row['STG_TYPE']]
+                    add_affected_dates(affected, {date_col: row[date_col]})
+                for event in stage_events.values():
+                    if event['stg_type'] in PRD_STAGE_AGG_COLUMNS:
+                        add_affected_dates(affected, {PRD_STAGE_AGG_COLUMNS[event['stg_type']]: event['date']})
+                
+                # 工程ごとにJOIN UPDATEを1文で実行
+                stage_types = {key[0] for key in stage_events}
+                for process_type, (stage_name, set_clause) in PRD_STAGE_UPDATES.items():
+                    if process_type not in stage_types:
+                        continue
+                    session.execute(text(f"""
+                        UPDATE PRD_RECORD p
+                        JOIN PRD_STAGE_TMP s ON s.STG_LOT_NO = p.PRR_LOT_NO
+                        SET {set_clause}
+                        WHERE s.STG_TYPE = :stg_type
+                    """), {'stg_type': process_type})
+                
+                stage_name = '日別集計'
+                progress['stage'] = '日別集計'
+                refresh_daily_agg(session, affected)
+                
+                # コミットで接続がプールへ戻る前に一時テーブルを削除
+                session.execute(text("DROP TEMPORARY TABLE IF EXISTS PRD_STAGE_TMP"))
+                session.commit()
+                progress['written_rows'] = len(stage_events)
+                progress['chunks'] = 1
+                # 工程日付・日別集計が変わったため、集計結果のキャッシュを無効化する
+                invalidate_response_cache()
+            except Exception as e:
+                session.rollback()
+                log_error(f'{stage_name}データの更新中にエラーが発生しました: {str(e)}')
+                raise
             
+            total_processed = len(stage_events)
+            progress['stage'] = '完了'
             return True, f'{total_processed}件のデータをインポートしました。'
                 
         except Exception as e:
@@ -1026,6 +944,7 @@ class SetMst(db.Model):
     SET_INFO_2 = db.Column(db.String(200), comment='お知らせ２')
     SET_INFO_H3 = db.Column(db.String(40), comment='お知らせヘッダ３')
     SET_INFO_3 = db.Column(db.String(200), comment='お知らせ３')
+    SET_DATA_GEN = db.Column(db.Integer, nullable=False, default=0, comment='データ世代')
     
     @classmethod
     def set_csv_import_time(cls):
@@ -1035,18 +954,29 @@ class SetMst(db.Model):
         Returns:
             DateTime: CSV取込時間
         """
+        from .settings_service import bump_data_generation, refresh_settings
+
         dt = datetime.now()
         setting = cls.query.first()
         if setting:
             setting.SET_JS_RD_DT = dt
             db.session.commit()
+            # 取込でデータが変わったため、データ世代を進めて設定を読み直す
+            bump_data_generation()
+            refresh_settings()
         else:
             return None
     
     @classmethod
     def get_csv_import_time(cls):
-        setting = cls.query.first()
-        return setting.SET_JS_RD_DT.strftime('%Y/%m/%d %H:%M:%S') if setting else None
+        """CSV取込時間を表示用の文字列で取得（設定サービスのキャッシュを使用）"""
+        from .settings_service import get_csv_import_time
+
+        return get_csv_import_time()
+
+
+# 特記事項の検索件数をキャッシュする期間（秒）。他のプロセスでの登録・削除はこの間隔で反映される
+NOTE_COUNT_CACHE_TIMEOUT = int(os.getenv('NOTE_COUNT_CACHE_TIMEOUT', 60))
 
 class NoteDatModel(db.Model):
     """特記事項データテーブルのSQLAlchemyモデル"""
@@ -1101,7 +1031,7 @@ class NoteDatModel(db.Model):
             if not session:
                 return [], 0
             
-            query = session.query(NoteDatModel).options(db.joinedload(NoteDatModel.worker))
+            query = session.query(NoteDatModel)
             
             if lot_no:
                 query = query.filter(NoteDatModel.NOTE_LOT_NO.like(f'%{lot_no}%'))
@@ -1114,17 +1044,32 @@ class NoteDatModel(db.Model):
             if title:
                 query = query.filter(NoteDatModel.NOTE_TITLE.like(f'%{title}%'))
             
-            total_count = query.count()
+            # 総件数は検索条件ごとにキャッシュする（特記事項の保存・削除で無効化）
+            count_query = query
+            total_count = cached_master(
+                ('NOTE_DAT', 'count', lot_no, start_date, end_date, user_id, title),
+                lambda: count_query.count(),
+                timeout=NOTE_COUNT_CACHE_TIMEOUT
+            )
+            
             offset = (page - 1) * per_page
-            notes = query.order_by(NoteDatModel.NOTE_ID.desc()).offset(offset).limit(per_page).all()
+            notes = query.options(
+                db.joinedload(NoteDatModel.worker)
+            ).order_by(NoteDatModel.NOTE_ID.desc()).offset(offset).limit(per_page).all()
+            
+            # 返信件数は表示するページの特記事項IDに絞って1回で集計する
+            reply_counts = {}
+            if notes:
+                reply_counts = dict(session.query(
+                    NansDatModel.NANS_NOTE_ID,
+                    db.func.count(NansDatModel.NANS_ID)
+                ).filter(
+                    NansDatModel.NANS_NOTE_ID.in_([note.NOTE_ID for note in notes])
+                ).group_by(NansDatModel.NANS_NOTE_ID).all())
             
-            # 各特記事項に対して返信の有無を確認
             for note in notes:
-                reply_count = session.query(NansDatModel).filter(
-                    NansDatModel.NANS_NOTE_ID == note.NOTE_ID
-                ).count()
-                note.has_replies = reply_count > 0
-                note.reply_count = reply_count
+                note.reply_count = int(reply_counts.get(note.NOTE_ID, 0))
+                note.has_replies = note.reply_count > 0
             
             session.close()
             return notes, total_count
@@ -1155,6 +1100,8 @@ class NoteDatModel(db.Model):
             
             session.commit()
             session.close()
+            invalidate_response_cache()
+            invalidate_master_cache('NOTE_DAT')
             return True
         except Exception as e:
             log_error(f'特記事項データの保存中にエラーが発生しました: {str(e)}')
@@ -1171,6 +1118,8 @@ class NoteDatModel(db.Model):
             if note:
                 session.delete(note)
                 session.commit()
+                invalidate_response_cache()
+                invalidate_master_cache('NOTE_DAT')
             
             session.close()
             return True
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+import time
+from datetime import date
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from .settings_service import bump_data_generation, data_generation
+
+# ==================== スライド・ダッシュボードAPIのレスポンスキャッシュ ====================
+#
+# 常時表示の画面から定期的に呼ばれるAPIの応答（JSON）をプロセス内で共有する。
+# キャッシュキーにはデータ世代（settings_service.data_generation）と当日の日付を含めるため、
+# CSV取込などでデータが更新されるか日付が変わると自動的に再計算される。
+# CSV取込時間を更新しない書き込み（スピンコート・ハードコート取込、膜不良入力、設定、特記事項）は
+# invalidate_response_cache() でデータ世代を進めて無効化する。
+# 取込ワーカーでの取込は共有のデータ世代（SET_MST.SET_DATA_GEN）で検知する。
+# 他のプロセスでの書き込みは検知できない場合があるため、キャッシュの有効期間は
+# RESPONSE_CACHE_TIMEOUT（秒）で上限を設ける。
+
+DEFAULT_TIMEOUT = 300
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def invalidate_response_cache():
+    """キャッシュ済みの応答をすべて無効化する（データ更新時に呼び出す）"""
+    bump_data_generation()
+    with _lock:
+        _cache.clear()
+
+
+def _cache_key():
+    """リクエストとデータ世代からキャッシュキーを作成"""
+    return (
+        request.endpoint,
+        tuple(sorted(request.args.items(multi=True))),
+        date.today(),
+        data_generation(),
+    )
+
+
+def _conditional_response(entry):
+    """キャッシュ済みの応答からレスポンスを作成（If-None-Matchが一致すれば304）"""
+    response = current_app.response_class(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    # ブラウザには毎回ETagで再検証させる
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def cached_response(view):
+    """
+    JSONを返すAPIの応答をキャッシュするデコレータ
+
+    正常応答（200）のみキャッシュし、ETagを付けて返す。
+    @login_requiredより内側に付けること。
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        timeout = current_app.config.get('RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+        key = _cache_key()
+        now = time.monotonic()
+
+        with _lock:
+            entry = _cache.get(key)
+        if entry and now - entry['created'] < timeout:
+            return _conditional_response(entry)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or not response.is_json:
+            return response
+
+        body = response.get_data()
+        entry = {
+            'body': body,
+            'etag': hashlib.md5(body).hexdigest(),
+            'created': now,
+        }
+        with _lock:
+            # 期限切れ・旧世代の応答を削除してから保存
+            for old_key in [k for k, v in _cache.items()
+                            if now - v['created'] >= timeout or k[2:] != key[2:]]:
+                del _cache[old_key]
+            _cache[key] = entry
+
+        return _conditional_response(entry)
+
+    return wrapper
@@ -0,0 +1,301 @@
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_
+
+from .models import db, PrdRecordModel
+from .master_models import MnoMstModel, PrdMstModel
+
+# ==================== 実績一覧（R1・R2実績／検査実績）のページ分割 ====================
+#
+# 一覧は (R1注入日 降順, ロットNo 降順) のキーセットでページ分割する。
+# 1ページ目は画面と一緒に表示し、続きは /api/results/<一覧名>?cursor=... から
+# スクロールに合わせて取得する。
+# 取得する列は一覧に表示する列だけに絞り、製品名・モノマー名は外部結合で同じクエリから取得する。
+#
+# 列の定義: (キー, 見出し, 種類)
+#   text: そのまま（空の場合は空欄）  name: マスタ名（ない場合は「不明」）
+#   date / datetime: 日付・日時        number: 3桁区切り
+#   worker: 従業員名（ない場合は「不明」）
+
+DEFAULT_PAGE_SIZE = 200
+
+# 生産実績以外のテーブルから取得する列
+_JOINED_COLUMNS = {
+    'PRD_NM': PrdMstModel.PRD_NM,
+    'PRD_COLOR': PrdMstModel.PRD_COLOR,
+    'MNO_NM': MnoMstModel.MNO_NM,
+}
+
+RESULTS_COLUMNS = [
+    ('PRR_R1_IN_DATE', 'R1注入日', 'date'),
+    ('PRR_LOT_NO', 'ロット番号', 'text'),
+    ('PRD_NM', '製品名', 'name'),
+    ('MNO_NM', 'モノマー種', 'name'),
+    ('PRR_R1_TANK', 'R1重合槽', 'text'),
+    ('PRR_R2_TANK', 'R2重合槽', 'text'),
+    ('PRR_MONO_BATCH', 'モノマーバッチ', 'text'),
+    ('PRR_R1_INJECT', 'R1注入者', 'worker'),
+    ('PRR_INJECT_QTY', 'R1注入数', 'number'),
+    ('PRR_ROLL_MISS', '巻きミス', 'number'),
+    ('PRR_R1_BUB_CHK', 'R1泡(検品)', 'number'),
+    ('PRR_CURL_INS', 'カール(検品)', 'number'),
+    ('PRR_FILM_FLT_CK', '膜浮き(検品)', 'number'),
+    ('PRR_LEAK', 'モレ', 'number'),
+    ('PRR_FILM_PULL', '膜ひっぱり', 'number'),
+    ('PRR_FILM_NG_CK', '膜不良(検品)', 'number'),
+    ('PRR_R1_GOOD_CNT', 'R1良品数', 'number'),
+    ('PRR_R2_DATE', 'R2注入日', 'date'),
+    ('PRR_R2_INJECT', 'R2注入者', 'worker'),
+    ('PRR_R2_BUB_REK', 'R2泡(離型)', 'number'),
+    ('PRR_CRACK', 'ワレ', 'number'),
+    ('PRR_TEAR_RLS', 'チギレ(離型)', 'number'),
+    ('PRR_POLY_CRK', '重合ワレ', 'number'),
+    ('PRR_OTHER_1', 'その他1', 'number'),
+]
+
+RESULTS2_COLUMNS = [
+    ('PRR_LOT_NO', 'ロット番号', 'text'),
+    ('PRD_NM', '製品名', 'name'),
+    ('MNO_NM', 'モノマー種', 'name'),
+    ('PRR_FILM_DATE', '膜加工日', 'date'),
+    ('PRD_COLOR', '膜カラー', 'text'),
+    ('PRR_R1_IN_DATE', 'R1注入日', 'date'),
+    ('PRR_R1_INJECT', 'R1注入者', 'worker'),
+    ('PRR_R1_TANK', 'R1重合槽', 'text'),
+    ('PRR_R2_INJECT', 'R2注入者', 'worker'),
+    ('PRR_R2_TANK', 'R2重合槽', 'text'),
+    ('PRR_MONO_BATCH', 'モノマーバッチ', 'text'),
+    ('PRR_R2_DATETIME', 'R2注入日時', 'datetime'),
+    ('PRR_RELEASE_BY', '離型者', 'worker'),
+    ('PRR_CHK_DT', '検査日', 'date'),
+    ('PRR_INJECT_QTY', 'R1注入数', 'number'),
+    ('PRR_CHK1_BY', '一次検査員', 'worker'),
+    ('PRR_TEAR', 'チギレ', 'number'),
+    ('PRR_PEEL', 'ハガレ', 'number'),
+    ('PRR_CHIP', 'カケ', 'number'),
+    ('PRR_MOLD_SCR', '型キズ', 'number'),
+    ('PRR_LENS_SCR', 'レンズキズ', 'number'),
+    ('PRR_R1_BUBBLE', 'R1泡', 'number'),
+    ('PRR_R2_BUBBLE', 'R2泡', 'number'),
+    ('PRR_DEFECT', 'ブツ', 'number'),
+    ('PRR_ELUTION', '溶出', 'number'),
+    ('PRR_HAZE', 'モヤ', 'number'),
+    ('PRR_CURL', 'カール', 'number'),
+    ('PRR_FILM_FLOAT', '膜浮き', 'number'),
+    ('PRR_R1_DEFECT', 'R1不良', 'number'),
+    ('PRR_FILM_NG', '膜不良', 'number'),
+    ('PRR_FOREIGN', 'イブツ', 'number'),
+    ('PRR_CUT_WASTE', 'カットくず', 'number'),
+    ('PRR_FIBER', 'センイ', 'number'),
+    ('PRR_MOLD_DIRT', 'モールド汚れ', 'number'),
+    ('PRR_FILM_DIRT', '膜汚れ', 'number'),
+    ('PRR_AXIS_1ST', '片軸(一次)', 'number'),
+    ('PRR_STRIPE_1ST', '脈理(一次)', 'number'),
+    ('PRR_EDGE_DEFECT', 'コバスリ不良', 'number'),
+    ('PRR_ECC_1ST', '偏心不良(一次)', 'number'),
+    ('PRR_WASH_DROP', '洗浄落下', 'number'),
+    ('PRR_UNKNOWN', '不明', 'number'),
+    ('PRR_OTHER_2', 'その他2', 'number'),
+    ('PRR_ECC_DEFECT', '偏心不良', 'number'),
+    ('PRR_DROP', '落下', 'number'),
+    ('PRR_COUNT_ERR', '員数違い', 'number'),
+    ('PRR_OTHER_1ST', 'その他(一次)', 'number'),
+    ('PRR_CHK2_BY', '二次検査員', 'worker'),
+    ('PRR_PEEL_2ND', 'ハガレ(二次)', 'number'),
+    ('PRR_STRIPE_2ND', '脈理(二次)', 'number'),
+    ('PRR_SUCTION', '吸い込み', 'number'),
+    ('PRR_MOLD_2ND', '型キズ(二次)', 'number'),
+    ('PRR_FILM_2ND', '膜不良(二次)', 'number'),
+    ('PRR_DEFECT_2ND', 'ブツ(二次)', 'number'),
+    ('PRR_OTHER_2ND', 'その他(二次)', 'number'),
+    ('PRR_CHK3_BY', '三次検査員', 'worker'),
+    ('PRR_AXIS_DEF', '軸不良', 'number'),
+    ('PRR_FILM_3RD', '膜浮き(三次)', 'number'),
+    ('PRR_COLOR_DEF', 'カラー不良', 'number'),
+    ('PRR_TRANS_DEF', '透過率不良', 'number'),
+    ('PRR_CURVE_DEF', 'カーブ不良', 'number'),
+    ('PRR_CEN_TH_DEF', '中心厚不良', 'number'),
+    ('PRR_DIAM_DEF', '径不良', 'number'),
+    ('PRR_R1_TH_DEF', 'R1厚み不良', 'number'),
+    ('PRR_ECC_3RD', '偏心不良(三次)', 'number'),
+    ('PRR_EDGE_DEF_3', '膜汚れ(三次)', 'number'),
+    ('PRR_AXIS_3RD', '片軸(三次)', 'number'),
+    ('PRR_OTHER_3RD', 'その他(三次)', 'number'),
+    ('PRR_A_GRADE', 'A品', 'number'),
+    ('PRR_B_GRADE', 'B品', 'number'),
+]
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def _results_filters(query, args):
+    """R1・R2実績の検索条件を適用"""
+    if args.get('date_from'):
+        query = query.filter(PrdRecordModel.PRR_R1_IN_DATE >= _parse_date(args.get('date_from')))
+    if args.get('date_to'):
+        query = query.filter(PrdRecordModel.PRR_R1_IN_DATE <= _parse_date(args.get('date_to')))
+    if args.get('date_from2'):
+        query = query.filter(PrdRecordModel.PRR_R2_DATE >= _parse_date(args.get('date_from2')))
+    if args.get('date_to2'):
+        query = query.filter(PrdRecordModel.PRR_R2_DATE <= _parse_date(args.get('date_to2')))
+    if args.get('injector'):
+        query = query.filter(PrdRecordModel.PRR_R1_INJECT == args.get('injector'))
+    if args.get('injector2'):
+        query = query.filter(PrdRecordModel.PRR_R2_INJECT == args.get('injector2'))
+    return query
+
+
+def _results2_filters(query, args):
+    """検査実績の検索条件を適用（製品マスタは外部結合済み）"""
+    if args.get('date_from'):
+        query = query.filter(PrdRecordModel.PRR_R1_IN_DATE >= _parse_date(args.get('date_from')))
+    if args.get('date_to'):
+        query = query.filter(PrdRecordModel.PRR_R1_IN_DATE <= _parse_date(args.get('date_to')))
+    if args.get('date_from2'):
+        query = query.filter(PrdRecordModel.PRR_CHK_DT >= _parse_date(args.get('date_from2')))
+    if args.get('date_to2'):
+        query = query.filter(PrdRecordModel.PRR_CHK_DT <= _parse_date(args.get('date_to2')))
+    if args.get('film_date_from'):
+        query = query.filter(PrdRecordModel.PRR_FILM_DATE >= _parse_date(args.get('film_date_from')))
+    if args.get('film_date_to'):
+        query = query.filter(PrdRecordModel.PRR_FILM_DATE <= _parse_date(args.get('film_date_to')))
+    if args.get('prd_id'):
+        query = query.filter(PrdRecordModel.PRR_PRD_ID == args.get('prd_id'))
+    if args.get('prd_nm'):
+        query = query.filter(PrdMstModel.PRD_NM.like(f"%{args.get('prd_nm')}%"))
+    if args.get('mono_syu'):
+        query = query.filter(PrdRecordModel.PRR_MONO_SYU == args.get('mono_syu'))
+    if args.get('lot_no'):
+        query = query.filter(PrdRecordModel.PRR_LOT_NO.like(f"%{args.get('lot_no')}%"))
+    # 膜カラーでの絞り込み（部分一致）
+    if args.get('prd_color'):
+        query = query.filter(PrdMstModel.PRD_COLOR.like(f"%{args.get('prd_color')}%"))
+    return query
+
+
+LISTINGS = {
+    'results': {
+        'columns': RESULTS_COLUMNS,
+        'filters': _results_filters,
+        'params': ('date_from', 'date_to', 'date_from2', 'date_to2', 'injector', 'injector2'),
+    },
+    'results2': {
+        'columns': RESULTS2_COLUMNS,
+        'filters': _results2_filters,
+        'params': ('date_from', 'date_to', 'date_from2', 'date_to2', 'film_date_from', 'film_date_to',
+                   'prd_id', 'prd_nm', 'mono_syu', 'lot_no', 'prd_color'),
+    },
+}
+
+
+def has_search_params(listing, args):
+    """検索条件が1つでも指定されているか"""
+    return any(args.get(name) for name in LISTINGS[listing]['params'])
+
+
+def encode_cursor(r1_in_date, lot_no):
+    """ページの最終行からカーソル文字列を作成（R1注入日|ロットNo）"""
+    date_part = r1_in_date.strftime('%Y-%m-%dT%H:%M:%S') if r1_in_date else ''
+    return f'{date_part}|{lot_no}'
+
+
+def decode_cursor(cursor):
+    """
+    カーソル文字列を (R1注入日, ロットNo) に変換
+
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    date_part, sep, lot_no = cursor.partition('|')
+    if not sep or not lot_no:
+        raise ValueError(f'カーソルの形式が正しくありません: {cursor}')
+    r1_in_date = datetime.strptime(date_part, '%Y-%m-%dT%H:%M:%S') if date_part else None
+    return r1_in_date, lot_no
+
+
+def _after_cursor(query, cursor):
+    """(R1注入日 降順, ロットNo 降順) でカーソルより後の行に絞り込む（R1注入日が空の行は最後）"""
+    r1_in_date, lot_no = decode_cursor(cursor)
+    if r1_in_date is None:
+        return query.filter(PrdRecordModel.PRR_R1_IN_DATE.is_(None), PrdRecordModel.PRR_LOT_NO < lot_no)
+    return query.filter(or_(
+        PrdRecordModel.PRR_R1_IN_DATE < r1_in_date,
+        and_(PrdRecordModel.PRR_R1_IN_DATE == r1_in_date, PrdRecordModel.PRR_LOT_NO < lot_no),
+        PrdRecordModel.PRR_R1_IN_DATE.is_(None),
+    ))
+
+
+def _base_query(listing, args):
+    """一覧の列だけを取得するクエリ（検索条件を適用済み）"""
+    spec = LISTINGS[listing]
+    entities = [PrdRecordModel.PRR_R1_IN_DATE.label('_CUR_DATE'), PrdRecordModel.PRR_LOT_NO.label('_CUR_LOT')]
+    for key, _, _ in spec['columns']:
+        entities.append(_JOINED_COLUMNS[key] if key in _JOINED_COLUMNS else getattr(PrdRecordModel, key))
+
+    query = (
+        db.session.query(*entities)
+        .outerjoin(PrdMstModel, PrdRecordModel.PRR_PRD_ID == PrdMstModel.PRD_ID)
+        .outerjoin(MnoMstModel, PrdRecordModel.PRR_MONO_SYU == MnoMstModel.MNO_SYU)
+    )
+    return spec['filters'](query, args)
+
+
+def _format_cell(value, kind, worker_names):
+    if kind == 'worker':
+        return worker_names.get(value, '不明') if value is not None else '不明'
+    if kind == 'name':
+        return value if value else '不明'
+    if value is None:
+        return ''
+    if kind == 'number':
+        return '{:,}'.format(value)
+    if kind == 'date':
+        return value.strftime('%Y/%m/%d')
+    if kind == 'datetime':
+        return value.strftime('%Y/%m/%d %H:%M:%S')
+    return str(value) if value else ''
+
+
+def count_rows(listing, args):
+    """検索条件に一致する件数"""
+    query = _base_query(listing, args)
+    return query.with_entities(func.count(PrdRecordModel.PRR_LOT_NO)).scalar() or 0
+
+
+def fetch_page(listing, args, workers, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    一覧の1ページ分を取得
+
+    Parameters:
+        listing (str): 一覧名（'results' / 'results2'）
+        args: 検索条件（request.args）
+        workers: 従業員マスタのリスト（担当者名の表示用）
+        cursor (str): 前のページのnext_cursor（1ページ目はNone）
+        limit (int): 1ページの件数
+
+    Returns:
+        dict: {'rows': [[表示文字列, ...], ...], 'next_cursor': 次のページのカーソル（最後のページはNone）}
+    """
+    columns = LISTINGS[listing]['columns']
+    worker_names = {worker.WRK_ID: worker.WRK_NM for worker in workers}
+
+    query = _base_query(listing, args)
+    if cursor:
+        query = _after_cursor(query, cursor)
+    # 1件多く取得して次のページの有無を判定する
+    records = query.order_by(
+        PrdRecordModel.PRR_R1_IN_DATE.desc(), PrdRecordModel.PRR_LOT_NO.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(records[-1]._CUR_DATE, records[-1]._CUR_LOT)
+
+    rows = [
+        [_format_cell(value, kind, worker_names) for value, (_, _, kind) in zip(record[2:], columns)]
+        for record in records
+    ]
+    return {'rows': rows, 'next_cursor': next_cursor}
@@ -4,12 +4,14 @@ from datetime import datetime, timedelta
 import locale
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app as app, jsonify
 
-from app.forms import FmcDatForm, SetMstForm
-from app.ishida_models import FmcDat
-from .models import WorkerModel, db, PrdRecordModel, SetMst, NoteDatModel, NansDatModel
+from .models import WorkerModel, db, PrdRecordModel, PrdDailyAggModel, SetMst, NoteDatModel, NansDatModel
 from .master_models import MnoMstModel
 from .master_models import KbnMst, PrdMstModel
 from .utils import log_error
+from .date_range import date_range, group_by_month, invalid_dates
+from .response_cache import cached_response, invalidate_response_cache
+from .settings_service import get_settings, refresh_settings
+from .defect_categories import DEFECT_LABELS, defect_sum_columns, total_defect_column, defect_counts, DefectMatrix
 import tempfile
 import os
 from flask_login import login_required, current_user
@@ -101,118 +103,62 @@ def delete_image_file(filename):
 @main.route('/results', methods=['GET'])
 @login_required
 def results():
-    # 検索パラメータの有無をチェック
-    has_search_params = any([
-        request.args.get('date_from'),
-        request.args.get('date_to'),
-        request.args.get('date_from2'),
-        request.args.get('date_to2'),
-        request.args.get('injector'),
-        request.args.get('injector2')
-    ])
-    
-    # 検索パラメータがある場合のみデータを取得
-    if has_search_params:
-        # クエリの構築
-        query = PrdRecordModel.query
-        
-        # 検索条件の適用
-        if request.args.get('date_from'):
-            query = query.filter(PrdRecordModel.PRR_R1_IN_DATE >= datetime.strptime(request.args.get('date_from'), '%Y-%m-%d'))
-        if request.args.get('date_to'):
-            query = query.filter(PrdRecordModel.PRR_R1_IN_DATE <= datetime.strptime(request.args.get('date_to'), '%Y-%m-%d'))
-        if request.args.get('date_from2'):
-            query = query.filter(PrdRecordModel.PRR_R2_DATE >= datetime.strptime(request.args.get('date_from2'), '%Y-%m-%d'))
-        if request.args.get('date_to2'):
-            query = query.filter(PrdRecordModel.PRR_R2_DATE <= datetime.strptime(request.args.get('date_to2'), '%Y-%m-%d'))
-        if request.args.get('injector'):
-            query = query.filter(PrdRecordModel.PRR_R1_INJECT == request.args.get('injector'))
-        if request.args.get('injector2'):
-            query = query.filter(PrdRecordModel.PRR_R2_INJECT == request.args.get('injector2'))
-        
-        # 日付の降順でソート
-        query = query.order_by(PrdRecordModel.PRR_R1_IN_DATE.desc())
-        
-        # 結果の取得
-        performances = query.all()
-    else:
-        # 検索パラメータがない場合は空のリストを返す
-        performances = []
-    
-    # workerの取得
-    workers = WorkerModel.query.all()
-    
-    csv_import_time = SetMst.get_csv_import_time()  
-    
-    return render_template('results.html', performances=performances, workers=workers, csv_import_time=csv_import_time)
+    return _render_results('results', 'results.html')
 
 @main.route('/results2', methods=['GET'])
 @login_required
 def results2():
     # モノマー種別マスタを取得
     mono_list = MnoMstModel.get_all()
-    
-    # 検索パラメータの有無をチェック
-    has_search_params = any([
-        request.args.get('date_from'),
-        request.args.get('date_to'),
-        request.args.get('date_from2'),
-        request.args.get('date_to2'),
-        request.args.get('film_date_from'),
-        request.args.get('film_date_to'),
-        request.args.get('prd_id'),
-        request.args.get('prd_nm'),
-        request.args.get('mono_syu'),
-        request.args.get('lot_no'),
-        request.args.get('prd_color')
-    ])
+    return _render_results('results2', 'results2.html', mono_list=mono_list)
+
+def _render_results(listing, template, **context):
+    """実績一覧の画面を表示（1ページ目のみ。続きは api_results_page で取得）"""
+    from .results_listing import LISTINGS, count_rows, fetch_page, has_search_params
+
+    # workerの取得
+    workers = WorkerModel.get_all()
     
     # 検索パラメータがある場合のみデータを取得
-    if has_search_params:
-        # クエリの構築
-        query = PrdRecordModel.query
-        
-        # 検索条件の適用
-        if request.args.get('date_from'):
-            query = query.filter(PrdRecordModel.PRR_R1_IN_DATE >= datetime.strptime(request.args.get('date_from'), '%Y-%m-%d'))
-        if request.args.get('date_to'):
-            query = query.filter(PrdRecordModel.PRR_R1_IN_DATE <= datetime.strptime(request.args.get('date_to'), '%Y-%m-%d'))
-        if request.args.get('date_from2'):
-            query = query.filter(PrdRecordModel.PRR_CHK_DT >= datetime.strptime(request.args.get('date_from2'), '%Y-%m-%d'))
-        if request.args.get('date_to2'):
-            query = query.filter(PrdRecordModel.PRR_CHK_DT <= datetime.strptime(request.args.get('date_to2'), '%Y-%m-%d'))
-        if request.args.get('film_date_from'):
-            query = query.filter(PrdRecordModel.PRR_FILM_DATE >= datetime.strptime(request.args.get('film_date_from'), '%Y-%m-%d'))
-        if request.args.get('film_date_to'):
-            query = query.filter(PrdRecordModel.PRR_FILM_DATE <= datetime.strptime(request.args.get('film_date_to'), '%Y-%m-%d'))
-        if request.args.get('prd_id'):
-            query = query.filter(PrdRecordModel.PRR_PRD_ID == request.args.get('prd_id'))
-        if request.args.get('prd_nm'):
-            query = query.join(PrdMstModel, PrdRecordModel.PRR_PRD_ID == PrdMstModel.PRD_ID)
-            query = query.filter(PrdMstModel.PRD_NM.like(f"%{request.args.get('prd_nm')}%"))
-        if request.args.get('mono_syu'):
-            query = query.filter(PrdRecordModel.PRR_MONO_SYU == request.args.get('mono_syu'))
-        if request.args.get('lot_no'):
-            query = query.filter(PrdRecordModel.PRR_LOT_NO.like(f"%{request.args.get('lot_no')}%"))
-        # 膜カラーでの絞り込み（部分一致）
-        if request.args.get('prd_color'):
-            query = query.join(PrdMstModel, PrdRecordModel.PRR_PRD_ID == PrdMstModel.PRD_ID)
-            query = query.filter(PrdMstModel.PRD_COLOR.like(f"%{request.args.get('prd_color')}%"))
-        # 日付の降順でソート
-        query = query.order_by(PrdRecordModel.PRR_R1_IN_DATE.desc())
-        
-        # 結果の取得
-        performances = query.all()
-    else:
-        # 検索パラメータがない場合は空のリストを返す
-        performances = []
-    
-    # workerの取得
-    workers = WorkerModel.query.all()
+    page = {'rows': [], 'next_cursor': None}
+    total_count = 0
+    if has_search_params(listing, request.args):
+        page = fetch_page(listing, request.args, workers, limit=app.config['RESULTS_PAGE_SIZE'])
+        total_count = count_rows(listing, request.args) if page['next_cursor'] else len(page['rows'])
     
     csv_import_time = SetMst.get_csv_import_time()
     
-    return render_template('results2.html', performances=performances, workers=workers, csv_import_time=csv_import_time, mono_list=mono_list)
+    return render_template(
+        template,
+        columns=LISTINGS[listing]['columns'],
+        rows=page['rows'],
+        next_cursor=page['next_cursor'],
+        total_count=total_count,
+        listing=listing,
+        workers=workers,
+        csv_import_time=csv_import_time,
+        **context
+    )
+
+@main.route('/api/results/<listing>', methods=['GET'])
+@login_required
+def api_results_page(listing):
+    """実績一覧の続きのページを取得するAPI（検索条件は画面と同じクエリ文字列、cursorは前のページのnext_cursor）"""
+    from .results_listing import LISTINGS, fetch_page
+
+    if listing not in LISTINGS:
+        return jsonify({'error': '一覧が見つかりません'}), 404
+    try:
+        page = fetch_page(
+            listing, request.args, WorkerModel.get_all(),
+            cursor=request.args.get('cursor'), limit=app.config['RESULTS_PAGE_SIZE']
+        )
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        log_error(f'実績一覧の取得中にエラーが発生しました: {str(e)}')
+        return jsonify({'error': 'データの取得に失敗しました'}), 500
 
 @main.route('/progress')
 @login_required
@@ -244,10 +190,9 @@ def progress():
     )
     
     # 検索条件の適用
-    if r1_in_date:
-        query = query.filter(func.date(PrdRecordModel.PRR_R1_IN_DATE) >= r1_in_date)
-    if r1_in_date2:
-        query = query.filter(func.date(PrdRecordModel.PRR_R1_IN_DATE) <= r1_in_date2)
+    query = query.filter(*date_range(PrdRecordModel.PRR_R1_IN_DATE, r1_in_date, r1_in_date2))
+    if invalid_dates(r1_in_date, r1_in_date2):
+        flash('日付の形式が正しくないため、期間の条件を指定せずに表示しています')
     if mono_syu:
         query = query.filter(MnoMstModel.MNO_SYU == mono_syu)
     
@@ -285,159 +230,20 @@ def progress():
 @main.route('/api/high_defect_rate_data')
 @login_required
 def high_defect_rate_data():
-    """不良率が高い不良データをJSON形式で返す"""
-    # フィルターパラメータ取得
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
-    date_type = request.args.get('date_type', 'r2')  # r2: R2注入日, chk: 検査日
-    
-    # 不良項目の定義
-    defect_items = {
-        'roll_miss': '巻きミス',
-        'leak': 'モレ',
-        'film_pull': '膜ひっぱり',
-        'crack': 'ワレ',
-        'tear': 'チギレ',
-        'peel': 'ハガレ',
-        'chip': 'カケ',
-        'poly_crk': '重合ワレ',
-        'mold_scr': '型キズ',
-        'lens_scr': 'レンズキズ',
-        'r1_bubble': 'R1泡',
-        'r2_bubble': 'R2泡',
-        'defect': 'ブツ',
-        'elution': '溶出',
-        'haze': 'モヤ',
-        'curl': 'カール',
-        'film_float': '膜浮き',
-        'r1_defect': 'R1不良',
-        'film_ng': '膜不良',
-        'foreign': 'イブツ',
-        'cut_waste': 'カットくず',
-        'fiber': 'センイ',
-        'mold_dirt': 'モールド汚れ',
-        'film_dirt': '膜汚れ',
-        'axis_1st': '片軸',
-        'stripe_1st': '脈理',
-        'edge_defect': 'コバスリ不良',
-        'wash_drop': '洗浄落下',
-        'unknown': '不明',
-        'other_1': 'その他',
-        'ecc_defect': '偏心不良',
-        'drop': '落下',
-        'count_err': '員数違い',
-        'suction': '吸い込み',
-        'axis_def': '軸不良',
-        'color_def': 'カラー不良',
-        'trans_def': '透過率不良',
-        'curve_def': 'カーブ不良',
-        'cen_th_def': '中心厚不良',
-        'diam_def': '径不良',
-        'r1_th_def': 'R1厚み不良'
-    }
-    
-    # クエリビルド
-    base_query = db.session.query(
-        PrdRecordModel.PRR_MONO_SYU,
-        func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
-        # 各不良項目の合計
-        func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-        func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-        func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-        func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-        func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-        func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-        func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-        func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-        func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-        func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-        func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-        func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-        func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-        func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-        func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-        func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-        func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-        func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-        func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-        func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-        func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-        func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-        func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-        func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-        func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-        func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-        func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-        func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-        func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-        func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),                func.sum(PrdRecordModel.PRR_OTHER_2).label('other_2'),
-        func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-        func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-        func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-        func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-        func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-        func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-        func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-        func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-        func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-        func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-        func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
+    """不良率が高い不良データをJSON形式で返す（集計はDefectAggregateServiceに共通化）"""
+    from .defect_aggregate import defect_aggregates
+
+    data = defect_aggregates.high_defect_rates(
+        request.args.get('date_type', 'r2'),  # r2: R2注入日, chk: 検査日
+        request.args.get('date_from'),
+        request.args.get('date_to')
     )
-    
-    # フィルター適用
-    if date_from:
-        if date_type == 'r2':
-            base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE >= date_from)
-        else:
-            base_query = base_query.filter(PrdRecordModel.PRR_CHK_DT >= date_from)
-    if date_to:
-        if date_type == 'r2':
-            base_query = base_query.filter(PrdRecordModel.PRR_R2_DATE <= date_to)
-        else:
-            base_query = base_query.filter(PrdRecordModel.PRR_CHK_DT <= date_to)
-    
-    # グループ化して結果取得
-    results = base_query.group_by(
-        PrdRecordModel.PRR_MONO_SYU
-    ).all()
-    
-    # モノマーマスタの取得
-    mono_mst = {m.MNO_SYU: {'name': m.MNO_NM, 'target': float(m.MNO_TARGET) if m.MNO_TARGET else None} 
-                for m in MnoMstModel.get_all()}
-    
-    # 結果の整形
-    defect_data = []
-    for row in results:
-        mono_syu = row.PRR_MONO_SYU or 'Unknown'
-        total_inject = float(row.total_inject or 0)
-        
-        # 各不良項目のデータを格納
-        for defect_key, defect_label in defect_items.items():
-            defect_count = float(getattr(row, defect_key) or 0)
-            if defect_count > 0:  # 不良数が0より大きい場合のみ追加
-                defect_rate = round((defect_count / total_inject * 100), 2) if total_inject > 0 else 0
-                defect_data.append({
-                    'mono_syu': mono_syu,
-                    'mono_name': mono_mst.get(mono_syu, {}).get('name', 'Unknown'),
-                    'target': mono_mst.get(mono_syu, {}).get('target'),
-                    'defect_type': defect_key,
-                    'defect_label': defect_label,
-                    'total_inject': total_inject,
-                    'defect_count': defect_count,
-                    'defect_rate': defect_rate
-                })
-    
-    # 不良率でソート（降順）
-    defect_data.sort(key=lambda x: x['defect_rate'], reverse=True)
-    
-    return jsonify({
-        'defect_data': defect_data,
-        'mono_mst': mono_mst,
-        'csv_import_time': SetMst.get_csv_import_time()
-    })
+    data['csv_import_time'] = SetMst.get_csv_import_time()
+    return jsonify(data)
 
 @main.route('/api/mono_syu_slide_data')
 @login_required
+@cached_response
 def mono_syu_slide_data():
     """モノマー種別スライド表示用のデータを取得"""
     # パラメータ取得
@@ -452,91 +258,26 @@ def mono_syu_slide_data():
             log_error("モノマーマスタデータがありません")
             return jsonify({'error': 'モノマーマスタデータがありません'}), 404
         
-        # モノマー種別ごとの良品率（期間全体）の取得
-        good_rate_query = db.session.query(
-            PrdRecordModel.PRR_MONO_SYU,
-            func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
-            func.sum(
-            PrdRecordModel.PRR_ROLL_MISS + 
-            PrdRecordModel.PRR_R1_BUB_CHK + 
-            PrdRecordModel.PRR_CURL_INS + 
-            PrdRecordModel.PRR_FILM_FLT_CK + 
-            PrdRecordModel.PRR_LEAK + 
-            PrdRecordModel.PRR_FILM_PULL + 
-            PrdRecordModel.PRR_FILM_NG_CK + 
-            PrdRecordModel.PRR_R2_BUB_REK + 
-            PrdRecordModel.PRR_CRACK + 
-            PrdRecordModel.PRR_TEAR_RLS + 
-            PrdRecordModel.PRR_TEAR + 
-            PrdRecordModel.PRR_PEEL + 
-            PrdRecordModel.PRR_CHIP + 
-            PrdRecordModel.PRR_POLY_CRK + 
-            PrdRecordModel.PRR_MOLD_SCR + 
-            PrdRecordModel.PRR_LENS_SCR + 
-            PrdRecordModel.PRR_R1_BUBBLE + 
-            PrdRecordModel.PRR_R2_BUBBLE + 
-            PrdRecordModel.PRR_DEFECT + 
-            PrdRecordModel.PRR_ELUTION + 
-            PrdRecordModel.PRR_HAZE + 
-            PrdRecordModel.PRR_CURL + 
-            PrdRecordModel.PRR_FILM_FLOAT + 
-            PrdRecordModel.PRR_R1_DEFECT + 
-            PrdRecordModel.PRR_FILM_NG + 
-            PrdRecordModel.PRR_FOREIGN + 
-            PrdRecordModel.PRR_CUT_WASTE + 
-            PrdRecordModel.PRR_FIBER + 
-            PrdRecordModel.PRR_MOLD_DIRT + 
-            PrdRecordModel.PRR_FILM_DIRT + 
-            PrdRecordModel.PRR_AXIS_1ST + 
-            PrdRecordModel.PRR_STRIPE_1ST + 
-            PrdRecordModel.PRR_EDGE_DEFECT + 
-            PrdRecordModel.PRR_ECC_1ST + 
-            PrdRecordModel.PRR_WASH_DROP + 
-            PrdRecordModel.PRR_UNKNOWN + 
-            PrdRecordModel.PRR_OTHER_1 + 
-            PrdRecordModel.PRR_OTHER_2 + 
-            PrdRecordModel.PRR_ECC_DEFECT + 
-            PrdRecordModel.PRR_DROP + 
-            PrdRecordModel.PRR_COUNT_ERR + 
-            PrdRecordModel.PRR_OTHER_1ST + 
-            PrdRecordModel.PRR_PEEL_2ND + 
-            PrdRecordModel.PRR_STRIPE_2ND + 
-            PrdRecordModel.PRR_SUCTION + 
-            PrdRecordModel.PRR_MOLD_2ND + 
-            PrdRecordModel.PRR_FILM_2ND + 
-            PrdRecordModel.PRR_DEFECT_2ND + 
-            PrdRecordModel.PRR_OTHER_2ND + 
-            PrdRecordModel.PRR_AXIS_DEF + 
-            PrdRecordModel.PRR_FILM_3RD + 
-            PrdRecordModel.PRR_COLOR_DEF + 
-            PrdRecordModel.PRR_TRANS_DEF + 
-            PrdRecordModel.PRR_CURVE_DEF + 
-            PrdRecordModel.PRR_CEN_TH_DEF + 
-            PrdRecordModel.PRR_DIAM_DEF + 
-            PrdRecordModel.PRR_R1_TH_DEF + 
-            PrdRecordModel.PRR_ECC_3RD + 
-            PrdRecordModel.PRR_EDGE_DEF_3 + 
-            PrdRecordModel.PRR_AXIS_3RD + 
-            PrdRecordModel.PRR_OTHER_3RD
-            ).label('total_defect')
+        # モノマー種別ごとの注入数・不良数（期間全体）を一括で取得（日別集計テーブルから集計）
+        mono_query = db.session.query(
+            PrdDailyAggModel.PRR_MONO_SYU,
+            func.sum(PrdDailyAggModel.PRR_INJECT_QTY).label('total_inject'),
+            total_defect_column(PrdDailyAggModel),
+            # 各不良項目の合計
+            *defect_sum_columns(PrdDailyAggModel)
         )
         
-        # フィルター適用
-        good_rate_query = good_rate_query.filter(PrdRecordModel.PRR_CHK_DT >= five_days_ago)
-        
-        good_rate_query = good_rate_query.filter(PrdRecordModel.PRR_CHK3_BY.isnot(None))
-        
-        # クエリをSQL文字列としてログ出力
-        sql_str = str(good_rate_query.statement.compile(
-            compile_kwargs={"literal_binds": True}))
-        log_error(f"実行クエリ: {sql_str}")
+        # フィルター適用（検査日、三次検査済み）
+        mono_query = PrdDailyAggModel.filter_period(
+            mono_query, 'CHK', five_days_ago, chk3_only=True
+        )
         
         # グループ化
-        good_rate_results = good_rate_query.group_by(
-            PrdRecordModel.PRR_MONO_SYU
+        mono_results = mono_query.group_by(
+            PrdDailyAggModel.PRR_MONO_SYU
         ).all()
         
-        if not good_rate_results:
+        if not mono_results:
             log_error("指定期間内のデータがありません")
             return jsonify({
                 'mono_mst': mono_mst,
@@ -546,10 +287,12 @@ def mono_syu_slide_data():
         
         # 良品率データの整形
         good_rates = {}
-        for row in good_rate_results:
+        mono_rows = {}
+        for row in mono_results:
             mono_syu = row.PRR_MONO_SYU
             if not mono_syu:
                 continue
+            mono_rows[mono_syu] = row
                 
             total_inject = float(row.total_inject or 0)
             total_defect = float(row.total_defect or 0)
@@ -568,258 +311,73 @@ def mono_syu_slide_data():
                 'good_rate': good_rate
             }
         
-        # 各モノマー種の上位不良項目を取得
+        # 各モノマー種の上位不良項目を集計結果から作成
         defect_items_data = {}
         
-        # モノマー種ごとに処理
         for mono_syu in mono_mst.keys():
+            row = mono_rows.get(mono_syu)
             
-            # 不良項目の日本語名マッピング
-            defect_labels = {
-                'roll_miss': '巻きミス',
-                'leak': 'モレ',
-                'film_pull': '膜ひっぱり',
-                'crack': 'ワレ',
-                'tear': 'チギレ',
-                'peel': 'ハガレ',
-                'chip': 'カケ',
-                'poly_crk': '重合ワレ',
-                'mold_scr': '型キズ',
-                'lens_scr': 'レンズキズ',
-                'r1_bubble': 'R1泡',
-                'r2_bubble': 'R2泡',
-                'defect': 'ブツ',
-                'elution': '溶出',
-                'haze': 'モヤ',
-                'curl': 'カール',
-                'film_float': '膜浮き',
-                'r1_defect': 'R1不良',
-                'film_ng': '膜不良',
-                'foreign': 'イブツ',
-                'cut_waste': 'カットくず',
-                'fiber': 'センイ',
-                'mold_dirt': 'モールド汚れ',
-                'film_dirt': '膜汚れ',
-                'axis_1st': '片軸',
-                'stripe_1st': '脈理',
-                'edge_defect': 'コバスリ不良',
-                'wash_drop': '洗浄落下',
-                'unknown': '不明',
-                'other_1': 'その他',
-                'ecc_defect': '偏心不良',
-                'drop': '落下',
-                'count_err': '員数違い',
-                'suction': '吸い込み',
-                'axis_def': '軸不良',
-                'color_def': 'カラー不良',
-                'trans_def': '透過率不良',
-                'curve_def': 'カーブ不良',
-                'cen_th_def': '中心厚不良',
-                'diam_def': '径不良',
-                'r1_th_def': 'R1厚み不良'
-            }
-
-            # 不良項目集計クエリ
-            defect_query = db.session.query(
-                # 各不良項目のカラム名と日本語名のマッピング
-                func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-                func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-                func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-                func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-                func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-                func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-                func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-                func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-                func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-                func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-                func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-                func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-                func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-                func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-                func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-                func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-                func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-                func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-                func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-                func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-                func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-                func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-                func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-                func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-                func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-                func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-                func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-                func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-                func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-                func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),                func.sum(PrdRecordModel.PRR_OTHER_2).label('other_2'),
-                func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-                func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-                func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-                func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-                func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-                func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-                func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-                func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-                func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-                func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-                func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
-            ).filter(PrdRecordModel.PRR_MONO_SYU == mono_syu)
-            
-            # フィルター適用
-            defect_query = defect_query.filter(PrdRecordModel.PRR_CHK_DT >= five_days_ago)
-            
-            defect_query = defect_query.filter(PrdRecordModel.PRR_CHK3_BY.isnot(None))
-            
-            # 結果取得
-            defect_result = defect_query.first()
-            
-            if defect_result:
-                
-                # 不良項目データの収集
-                defect_items = []
-                
-                for key in defect_labels.keys():
-                    value = getattr(defect_result, key, 0)
-                    if value and value > 0:
+            # 不良項目データの収集
+            defect_items = []
+            if row:
+                for key, value in defect_counts(row).items():
+                    if value > 0:
                         defect_items.append({
                             'code': key,
-                            'name': defect_labels[key],
+                            'name': DEFECT_LABELS[key],
                             'count': int(value)
                         })
-                
-                # 不良数の降順でソート
-                defect_items.sort(key=lambda x: x['count'], reverse=True)
-                
-                # 上位10項目を保存
-                defect_items_data[mono_syu] = defect_items[:10]
+            
+            # 不良数の降順でソート
+            defect_items.sort(key=lambda x: x['count'], reverse=True)
+            
+            # 上位10項目を保存
+            defect_items_data[mono_syu] = defect_items[:10]
+        
+        # モノマー種別・日別の注入数と不良数を一括で取得
+        daily_results = db.session.query(
+            PrdDailyAggModel.PRR_MONO_SYU,
+            PrdDailyAggModel.PDA_DATE.label('date'),
+            func.sum(PrdDailyAggModel.PRR_INJECT_QTY).label('total_inject'),
+            # 各不良項目の合計
+            *defect_sum_columns(PrdDailyAggModel)
+        ).filter(
+            PrdDailyAggModel.PDA_DATE_KBN == 'CHK',
+            PrdDailyAggModel.PDA_DATE >= five_days_ago,
+            PrdDailyAggModel.PDA_CHK3_FLG == 1,
+            PrdDailyAggModel.PRR_MONO_SYU.in_(list(mono_mst.keys()))
+        ).group_by(
+            PrdDailyAggModel.PRR_MONO_SYU,
+            PrdDailyAggModel.PDA_DATE
+        ).order_by(
+            PrdDailyAggModel.PRR_MONO_SYU,
+            PrdDailyAggModel.PDA_DATE
+        ).all()
         
-        # 結果をJSONで返す
-        # 直近2週間のモノマー種別ごとの良品率推移を取得
+        # モノマー種別ごとの日別の良品率に振り分け
+        daily_rates = {mono_syu: [] for mono_syu in mono_mst.keys()}
+        mono_dates = {mono_syu: [] for mono_syu in mono_mst.keys()}
         
-        # モノマー種別ごとの日別データを取得
-        daily_rates = {}
-        mono_dates = {}
+        # 不良数・注入数を配列にまとめ、不良率は行単位で計算する
+        daily_matrix = DefectMatrix(daily_results)
         
-        for mono_syu in mono_mst.keys():
-            # 日別の注入数と不良数を取得
-            daily_query = db.session.query(
-                func.date(PrdRecordModel.PRR_CHK_DT).label('date'),
-                func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
-                func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-                func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-                func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-                func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-                func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-                func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-                func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-                func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-                func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-                func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-                func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-                func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-                func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-                func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-                func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-                func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-                func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-                func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-                func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-                func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-                func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-                func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-                func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-                func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-                func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-                func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-                func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-                func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-                func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-                func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),                func.sum(PrdRecordModel.PRR_OTHER_2).label('other_2'),
-                func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-                func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-                func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-                func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-                func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-                func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-                func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-                func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-                func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-                func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-                func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
-            ).filter(
-                PrdRecordModel.PRR_MONO_SYU == mono_syu,
-                PrdRecordModel.PRR_CHK_DT >= five_days_ago,
-                PrdRecordModel.PRR_CHK3_BY.isnot(None)
-            ).group_by(
-                func.date(PrdRecordModel.PRR_CHK_DT)
-            ).order_by(
-                func.date(PrdRecordModel.PRR_CHK_DT)
-            ).all()
-            
-            locale.setlocale(locale.LC_TIME, 'ja_JP.UTF-8')
-            # 日別の良品率を計算
-            daily_data = []
-            dates = []
-            for row in daily_query:
-                date_str = row.date.strftime('%m月%d日') + row.date.strftime('(%a)')
-                if date_str not in dates:
-                    dates.append(date_str)
+        locale.setlocale(locale.LC_TIME, 'ja_JP.UTF-8')
+        for index, row in enumerate(daily_results):
+            dates = mono_dates[row.PRR_MONO_SYU]
+            date_str = row.date.strftime('%m月%d日') + row.date.strftime('(%a)')
+            if date_str not in dates:
+                dates.append(date_str)
 
-                defect_data = {}
-                if row.total_inject > 0:
-                    # 各不良項目のデータを格納
-                    defect_data[date_str] = {
-                        'roll_miss': round((float(row.roll_miss or 0) / float(row.total_inject or 0) * 100), 2),
-                        'leak': round((float(row.leak or 0) / float(row.total_inject or 0) * 100), 2),
-                        'film_pull': round((float(row.film_pull or 0) / float(row.total_inject or 0) * 100), 2),
-                        'crack': round((float(row.crack or 0) / float(row.total_inject or 0) * 100), 2),
-                        'tear': round((float(row.tear or 0) / float(row.total_inject or 0) * 100), 2),
-                        'peel': round((float(row.peel or 0) / float(row.total_inject or 0) * 100), 2),
-                        'chip': round((float(row.chip or 0) / float(row.total_inject or 0) * 100), 2),
-                        'poly_crk': round((float(row.poly_crk or 0) / float(row.total_inject or 0) * 100), 2),
-                        'mold_scr': round((float(row.mold_scr or 0) / float(row.total_inject or 0) * 100), 2),
-                        'lens_scr': round((float(row.lens_scr or 0) / float(row.total_inject or 0) * 100), 2),
-                        'r1_bubble': round((float(row.r1_bubble or 0) / float(row.total_inject or 0) * 100), 2),
-                        'r2_bubble': round((float(row.r2_bubble or 0) / float(row.total_inject or 0) * 100), 2),
-                        'defect': round((float(row.defect or 0) / float(row.total_inject or 0) * 100), 2),
-                        'elution': round((float(row.elution or 0) / float(row.total_inject or 0) * 100), 2),
-                        'haze': round((float(row.haze or 0) / float(row.total_inject or 0) * 100), 2),
-                        'curl': round((float(row.curl or 0) / float(row.total_inject or 0) * 100), 2),
-                        'film_float': round((float(row.film_float or 0) / float(row.total_inject or 0) * 100), 2),
-                        'r1_defect': round((float(row.r1_defect or 0) / float(row.total_inject or 0) * 100), 2),
-                        'film_ng': round((float(row.film_ng or 0) / float(row.total_inject or 0) * 100), 2),
-                        'foreign': round((float(row.foreign or 0) / float(row.total_inject or 0) * 100), 2),
-                        'cut_waste': round((float(row.cut_waste or 0) / float(row.total_inject or 0) * 100), 2),
-                        'fiber': round((float(row.fiber or 0) / float(row.total_inject or 0) * 100), 2),
-                        'mold_dirt': round((float(row.mold_dirt or 0) / float(row.total_inject or 0) * 100), 2),
-                        'film_dirt': round((float(row.film_dirt or 0) / float(row.total_inject or 0) * 100), 2),
-                        'axis_1st': round((float(row.axis_1st or 0) / float(row.total_inject or 0) * 100), 2),
-                        'stripe_1st': round((float(row.stripe_1st or 0) / float(row.total_inject or 0) * 100), 2),
-                        'edge_defect': round((float(row.edge_defect or 0) / float(row.total_inject or 0) * 100), 2),
-                        'wash_drop': round((float(row.wash_drop or 0) / float(row.total_inject or 0) * 100), 2),
-                        'unknown': round((float(row.unknown or 0) / float(row.total_inject or 0) * 100), 2),
-                        'other_1': round((float(row.other_1 or 0) / float(row.total_inject or 0) * 100), 2),
-                        'ecc_defect': round((float(row.ecc_defect or 0) / float(row.total_inject or 0) * 100), 2),
-                        'drop': round((float(row.drop or 0) / float(row.total_inject or 0) * 100), 2),
-                        'count_err': round((float(row.count_err or 0) / float(row.total_inject or 0) * 100), 2),
-                        'suction': round((float(row.suction or 0) / float(row.total_inject or 0) * 100), 2),
-                        'axis_def': round((float(row.axis_def or 0) / float(row.total_inject or 0) * 100), 2),
-                        'color_def': round((float(row.color_def or 0) / float(row.total_inject or 0) * 100), 2),
-                        'trans_def': round((float(row.trans_def or 0) / float(row.total_inject or 0) * 100), 2),
-                        'curve_def': round((float(row.curve_def or 0) / float(row.total_inject or 0) * 100), 2),    
-                        'cen_th_def': round((float(row.cen_th_def or 0) / float(row.total_inject or 0) * 100), 2),
-                        'diam_def': round((float(row.diam_def or 0) / float(row.total_inject or 0) * 100), 2),
-                        'r1_th_def': round((float(row.r1_th_def or 0) / float(row.total_inject or 0) * 100), 2)
-                    }
-                daily_data.append({
-                    'date': date_str,
-                    'defect_data': defect_data
-                })
-                
-            daily_rates[mono_syu] = daily_data
-            mono_dates[mono_syu] = dates
+            defect_data = {}
+            if daily_matrix.totals[index] > 0:
+                # 各不良項目のデータを格納
+                defect_data[date_str] = daily_matrix.row_rates(index)
+            daily_rates[row.PRR_MONO_SYU].append({
+                'date': date_str,
+                'defect_data': defect_data
+            })
         # お知らせデータを取得
-        set_mst = SetMst.query.first()
+        set_mst = get_settings()
         
         # NOTE_DATデータを取得
         latest_note_data = None
@@ -880,7 +438,7 @@ def mono_syu_slide_data():
             'latest_note': latest_note_data,
             'recent_notes_count': recent_notes_count,
             'graph_data': daily_rates,
-            'defect_labels': defect_labels,
+            'defect_labels': DEFECT_LABELS,
             'mono_dates': mono_dates
         })
         
@@ -892,6 +450,7 @@ def mono_syu_slide_data():
 @login_required
 def settings():
     """設定マスタの更新画面を表示"""
+    from app.forms import SetMstForm
     form = SetMstForm()
     settings = SetMst.query.filter_by(SET_ID=1).first()
     
@@ -922,6 +481,8 @@ def settings():
             
             try:
                 db.session.commit()
+                refresh_settings()
+                invalidate_response_cache()
                 flash('設定を更新しました。', 'success')
                 return redirect(url_for('main.settings'))
             except Exception as e:
@@ -979,12 +540,10 @@ def inspection_search():
     # 未検査品データを取得
     incomplete_inspections = PrdRecordModel.get_incomplete_inspections()
     
-    set_mst = SetMst.query.first()
-    
     return render_template(
         'inspection_search.html',
         incomplete_inspections=incomplete_inspections,
-        csv_import_time=set_mst.get_csv_import_time()
+        csv_import_time=SetMst.get_csv_import_time()
     )
 
 @main.route('/anneal_incomplete')
@@ -1023,10 +582,9 @@ def anneal_incomplete():
     )
     
     # 検索条件の適用
-    if date_from:
-        query = query.filter(func.date(PrdRecordModel.PRR_R1_IN_DATE) >= date_from)
-    if date_to:
-        query = query.filter(func.date(PrdRecordModel.PRR_R1_IN_DATE) <= date_to)
+    query = query.filter(*date_range(PrdRecordModel.PRR_R1_IN_DATE, date_from, date_to))
+    if invalid_dates(date_from, date_to):
+        flash('日付の形式が正しくないため、期間の条件を指定せずに表示しています')
     if mono_syu:
         query = query.filter(PrdRecordModel.PRR_MONO_SYU == mono_syu)
     
@@ -1054,7 +612,7 @@ def anneal_incomplete():
 def api_info_data():
     """お知らせ情報のAPI"""
     try:
-        setting = SetMst.query.first()
+        setting = get_settings()
         if not setting:
             return jsonify({})
             
@@ -1094,6 +652,7 @@ def fmc_cross_table():
 @login_required
 def api_fmc_cross_table():
     """FMC合格数クロス集計表APIエンドポイント"""
+    from app.ishida_models import FmcDat
     try:
         # 検索条件の取得
         cut_date_start = request.args.get('cut_date_start')
@@ -1201,7 +760,7 @@ def note_dat_list():
     next_num = page + 1 if has_next else None
     
     # 作業員マスタを取得（入力者選択用）
-    workers = WorkerModel.query.all()
+    workers = WorkerModel.get_all()
     
     # 作業員情報を辞書形式で取得（フォールバック用）
     worker_dict = {str(w.WRK_ID): w.WRK_NM for w in workers}
@@ -1278,7 +837,7 @@ def note_dat_input():
             return redirect(request.url)
     
     # 作業員マスタを取得
-    workers = WorkerModel.query.all()
+    workers = WorkerModel.get_all()
     
     # 当日の日付を設定
     today = datetime.now().strftime('%Y-%m-%d')
@@ -1294,7 +853,7 @@ def note_dat_detail(note_id):
         flash('指定された特記事項が見つかりません')
         return redirect(url_for('main.note_dat_list'))
     # 作業員情報を辞書形式で取得（フォールバック用）
-    workers = WorkerModel.query.all()
+    workers = WorkerModel.get_all()
     worker_dict = {str(w.WRK_ID): w.WRK_NM for w in workers}
     # 返信一覧を取得
     replies = NansDatModel.get_by_note_id(note_id)
@@ -1395,7 +954,7 @@ def note_dat_edit(note_id):
             return redirect(request.url)
     
     # 作業員マスタを取得
-    workers = WorkerModel.query.all()
+    workers = WorkerModel.get_all()
     
     return render_template('note_dat_edit.html', note=note, workers=workers)
 
@@ -1433,12 +992,14 @@ def note_dat_delete(note_id):
 @login_required
 def fmc_dat_create():
     """FMC_DATの新規作成"""
+    from app.forms import FmcDatForm
+    from app.ishida_models import FmcDat
     form = FmcDatForm()
-    form.FMC_MONOMER.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MMNO').all()]
-    form.FMC_FILM_CURVE.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MCRB').all()]
-    form.FMC_COLOR.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MCLR').all()]
-    form.FMC_CUT_MENU.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MCUT').all()]
-    form.FMC_ITEM.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MITM').all()]
+    form.FMC_MONOMER.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MMNO')]
+    form.FMC_FILM_CURVE.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MCRB')]
+    form.FMC_COLOR.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MCLR')]
+    form.FMC_CUT_MENU.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MCUT')]
+    form.FMC_ITEM.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MITM')]
     
     if form.validate_on_submit():
         fmc_dat = FmcDat()
@@ -1455,17 +1016,19 @@ def fmc_dat_create():
 @login_required
 def fmc_dat_edit(id):
     """FMC_DATの編集"""
+    from app.forms import FmcDatForm
+    from app.ishida_models import FmcDat
     fmc_dat = FmcDat.get_by_id(id)
     if not fmc_dat:
         flash('指定されたレコードが見つかりません。', 'error')
         return redirect(url_for('main.fmc_dat_list'))
     
     form = FmcDatForm(obj=fmc_dat)
-    form.FMC_MONOMER.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MMNO').all()]
-    form.FMC_FILM_CURVE.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MCRB').all()]
-    form.FMC_COLOR.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MCLR').all()]
-    form.FMC_CUT_MENU.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MCUT').all()]
-    form.FMC_ITEM.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.query.filter_by(KBN_TYP='MITM').all()]
+    form.FMC_MONOMER.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MMNO')]
+    form.FMC_FILM_CURVE.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MCRB')]
+    form.FMC_COLOR.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MCLR')]
+    form.FMC_CUT_MENU.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MCUT')]
+    form.FMC_ITEM.choices = [('', '--- 選択してください ---')] + [(m.KBN_ID, m.KBN_NM) for m in KbnMst.get_kbn_list('MITM')]
     
     if request.method == 'POST':
         # 削除アクションの処理
@@ -1492,6 +1055,7 @@ def fmc_dat_edit(id):
 @login_required
 def fmc_dat_delete(id):
     """FMC_DATの削除"""
+    from app.ishida_models import FmcDat
     fmc_dat = FmcDat.get_by_id(id)
     if not fmc_dat:
         return jsonify({'success': False, 'message': '指定されたレコードが見つかりません。'})
@@ -1505,6 +1069,7 @@ def fmc_dat_delete(id):
 @login_required
 def fmc_dat_list():
     """FMC_DATの一覧表示"""
+    from app.ishida_models import FmcDat
     # 検索パラメータの取得
     cut_date_start = request.args.get('cut_date_start')
     cut_date_end = request.args.get('cut_date_end')
@@ -1558,118 +1123,33 @@ def api_prd_record_monthly_data():
     prd_id = request.args.get('prd_id')
     
     try:
-        # クエリの構築（R2注入日で月別集計）
+        # クエリの構築（日別集計テーブルのR2注入日で月別集計）
         query = db.session.query(
-            func.date_format(PrdRecordModel.PRR_R2_DATE, '%Y-%m').label('month'),
-            func.sum(PrdRecordModel.PRR_INJECT_QTY).label('total_inject'),
-            # 各不良項目の合計（mono_syu_defect_detail_dataと同じ統合ルール）
-            func.sum(PrdRecordModel.PRR_ROLL_MISS).label('roll_miss'),
-            func.sum(PrdRecordModel.PRR_LEAK).label('leak'),
-            func.sum(PrdRecordModel.PRR_FILM_PULL).label('film_pull'),
-            func.sum(PrdRecordModel.PRR_CRACK).label('crack'),
-            func.sum(PrdRecordModel.PRR_TEAR + PrdRecordModel.PRR_TEAR_RLS).label('tear'),
-            func.sum(PrdRecordModel.PRR_PEEL + PrdRecordModel.PRR_PEEL_2ND).label('peel'),
-            func.sum(PrdRecordModel.PRR_CHIP).label('chip'),
-            func.sum(PrdRecordModel.PRR_POLY_CRK).label('poly_crk'),
-            func.sum(PrdRecordModel.PRR_MOLD_SCR + PrdRecordModel.PRR_MOLD_2ND).label('mold_scr'),
-            func.sum(PrdRecordModel.PRR_LENS_SCR).label('lens_scr'),
-            func.sum(PrdRecordModel.PRR_R1_BUBBLE + PrdRecordModel.PRR_R1_BUB_CHK).label('r1_bubble'),
-            func.sum(PrdRecordModel.PRR_R2_BUBBLE + PrdRecordModel.PRR_R2_BUB_REK).label('r2_bubble'),
-            func.sum(PrdRecordModel.PRR_DEFECT + PrdRecordModel.PRR_DEFECT_2ND).label('defect'),
-            func.sum(PrdRecordModel.PRR_ELUTION).label('elution'),
-            func.sum(PrdRecordModel.PRR_HAZE).label('haze'),
-            func.sum(PrdRecordModel.PRR_CURL + PrdRecordModel.PRR_CURL_INS).label('curl'),
-            func.sum(PrdRecordModel.PRR_FILM_FLOAT + PrdRecordModel.PRR_FILM_FLT_CK + PrdRecordModel.PRR_FILM_3RD).label('film_float'),
-            func.sum(PrdRecordModel.PRR_R1_DEFECT).label('r1_defect'),
-            func.sum(PrdRecordModel.PRR_FILM_NG + PrdRecordModel.PRR_FILM_NG_CK + PrdRecordModel.PRR_FILM_2ND).label('film_ng'),
-            func.sum(PrdRecordModel.PRR_FOREIGN).label('foreign'),
-            func.sum(PrdRecordModel.PRR_CUT_WASTE).label('cut_waste'),
-            func.sum(PrdRecordModel.PRR_FIBER).label('fiber'),
-            func.sum(PrdRecordModel.PRR_MOLD_DIRT).label('mold_dirt'),
-            func.sum(PrdRecordModel.PRR_FILM_DIRT + PrdRecordModel.PRR_EDGE_DEF_3).label('film_dirt'),
-            func.sum(PrdRecordModel.PRR_AXIS_1ST + PrdRecordModel.PRR_AXIS_3RD).label('axis_1st'),
-            func.sum(PrdRecordModel.PRR_STRIPE_1ST + PrdRecordModel.PRR_STRIPE_2ND).label('stripe_1st'),
-            func.sum(PrdRecordModel.PRR_EDGE_DEFECT).label('edge_defect'),
-            func.sum(PrdRecordModel.PRR_WASH_DROP).label('wash_drop'),
-            func.sum(PrdRecordModel.PRR_UNKNOWN).label('unknown'),
-            func.sum(PrdRecordModel.PRR_OTHER_1 + PrdRecordModel.PRR_OTHER_2 + PrdRecordModel.PRR_OTHER_3RD + PrdRecordModel.PRR_OTHER_2ND + PrdRecordModel.PRR_OTHER_1ST).label('other_1'),
-            func.sum(PrdRecordModel.PRR_ECC_DEFECT + PrdRecordModel.PRR_ECC_3RD + PrdRecordModel.PRR_ECC_1ST).label('ecc_defect'),
-            func.sum(PrdRecordModel.PRR_DROP).label('drop'),
-            func.sum(PrdRecordModel.PRR_COUNT_ERR).label('count_err'),
-            func.sum(PrdRecordModel.PRR_SUCTION).label('suction'),
-            func.sum(PrdRecordModel.PRR_AXIS_DEF).label('axis_def'),
-            func.sum(PrdRecordModel.PRR_COLOR_DEF).label('color_def'),
-            func.sum(PrdRecordModel.PRR_TRANS_DEF).label('trans_def'),
-            func.sum(PrdRecordModel.PRR_CURVE_DEF).label('curve_def'),
-            func.sum(PrdRecordModel.PRR_CEN_TH_DEF).label('cen_th_def'),
-            func.sum(PrdRecordModel.PRR_DIAM_DEF).label('diam_def'),
-            func.sum(PrdRecordModel.PRR_R1_TH_DEF).label('r1_th_def')
+            PrdDailyAggModel.PDA_DATE.label('day'),
+            func.sum(PrdDailyAggModel.PRR_INJECT_QTY).label('total_inject'),
+            # 各不良項目の合計
+            *defect_sum_columns(PrdDailyAggModel)
         )
         
         # フィルター適用
-        if start_date:
-            query = query.filter(PrdRecordModel.PRR_R2_DATE >= start_date)
-        if end_date:
-            query = query.filter(PrdRecordModel.PRR_R2_DATE <= end_date)
+        query = PrdDailyAggModel.filter_period(query, 'R2', start_date, end_date)
         if mono_syu:
-            query = query.filter(PrdRecordModel.PRR_MONO_SYU == mono_syu)
+            query = query.filter(PrdDailyAggModel.PRR_MONO_SYU == mono_syu)
         if prd_id:
-            query = query.filter(PrdRecordModel.PRR_PRD_ID == prd_id)
+            query = query.filter(PrdDailyAggModel.PRR_PRD_ID == prd_id)
         
         # NULLでない値のみ対象
-        query = query.filter(PrdRecordModel.PRR_R2_DATE.isnot(None))
-        query = query.filter(PrdRecordModel.PRR_INJECT_QTY.isnot(None))
+        query = query.filter(PrdDailyAggModel.PDA_DATE.isnot(None))
+        query = query.filter(PrdDailyAggModel.PRR_INJECT_QTY.isnot(None))
         
-        # 月別グループ化とソート
-        query = query.group_by(func.date_format(PrdRecordModel.PRR_R2_DATE, '%Y-%m'))
-        query = query.order_by(func.date_format(PrdRecordModel.PRR_R2_DATE, '%Y-%m'))
+        # 日付列のままグループ化し（インデックス順）、月ごとにまとめる
+        query = query.group_by(PrdDailyAggModel.PDA_DATE)
+        query = query.order_by(PrdDailyAggModel.PDA_DATE)
         
-        results = query.all()
+        results = group_by_month(query.all(), 'day')
         
         # 不良項目の日本語ラベル
-        defect_labels = {
-            'roll_miss': '巻きミス',
-            'leak': 'モレ',
-            'film_pull': '膜ひっぱり',
-            'crack': 'ワレ',
-            'tear': 'チギレ',
-            'peel': 'ハガレ',
-            'chip': 'カケ',
-            'poly_crk': '重合ワレ',
-            'mold_scr': '型キズ',
-            'lens_scr': 'レンズキズ',
-            'r1_bubble': 'R1泡',
-            'r2_bubble': 'R2泡',
-            'defect': 'ブツ',
-            'elution': '溶出',
-            'haze': 'モヤ',
-            'curl': 'カール',
-            'film_float': '膜浮き',
-            'r1_defect': 'R1不良',
-            'film_ng': '膜不良',
-            'foreign': 'イブツ',
-            'cut_waste': 'カットくず',
-            'fiber': 'センイ',
-            'mold_dirt': 'モールド汚れ',
-            'film_dirt': '膜汚れ',
-            'axis_1st': '片軸',
-            'stripe_1st': '脈理',
-            'edge_defect': 'コバスリ不良',
-            'wash_drop': '洗浄落下',
-            'unknown': '不明',
-            'other_1': 'その他',
-            'ecc_defect': '偏心不良',
-            'drop': '落下',
-            'count_err': '員数違い',
-            'suction': '吸い込み',
-            'axis_def': '軸不良',
-            'color_def': 'カラー不良',
-            'trans_def': '透過率不良',
-            'curve_def': 'カーブ不良',
-            'cen_th_def': '中心厚不良',
-            'diam_def': '径不良',
-            'r1_th_def': 'R1厚み不良'
-        }
+        defect_labels = DEFECT_LABELS
         
         # データ整形
         months = []
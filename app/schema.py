@@ -0,0 +1,364 @@
+import hashlib
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from .database import get_engine, get_database_url
+from .utils import log_error
+
+# ==================== スキーマ移行定義 ====================
+#
+# バージョン番号順に適用する。適用済みのバージョンはSCH_VERテーブルに記録する。
+# indexes: (テーブル名, インデックス名, 列のタプル)
+# columns: (テーブル名, 列名, 列定義)（既に存在する列は追加しない）
+# statements: 追加で実行するSQL文（インデックス以外の変更用）。SQL文のリストを返す関数も指定でき、
+#             移行の適用時に呼び出す（起動時のスキーマ確認で集計・取込ジョブのモジュールを読み込まないため）
+
+
+def _daily_agg_statements():
+    """生産実績日別集計テーブルの作成と、既存の生産実績からの全件集計"""
+    from .daily_agg import CREATE_PRD_DAILY_AGG_SQL, REBUILD_PRD_DAILY_AGG_SQL
+    return [CREATE_PRD_DAILY_AGG_SQL] + REBUILD_PRD_DAILY_AGG_SQL
+
+
+def _imp_job_statements():
+    """CSV取込ジョブテーブルの作成"""
+    from .import_jobs import CREATE_IMP_JOB_SQL
+    return [CREATE_IMP_JOB_SQL]
+
+
+MIGRATIONS = [
+    {
+        'version': 1,
+        'description': '分析用日付列のセカンダリインデックス追加',
+        'indexes': [
+            # 不良率分析・不良項目別分析・進捗・実績一覧（R1注入日範囲 + モノマー種）
+            ('PRD_RECORD', 'IX_PRR_R1_IN_DATE', ('PRR_R1_IN_DATE', 'PRR_MONO_SYU')),
+            # モノマー種別不良率・高不良率（R2注入日範囲、三次検査済み、日付×モノマー種で集計）
+            ('PRD_RECORD', 'IX_PRR_R2_DATE', ('PRR_R2_DATE', 'PRR_MONO_SYU', 'PRR_CHK3_BY')),
+            # 高不良率（検査日基準）・良品率スライド・モノマー種別良品率（検査日範囲）
+            ('PRD_RECORD', 'IX_PRR_CHK_DT', ('PRR_CHK_DT', 'PRR_MONO_SYU', 'PRR_CHK3_BY')),
+            # モノマー種ごとの検査日範囲（スライド・良品率のモノマー種別ループ）
+            ('PRD_RECORD', 'IX_PRR_MONO_CHK', ('PRR_MONO_SYU', 'PRR_CHK_DT')),
+            # 指示データとの結合（SJI_PRD_ID, SJI_DATE = PRR_PRD_ID, PRR_R1_IN_DATE）
+            ('PRD_RECORD', 'IX_PRR_PRD_R1', ('PRR_PRD_ID', 'PRR_R1_IN_DATE')),
+            # スピンコート分析（コート日範囲、種類除外、日付×回数で集計）
+            ('SPC_DAT', 'IX_SPC_COAT_DATE', ('SPC_COAT_DATE', 'SPC_TYPE', 'SPC_TIMES')),
+            # ハードコート分析（コート日範囲、種類除外、日付×回数で集計）
+            ('HDC_DAT', 'IX_HDC_COAT_DATE', ('HDC_COAT_DATE', 'HDC_TYPE', 'HDC_TIMES')),
+            # 膜カット分析（カット日範囲 + モノマー）
+            ('FMC_DAT', 'IX_FMC_CUT_DATE', ('FMC_CUT_DATE', 'FMC_MONOMER')),
+            # 膜加工分析（検査日範囲 + 色）
+            ('FMP_DAT', 'IX_FMP_INSP_DATE', ('FMP_INSP_DATE', 'FMP_COLOR')),
+        ],
+        'statements': [],
+    },
+    {
+        'version': 2,
+        'description': '生産実績日別集計テーブル（PRD_DAILY_AGG）の作成',
+        'indexes': [],
+        # テーブル作成後、既存の生産実績から全件集計する
+        'statements': _daily_agg_statements,
+    },
+    {
+        'version': 3,
+        'description': 'CSV取込ジョブテーブル（IMP_JOB）の作成',
+        'indexes': [],
+        'statements': _imp_job_statements,
+    },
+    {
+        'version': 4,
+        'description': '実績一覧のキーセットページ分割用インデックス追加',
+        'indexes': [
+            # R1・R2実績／検査実績（R1注入日 降順, ロットNo 降順でページ分割）
+            ('PRD_RECORD', 'IX_PRR_R1_LOT', ('PRR_R1_IN_DATE', 'PRR_LOT_NO')),
+        ],
+        'statements': [],
+    },
+    {
+        'version': 5,
+        'description': '設定マスタにデータ世代（SET_DATA_GEN）を追加',
+        'indexes': [],
+        # 取込ワーカーでの取込完了をWebのプロセスへ伝える（settings_service.publish_data_generation）
+        'columns': [
+            ('SET_MST', 'SET_DATA_GEN', "int NOT NULL DEFAULT 0 COMMENT 'データ世代'"),
+        ],
+        'statements': [],
+    },
+]
+
+LATEST_VERSION = max(m['version'] for m in MIGRATIONS)
+
+_CREATE_SCH_VER_SQL = """
+    CREATE TABLE IF NOT EXISTS SCH_VER (
+        SCV_VERSION int NOT NULL COMMENT 'スキーマバージョン',
+        SCV_DESC varchar(100) COMMENT '内容',
+        SCV_APPLIED_DT datetime COMMENT '適用日時',
+        PRIMARY KEY (SCV_VERSION)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='スキーマバージョン'
+"""
+
+
+def get_current_version(conn):
+    """適用済みの最新スキーマバージョンを取得（未管理の場合は0）"""
+    exists = conn.execute(text("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'SCH_VER'
+    """)).scalar()
+    if not exists:
+        return 0
+    version = conn.execute(text("SELECT MAX(SCV_VERSION) FROM SCH_VER")).scalar()
+    return int(version or 0)
+
+
+def _index_exists(conn, table_name, index_name):
+    """インデックスが存在するか確認"""
+    return conn.execute(text("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table_name
+          AND INDEX_NAME = :index_name
+    """), {'table_name': table_name, 'index_name': index_name}).scalar() > 0
+
+
+def _column_exists(conn, table_name, column_name):
+    """列が存在するか確認"""
+    return conn.execute(text("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table_name
+          AND COLUMN_NAME = :column_name
+    """), {'table_name': table_name, 'column_name': column_name}).scalar() > 0
+
+
+def migrate(target_version=None, engine=None):
+    """
+    未適用のスキーマ移行を順に適用する
+
+    インデックス・列は既に存在する場合は作成をスキップするため、
+    DDLファイルから作成した新規環境に対しても安全に実行できる。
+
+    戻り値:
+        list: 適用したバージョン番号のリスト
+    """
+    engine = engine or get_engine()
+    target_version = target_version or LATEST_VERSION
+    applied = []
+
+    with engine.connect() as conn:
+        conn.execute(text(_CREATE_SCH_VER_SQL))
+        conn.commit()
+        current = get_current_version(conn)
+
+        for migration in MIGRATIONS:
+            version = migration['version']
+            if version <= current or version > target_version:
+                continue
+
+            try:
+                for table_name, index_name, columns in migration['indexes']:
+                    if _index_exists(conn, table_name, index_name):
+                        continue
+                    conn.execute(text(
+                        f"CREATE INDEX {index_name} ON {table_name} ({', '.join(columns)})"
+                    ))
+                for table_name, column_name, definition in migration.get('columns', ()):
+                    if _column_exists(conn, table_name, column_name):
+                        continue
+                    conn.execute(text(
+                        f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}"
+                    ))
+                statements = migration['statements']
+                if callable(statements):
+                    statements = statements()
+                for statement in statements:
+                    conn.execute(text(statement))
+
+                conn.execute(text("""
+                    INSERT INTO SCH_VER (SCV_VERSION, SCV_DESC, SCV_APPLIED_DT)
+                    VALUES (:version, :description, :applied_dt)
+                """), {
+                    'version': version,
+                    'description': migration['description'],
+                    'applied_dt': datetime.now()
+                })
+                conn.commit()
+                applied.append(version)
+            except Exception as e:
+                conn.rollback()
+                log_error(f'スキーマ移行(バージョン{version})の適用中にエラーが発生しました: {str(e)}')
+                raise
+
+    return applied
+
+
+# ==================== 起動時のスキーマ確認 ====================
+#
+# CGIではリクエストごとにプロセスが起動するため、確認結果は一時ファイルにも保存し、
+# 有効期間内に最新バージョンを確認済みであればDBへの問い合わせを省略する。
+
+_checked_version = None
+
+
+def _schema_cache_path():
+    """スキーマ確認結果のキャッシュファイル（接続先ごとに分ける）"""
+    key = hashlib.md5(get_database_url().encode('utf-8')).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f'jisseki_schema_{key}')
+
+
+def check_schema_version(max_age=3600, engine=None):
+    """
+    スキーマが最新バージョンまで移行済みか確認する（アプリ起動時に呼び出す）
+
+    max_age秒以内に最新バージョンを確認済みであればキャッシュの値を返す。
+    移行が必要な場合はログに出力するのみで、起動は止めない。
+
+    戻り値:
+        int: スキーマバージョン（取得できない場合はNone）
+    """
+    global _checked_version
+    if _checked_version == LATEST_VERSION:
+        return _checked_version
+
+    cache_path = _schema_cache_path()
+    try:
+        if time.time() - os.path.getmtime(cache_path) < max_age:
+            with open(cache_path, encoding='utf-8') as f:
+                cached = int(f.read().strip() or 0)
+            if cached >= LATEST_VERSION:
+                _checked_version = cached
+                return cached
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with (engine or get_engine()).connect() as conn:
+            version = get_current_version(conn)
+    except Exception as e:
+        log_error(f'スキーマバージョンの確認中にエラーが発生しました: {str(e)}')
+        return None
+
+    if version < LATEST_VERSION:
+        log_error(f'スキーマが最新ではありません（現在: {version} / 最新: {LATEST_VERSION}）。manage_db.py migrate を実行してください')
+        return version
+
+    _checked_version = version
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            f.write(str(version))
+    except OSError as e:
+        log_error(f'スキーマ確認結果の保存中にエラーが発生しました: {str(e)}')
+    return version
+
+
+# ==================== 実行計画の確認 ====================
+#
+# 各APIの代表的なクエリと、使用されるべきインデックス。
+# (API名, SQL, 許容するインデックス名のタプル)
+
+EXPLAIN_CHECKS = [
+    ('/api/defect_data (日別集計)', """
+        SELECT SUM(PDA_INJECT_QTY), SUM(PDA_ROLL_MISS) FROM PRD_DAILY_AGG
+        WHERE PDA_DATE_KBN = 'R1' AND PDA_DATE >= :date_from AND PDA_DATE <= :date_to
+     """, ('IX_PDA_DATE',)),
+    ('/api/defect_data (複数の日付条件)', """
+        SELECT SUM(PRR_INJECT_QTY), SUM(PRR_ROLL_MISS) FROM PRD_RECORD
+        WHERE PRR_R1_IN_DATE >= :date_from AND PRR_R1_IN_DATE <= :date_to
+          AND PRR_CHK_DT >= :date_from AND PRR_CHK_DT <= :date_to
+     """, ('IX_PRR_R1_IN_DATE', 'IX_PRR_CHK_DT')),
+    ('/api/defect_by_item_data', """
+        SELECT PRR_MONO_SYU, SUM(PRR_INJECT_QTY), SUM(PRR_LEAK) FROM PRD_RECORD
+        WHERE PRR_R1_IN_DATE >= :date_from AND PRR_R1_IN_DATE <= :date_to
+        GROUP BY PRR_MONO_SYU
+     """, ('IX_PRR_R1_IN_DATE',)),
+    ('/api/mono_syu_defect_detail_data', """
+        SELECT DATE(PRR_R2_DATE), PRR_MONO_SYU, SUM(PRR_INJECT_QTY) FROM PRD_RECORD
+        WHERE PRR_R2_DATE >= :date_from AND PRR_R2_DATE <= :date_to
+          AND PRR_CHK3_BY IS NOT NULL
+        GROUP BY DATE(PRR_R2_DATE)
+     """, ('IX_PRR_R2_DATE',)),
+    ('/api/high_defect_rate_data (検査日・日別集計)', """
+        SELECT PDA_MONO_SYU, SUM(PDA_INJECT_QTY) FROM PRD_DAILY_AGG
+        WHERE PDA_DATE_KBN = 'CHK' AND PDA_DATE >= :date_from AND PDA_DATE <= :date_to
+        GROUP BY PDA_MONO_SYU
+     """, ('IX_PDA_DATE',)),
+    ('/api/mono_syu_slide_data', """
+        SELECT PDA_MONO_SYU, PDA_DATE, SUM(PDA_INJECT_QTY) FROM PRD_DAILY_AGG
+        WHERE PDA_DATE_KBN = 'CHK' AND PDA_DATE >= :date_from AND PDA_CHK3_FLG = 1
+        GROUP BY PDA_MONO_SYU, PDA_DATE
+     """, ('IX_PDA_DATE',)),
+    ('/mono_syu_achievement', """
+        SELECT s.SJI_PRD_ID, SUM(p.PRR_INJECT_QTY) FROM SJI_DAT s
+        JOIN PRD_RECORD p ON s.SJI_PRD_ID = p.PRR_PRD_ID AND s.SJI_DATE = p.PRR_R1_IN_DATE
+        GROUP BY s.SJI_PRD_ID, s.SJI_DATE
+     """, ('IX_PRR_PRD_R1',)),
+    ('/api/spc_defect_detail_data', """
+        SELECT DATE(SPC_COAT_DATE), SUM(SPC_SHEETS) FROM SPC_DAT
+        WHERE SPC_COAT_DATE >= :date_from AND SPC_COAT_DATE <= :date_to AND SPC_TYPE != 4
+        GROUP BY DATE(SPC_COAT_DATE)
+     """, ('IX_SPC_COAT_DATE',)),
+    ('/api/hdc_defect_detail_data', """
+        SELECT DATE(HDC_COAT_DATE), HDC_TIMES, SUM(HDC_COAT_CNT) FROM HDC_DAT
+        WHERE HDC_COAT_DATE >= :date_from AND HDC_COAT_DATE <= :date_to AND HDC_TYPE != 5
+        GROUP BY DATE(HDC_COAT_DATE), HDC_TIMES
+     """, ('IX_HDC_COAT_DATE',)),
+    ('/api/fmc_defect_detail_data', """
+        SELECT DATE(FMC_CUT_DATE), SUM(FMC_INPUT_QTY) FROM FMC_DAT
+        WHERE FMC_CUT_DATE >= :date_from AND FMC_CUT_DATE <= :date_to
+        GROUP BY DATE(FMC_CUT_DATE)
+     """, ('IX_FMC_CUT_DATE',)),
+    ('/api/mono_syu_defect_data (日別集計)', """
+        SELECT PDA_DATE, PDA_MONO_SYU, SUM(PDA_INJECT_QTY) FROM PRD_DAILY_AGG
+        WHERE PDA_DATE_KBN = 'R2' AND PDA_DATE >= :date_from AND PDA_DATE <= :date_to
+          AND PDA_CHK3_FLG = 1
+        GROUP BY PDA_DATE, PDA_MONO_SYU
+     """, ('IX_PDA_DATE',)),
+    ('/api/fmp_defect_detail_data', """
+        SELECT DATE(FMP_INSP_DATE), SUM(FMP_PROC_SHTS) FROM FMP_DAT
+        WHERE FMP_INSP_DATE >= :date_from AND FMP_INSP_DATE <= :date_to
+        GROUP BY DATE(FMP_INSP_DATE)
+     """, ('IX_FMP_INSP_DATE',)),
+]
+
+
+def check_explain(days=30, engine=None):
+    """
+    各APIの代表クエリをEXPLAINし、想定したインデックスが使われているか確認する
+
+    戻り値:
+        list: [{'api', 'ok', 'key', 'expected', 'rows'}]
+    """
+    engine = engine or get_engine()
+    params = {
+        'date_from': datetime.now() - timedelta(days=days),
+        'date_to': datetime.now(),
+        'mono_syu': 'A',
+    }
+    results = []
+
+    with engine.connect() as conn:
+        for api_name, sql, expected in EXPLAIN_CHECKS:
+            try:
+                plan = conn.execute(text(f"EXPLAIN {sql}"), params).mappings().all()
+                keys = [row['key'] for row in plan if row['key']]
+                results.append({
+                    'api': api_name,
+                    'ok': any(key in expected for key in keys),
+                    'key': ', '.join(keys) or None,
+                    'expected': ', '.join(expected),
+                    'rows': sum(int(row['rows'] or 0) for row in plan),
+                })
+            except Exception as e:
+                log_error(f'{api_name}の実行計画の取得中にエラーが発生しました: {str(e)}')
+                results.append({
+                    'api': api_name,
+                    'ok': False,
+                    'key': None,
+                    'expected': ', '.join(expected),
+                    'rows': None,
+                })
+
+    return results
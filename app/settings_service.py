@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import func
+
+from .database import get_db_session
+from .utils import log_error
+
+# ==================== 設定（SET_MST）サービス ====================
+#
+# SET_MSTの1行（描画間隔・抽出期間・CSV取込時間・お知らせ）をプロセス内に保持する。
+# CSV取込時間の更新（SetMst.set_csv_import_time）と設定画面の保存ではすぐに読み直し、
+# 他のプロセス（取込ワーカーなど）での更新はSETTINGS_CACHE_TIMEOUT（秒）ごとの読み直しで反映する。
+#
+# データ世代（data_generation）はデータが更新されるたびに増える単調増加のカウンタ。
+# 同じプロセスでの書き込みはbump_data_generation()で、他のプロセスでの取込・設定変更は
+# 読み直した設定の変化で検知して進める。応答キャッシュなどはこの値をキーに含める。
+#
+# 取込ワーカーでの取込はSET_MST.SET_DATA_GEN（共有のデータ世代）を進めて
+# （publish_data_generation）Webのプロセスへ伝える。読み直した値が変わっていれば
+# データ世代を進め、製品マスタの取込なども反映するためマスタキャッシュも破棄する。
+
+SETTINGS_CACHE_TIMEOUT = int(os.getenv('SETTINGS_CACHE_TIMEOUT', 30))
+
+SETTING_COLUMNS = (
+    'SET_ID', 'SET_DRW_INT', 'SET_CHS_TM', 'SET_JS_RD_DT',
+    'SET_INFO_H1', 'SET_INFO_1', 'SET_INFO_H2', 'SET_INFO_2', 'SET_INFO_H3', 'SET_INFO_3',
+    'SET_DATA_GEN',
+)
+
+
+class Settings(namedtuple('Settings', SETTING_COLUMNS)):
+    """SET_MSTの1行のスナップショット（SetMstと同じ属性名で参照できる）"""
+    __slots__ = ()
+
+    def get_csv_import_time(self):
+        return self.SET_JS_RD_DT.strftime('%Y/%m/%d %H:%M:%S') if self.SET_JS_RD_DT else None
+
+
+_lock = threading.Lock()
+_settings = None
+_loaded = None
+_generation = 0
+
+
+def _load_settings():
+    """SET_MSTを読み込んでスナップショットを作成（行がない場合はNone）"""
+    from .models import SetMst
+
+    session = get_db_session()
+    if not session:
+        raise RuntimeError('データベースセッションの取得に失敗しました')
+    try:
+        row = session.query(SetMst).first()
+        if row is None:
+            return None
+        return Settings(*(getattr(row, col) for col in SETTING_COLUMNS))
+    finally:
+        session.close()
+
+
+def refresh_settings():
+    """
+    SET_MSTを読み直す（設定・CSV取込時間を更新した後に呼び出す）
+
+    読み直した内容が前回と異なる場合はデータ世代を進める。
+    """
+    global _settings, _loaded, _generation
+    try:
+        settings = _load_settings()
+    except Exception as e:
+        log_error(f'設定の取得中にエラーが発生しました: {str(e)}')
+        return _settings
+
+    with _lock:
+        previous = _settings
+        if _loaded is not None and settings != previous:
+            _generation += 1
+        _settings = settings
+        _loaded = time.monotonic()
+
+    # 他のプロセスで取込が完了した場合はマスタも読み直す
+    if previous and settings and previous.SET_DATA_GEN != settings.SET_DATA_GEN:
+        from .master_cache import invalidate_master_cache
+        invalidate_master_cache()
+    return settings
+
+
+def get_settings():
+    """設定のスナップショットを取得（行がない場合はNone）"""
+    if _loaded is None or time.monotonic() - _loaded >= SETTINGS_CACHE_TIMEOUT:
+        return refresh_settings()
+    return _settings
+
+
+def get_csv_import_time():
+    """最終CSV取込時間を表示用の文字列で取得（未設定の場合はNone）"""
+    settings = get_settings()
+    return settings.get_csv_import_time() if settings else None
+
+
+def data_generation():
+    """
+    データ世代を取得する
+
+    有効期間を過ぎていれば設定を読み直し、他のプロセスでの取込を反映してから返す。
+    """
+    get_settings()
+    return _generation
+
+
+def bump_data_generation():
+    """データ世代を進める（同じプロセスでデータを更新した時に呼び出す）"""
+    global _generation
+    with _lock:
+        _generation += 1
+        return _generation
+
+
+def publish_data_generation():
+    """
+    共有のデータ世代（SET_MST.SET_DATA_GEN）を進める
+
+    取込ワーカーなど、Webとは別のプロセスでデータを更新した後に呼び出す。
+    各プロセスはSETTINGS_CACHE_TIMEOUT秒以内に設定を読み直して変更を検知する。
+
+    Returns:
+        bool: 更新できた場合はTrue
+    """
+    from .models import SetMst
+
+    session = get_db_session()
+    if not session:
+        log_error('データベースセッションの取得に失敗しました')
+        return False
+    try:
+        session.query(SetMst).update(
+            {SetMst.SET_DATA_GEN: func.coalesce(SetMst.SET_DATA_GEN, 0) + 1},
+            synchronize_session=False
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        log_error(f'データ世代の更新中にエラーが発生しました: {str(e)}')
+        return False
+    finally:
+        session.close()
+
+    refresh_settings()
+    return True
@@ -1,11 +1,7 @@
-from flask import Blueprint, render_template, request, redirect, flash
-from .models import SjiDatModel, PrdRecord
-from .master_models import PrdMstModel
+from flask import Blueprint, render_template, request, redirect, flash, url_for, jsonify
 from .utils import log_error
-from app.ishida_models import FmcDat, FmpDat
-import tempfile
-import os
-from flask_login import login_required
+from .import_jobs import enqueue_import, get_import_job
+from flask_login import login_required, current_user
 
 upload_bp   = Blueprint('upload', __name__)
 
@@ -29,33 +25,10 @@ def upload():
         
         if file:
             try:
-                # 一時ファイルの作成
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    # アップロードされたファイルを一時ファイルに保存
-                    file.save(temp_path)
-                
-                try:
-                    # import_from_csv関数を使用してCSVデータをインポート
-                    success, message = PrdRecord.import_from_csv(
-                        temp_path,
-                        encoding='shift_jis'  # Shift-JISエンコーディングを指定
-                    )
-                    
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                
-                finally:
-                    # 一時ファイルの削除
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
-            
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('prd', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
@@ -85,33 +58,10 @@ def upload2():
         
         if file:
             try:
-                # 一時ファイルの作成
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    # アップロードされたファイルを一時ファイルに保存
-                    file.save(temp_path)
-                
-                try:
-                    # import_from_csv関数を使用してCSVデータをインポート
-                    success, message = PrdRecord.import_from_csv2(
-                        temp_path,
-                        encoding='shift_jis'  # Shift-JISエンコーディングを指定
-                    )
-                    
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                
-                finally:
-                    # 一時ファイルの削除
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
-            
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('prd_process', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
@@ -139,38 +89,15 @@ def upload4():
         
         if file:
             try:
-                # 一時ファイルの作成
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    # アップロードされたファイルを一時ファイルに保存
-                    file.save(temp_path)
-                    
-                try:
-                    # import_from_csv関数を使用してCSVデータをインポート
-                    success, message = SjiDatModel.import_from_csv(
-                        temp_path,
-                        encoding='shift_jis'
-                    )
-                    
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                    
-                finally:
-                    # 一時ファイルの削除
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
-                        
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('sji', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
                 return redirect(request.url)
-            
+    
     return render_template('upload4.html')
 
 @upload_bp.route('/upload5', methods=['GET', 'POST'])
@@ -193,38 +120,15 @@ def upload5():
         
         if file:
             try:
-                # 一時ファイルの作成
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    # アップロードされたファイルを一時ファイルに保存
-                    file.save(temp_path)
-                    
-                try:
-                    # import_from_csv関数を使用してCSVデータをインポート
-                    success, message = FmcDat.import_from_csv(
-                        temp_path,
-                        encoding='shift_jis'
-                    )
-                    
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                    
-                finally:
-                    # 一時ファイルの削除
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
-                        
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('fmc', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
                 return redirect(request.url)
-            
+    
     return render_template('upload5.html')
 
 @upload_bp.route('/upload6', methods=['GET', 'POST'])
@@ -247,38 +151,15 @@ def upload6():
         
         if file:
             try:
-                # 一時ファイルの作成
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    # アップロードされたファイルを一時ファイルに保存
-                    file.save(temp_path)
-                    
-                try:
-                    # import_from_csv関数を使用してCSVデータをインポート
-                    success, message = FmpDat.import_from_csv(
-                        temp_path,
-                        encoding='shift_jis'
-                    )
-                    
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                    
-                finally:
-                    # 一時ファイルの削除
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
-                        
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('fmp', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
                 return redirect(request.url)
-            
+    
     return render_template('upload6.html')
 
 @upload_bp.route('/upload_prd_mst', methods=['GET', 'POST'])
@@ -302,33 +183,10 @@ def upload_prd_mst():
         
         if file:
             try:
-                # 一時ファイルの作成
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                    temp_path = temp_file.name
-                    # アップロードされたファイルを一時ファイルに保存
-                    file.save(temp_path)
-                
-                try:
-                    # import_from_csv関数を使用してCSVデータをインポート
-                    success, message = PrdMstModel.import_from_csv(
-                        temp_path,
-                        encoding='shift_jis'  # Shift-JISエンコーディングを指定
-                    )
-                    
-                    if success:
-                        flash(message)
-                        return redirect(request.url)
-                    else:
-                        flash(f'インポート中にエラーが発生しました: {message}')
-                        return redirect(request.url)
-                
-                finally:
-                    # 一時ファイルの削除
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        log_error(f'一時ファイルの削除中にエラーが発生しました: {str(e)}')
-            
+                # ファイルを保存して取込ジョブに登録（取込はワーカーが実行する）
+                job_id = enqueue_import('prd_mst', file, current_user.get_id(), encoding='shift_jis')
+                flash(f'取込を受け付けました（ジョブID: {job_id}）')
+                return redirect(url_for(request.endpoint, job_id=job_id))
             except Exception as e:
                 log_error(f'CSVファイル処理中にエラーが発生しました: {str(e)}')
                 flash('CSVファイルの処理中にエラーが発生しました')
@@ -336,4 +194,11 @@ def upload_prd_mst():
     
     return render_template('upload_prd_mst.html')
 
-
+@upload_bp.route('/api/import_jobs/<int:job_id>')
+@login_required
+def import_job_status(job_id):
+    """取込ジョブの状態（読込件数・登録件数・エラー・処理速度）を返す"""
+    job = get_import_job(job_id)
+    if job is None:
+        return jsonify({'error': 'ジョブが見つかりません'}), 404
+    return jsonify(job)
@@ -0,0 +1,118 @@
+# bench_defect_rates.py
+#
+# 分析APIの不良率計算（日別×モノマー種の集計行 → 不良数・不良率の辞書）を計測する
+#
+#   python bench_defect_rates.py                    365日×10モノマー種で各5回計測して比較
+#   python bench_defect_rates.py --days 30 --monos 5
+#
+# 従来の方式（行ごとに getattr・float・round で不良数／不良率の辞書を組み立てる）と、
+# DefectMatrix（array('d') にまとめて行単位で計算する）を同じ集計行で比較し、結果が一致することも確認する。
+# データベースは使用しない（集計行は MySQL の SUM と同じく Decimal の値で生成する）。
+import argparse
+import random
+import statistics
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.defect_categories import DEFECT_LABELS, DefectMatrix
+
+
+def make_rows(days, monos, zero_ratio, seed):
+    """
+    日別×モノマー種の集計行（query.all() と同じ列構成）を生成する
+
+    戻り値:
+        list: [Row(date, PRR_MONO_SYU, total_inject, 不良キー...)]
+    """
+    Row = namedtuple('Row', ('date', 'PRR_MONO_SYU', 'total_inject') + tuple(DEFECT_LABELS))
+    rand = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    rows = []
+    for mono in range(monos):
+        for day in range(days):
+            # 不良は一部の項目に偏るため、大半の項目は0（またはNULL）にする
+            counts = [
+                None if rand.random() < zero_ratio / 2 else
+                Decimal(0) if rand.random() < zero_ratio else
+                Decimal(rand.randint(1, 40))
+                for _ in DEFECT_LABELS
+            ]
+            total_inject = Decimal(rand.randint(0, 3000)) if day % 50 else Decimal(0)
+            rows.append(Row(start + timedelta(days=day), f'M{mono:02d}', total_inject, *counts))
+    return rows
+
+
+def per_field_payload(rows):
+    """従来の方式（行・不良項目ごとに getattr して辞書を組み立てる）"""
+    defect_data = []
+    defect_rates = []
+    total_rates = []
+    for row in rows:
+        total_inject = float(row.total_inject or 0)
+        counts = {key: float(getattr(row, key) or 0) for key in DEFECT_LABELS}
+        defect_data.append({'total_inject': total_inject, **counts})
+        if total_inject > 0:
+            defect_rates.append({
+                key: round(count / total_inject * 100, 2)
+                for key, count in counts.items()
+            })
+            total_rates.append(round((sum(counts.values()) / total_inject) * 100, 2))
+        else:
+            defect_rates.append({key: 0 for key in counts})
+            total_rates.append(0)
+    return defect_data, defect_rates, total_rates
+
+
+def matrix_payload(rows):
+    """DefectMatrix（array('d') にまとめて行単位で計算する）"""
+    matrix = DefectMatrix(rows)
+    defect_data = []
+    defect_rates = []
+    total_rates = []
+    for index in range(len(matrix)):
+        total_inject = matrix.totals[index]
+        total_defect = matrix.row_total_defect(index)
+        defect_data.append({'total_inject': total_inject, **matrix.row_counts(index)})
+        defect_rates.append(matrix.row_rates(index))
+        total_rates.append(round((total_defect / total_inject) * 100, 2) if total_inject > 0 else 0)
+    return defect_data, defect_rates, total_rates
+
+
+def measure(func, rows, count):
+    """count回実行した処理時間（ms）のリスト"""
+    times = []
+    for _ in range(count):
+        started = time.perf_counter()
+        func(rows)
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='不良率計算の計測')
+    parser.add_argument('--days', type=int, default=365, help='日数')
+    parser.add_argument('--monos', type=int, default=10, help='モノマー種の数')
+    parser.add_argument('--zero-ratio', type=float, default=0.7, help='不良数が0の項目の割合')
+    parser.add_argument('--count', type=int, default=5, help='計測回数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数の種')
+    args = parser.parse_args()
+
+    rows = make_rows(args.days, args.monos, args.zero_ratio, args.seed)
+    if per_field_payload(rows) != matrix_payload(rows):
+        raise SystemExit('計算結果が一致しません')
+
+    print(f'集計行: {len(rows):,}行（{args.days}日 × {args.monos}モノマー種） × 不良項目 {len(DEFECT_LABELS)}')
+    results = {}
+    for name, func in (('従来（項目ごと）', per_field_payload), ('DefectMatrix', matrix_payload)):
+        times = measure(func, rows, args.count)
+        results[name] = statistics.median(times)
+        print(f'{name:<16} 中央値 {results[name]:8.1f} ms  最小 {min(times):8.1f} ms')
+
+    baseline, matrix = results.values()
+    print(f'短縮率: {(1 - matrix / baseline) * 100:.1f}%')
+
+
+if __name__ == '__main__':
+    main()
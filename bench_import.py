@@ -0,0 +1,86 @@
+# bench_import.py
+#
+# アプリ起動時（import run）のインポート時間を計測する（python -X importtime の集計）
+#
+#   python bench_import.py              遅延読み込みあり・なしを各5回計測して比較
+#   python bench_import.py --top 30     モジュール別の内訳を30件表示
+#
+# 遅延読み込みなしは LAZY_BLUEPRINTS=0 で起動した場合の値。
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+# .envファイルを読み込む
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# import time:  self [us] | cumulative | imported package
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_importtime(lazy):
+    """
+    新しいプロセスで import run を実行し、モジュールごとのインポート時間を取得する
+
+    戻り値:
+        list: [(モジュール名, 自身の時間us, 累積時間us)]（出現順）
+    """
+    env = dict(os.environ)
+    env['LAZY_BLUEPRINTS'] = '1' if lazy else '0'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import run'],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=False
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    if not any(name == 'run' for name, _, _ in modules):
+        raise RuntimeError(f'import run に失敗しました:\n{result.stderr[-2000:]}')
+    return modules
+
+
+def _total_ms(modules):
+    """import run の累積時間（ms）"""
+    return next(cumulative for name, _, cumulative in modules if name == 'run') / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='起動時のインポート時間の計測')
+    parser.add_argument('--count', type=int, default=5, help='計測回数')
+    parser.add_argument('--top', type=int, default=15, help='表示するモジュール数')
+    args = parser.parse_args()
+
+    results = {}
+    for lazy in (True, False):
+        runs = [run_importtime(lazy) for _ in range(args.count)]
+        results[lazy] = runs
+        label = '遅延読み込みあり' if lazy else '遅延読み込みなし'
+        totals = [_total_ms(modules) for modules in runs]
+        print(f"{label}: import run 中央値 {statistics.median(totals):7.1f}ms  "
+              f"（最小 {min(totals):.1f}ms / 最大 {max(totals):.1f}ms、{args.count}回）")
+
+    # アプリのモジュールの内訳（最後の計測）
+    for lazy in (True, False):
+        label = '遅延読み込みあり' if lazy else '遅延読み込みなし'
+        app_modules = [m for m in results[lazy][-1] if m[0] == 'run' or m[0].startswith('app')]
+        print(f"\n[{label}] アプリのモジュール（自身の時間順）")
+        for name, self_us, cumulative_us in sorted(app_modules, key=lambda m: -m[1])[:args.top]:
+            print(f"  {name:<28} 自身 {self_us / 1000:7.1f}ms  累積 {cumulative_us / 1000:7.1f}ms")
+
+    # 全モジュールの上位（依存ライブラリを含む）
+    print(f"\n[遅延読み込みあり] 全モジュール（自身の時間順、上位{args.top}件）")
+    for name, self_us, cumulative_us in sorted(results[True][-1], key=lambda m: -m[1])[:args.top]:
+        print(f"  {name:<40} 自身 {self_us / 1000:7.1f}ms  累積 {cumulative_us / 1000:7.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
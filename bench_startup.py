@@ -0,0 +1,101 @@
+# bench_startup.py
+#
+# CGI（index.cgi）と常駐型（index.fcgi / run.py）の1リクエストあたりの応答時間を比較する
+#
+#   python bench_startup.py                    /login を各10回
+#   python bench_startup.py --path /api/csv_import_time --count 20
+#
+# CGI: リクエストごとにPythonを起動して index.cgi を実行する（起動・import・create_appを含む）
+# 常駐: 同じプロセスでアプリを1回だけ作成し、WSGIアプリを直接呼び出す
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# .envファイルを読み込む
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _cgi_environ(path):
+    """CGIとして index.cgi を実行するための環境変数"""
+    path_info, _, query = path.partition('?')
+    env = dict(os.environ)
+    env.update({
+        'GATEWAY_INTERFACE': 'CGI/1.1',
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '/index.cgi',
+        'PATH_INFO': path_info,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+    })
+    return env
+
+
+def bench_cgi(path, count):
+    """CGI方式: 1リクエストごとに新しいプロセスで index.cgi を実行"""
+    env = _cgi_environ(path)
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(BASE_DIR, 'index.cgi')],
+            cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def bench_resident(path, count):
+    """常駐方式: アプリを1回だけ作成し、同じプロセスでリクエストを処理"""
+    started = time.perf_counter()
+    sys.path.insert(0, BASE_DIR)
+    from run import app
+    startup_ms = (time.perf_counter() - started) * 1000
+
+    client = app.test_client()
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+    return startup_ms, timings
+
+
+def _summary(timings):
+    return (
+        f"平均 {statistics.mean(timings):8.1f}ms  "
+        f"中央値 {statistics.median(timings):8.1f}ms  "
+        f"最大 {max(timings):8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CGIと常駐型の応答時間の比較')
+    parser.add_argument('--path', default='/login', help='リクエストするパス')
+    parser.add_argument('--count', type=int, default=10, help='リクエスト回数')
+    args = parser.parse_args()
+
+    print(f"対象: GET {args.path} × {args.count}回")
+
+    cgi_timings = bench_cgi(args.path, args.count)
+    print(f"CGI  (index.cgi) : {_summary(cgi_timings)}")
+
+    startup_ms, resident_timings = bench_resident(args.path, args.count)
+    print(f"常駐 (index.fcgi): {_summary(resident_timings)}  （起動 {startup_ms:.1f}ms、初回のみ）")
+
+    ratio = statistics.mean(cgi_timings) / statistics.mean(resident_timings)
+    print(f"常駐型はCGIの約{ratio:.0f}倍速く応答します")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
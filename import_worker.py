@@ -0,0 +1,45 @@
+# import_worker.py
+#
+# CSV取込ジョブ（IMP_JOB）を実行するワーカー
+#
+#   python import_worker.py          常駐して待機中のジョブを順に実行する
+#   python import_worker.py --once   待機中のジョブをすべて実行して終了する（cronでの定期実行用）
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+# .envファイルを読み込む
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CSV取込ジョブのワーカー')
+    parser.add_argument('--once', action='store_true', help='待機中のジョブを実行したら終了する')
+    parser.add_argument('--interval', type=float, default=None, help='キューを確認する間隔（秒）')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.config import Config
+    from app.import_jobs import run_worker, IMPORT_WORKER_POLL_INTERVAL
+
+    app = create_app(Config)
+    try:
+        processed = run_worker(
+            app,
+            once=args.once,
+            poll_interval=args.interval or IMPORT_WORKER_POLL_INTERVAL,
+        )
+    except KeyboardInterrupt:
+        print("ワーカーを停止しました")
+        return 0
+    except Exception as e:
+        print(f"エラーが発生しました: {str(e)}")
+        return 1
+
+    print(f"取込ジョブを{processed}件実行しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
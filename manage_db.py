@@ -0,0 +1,115 @@
+# manage_db.py
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+# .envファイルを読み込む
+load_dotenv()
+
+
+def cmd_migrate(args):
+    """未適用のスキーマ移行を適用する"""
+    from app.schema import migrate, LATEST_VERSION
+
+    applied = migrate(target_version=args.version)
+    if applied:
+        print(f"スキーマ移行を適用しました: バージョン {', '.join(str(v) for v in applied)}")
+    else:
+        print(f"適用する移行はありません（最新バージョン: {args.version or LATEST_VERSION}）")
+    return 0
+
+
+def cmd_create_tables(args):
+    """モデル定義から未作成のテーブルを作成する（db.create_all）"""
+    from app import create_app, create_all_tables
+    from app.config import Config
+
+    app = create_app(Config)
+    with app.app_context():
+        create_all_tables()
+
+    print("未作成のテーブルを作成しました（既存のテーブルは変更しません）")
+    return 0
+
+
+def cmd_status(args):
+    """現在のスキーマバージョンを表示する"""
+    from app.database import get_engine
+    from app.schema import get_current_version, MIGRATIONS
+
+    with get_engine().connect() as conn:
+        current = get_current_version(conn)
+
+    print(f"現在のスキーマバージョン: {current}")
+    for migration in MIGRATIONS:
+        mark = '適用済' if migration['version'] <= current else '未適用'
+        print(f"  [{mark}] {migration['version']}: {migration['description']}")
+    return 0
+
+
+def cmd_check(args):
+    """各APIの代表クエリの実行計画を確認する"""
+    from app.schema import check_explain
+
+    results = check_explain(days=args.days)
+    ng_count = 0
+    for result in results:
+        mark = 'OK' if result['ok'] else 'NG'
+        if not result['ok']:
+            ng_count += 1
+        print(f"[{mark}] {result['api']}")
+        print(f"      使用インデックス: {result['key'] or 'なし'} / 想定: {result['expected']} / 推定行数: {result['rows']}")
+
+    print(f"確認完了: {len(results) - ng_count}件OK, {ng_count}件NG")
+    return 1 if ng_count else 0
+
+
+def cmd_rebuild_agg(args):
+    """生産実績日別集計（PRD_DAILY_AGG）を全件再作成する"""
+    from app.database import get_engine
+    from app.daily_agg import rebuild_daily_agg
+
+    with get_engine().connect() as conn:
+        rebuild_daily_agg(conn)
+        conn.commit()
+
+    print("生産実績日別集計を再作成しました")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='データベーススキーマ管理')
+    subparsers = parser.add_subparsers(dest='command')
+
+    migrate_parser = subparsers.add_parser('migrate', help='未適用のスキーマ移行を適用')
+    migrate_parser.add_argument('--version', type=int, default=None, help='適用する最大バージョン')
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    create_parser = subparsers.add_parser('create-tables', help='モデル定義から未作成のテーブルを作成')
+    create_parser.set_defaults(func=cmd_create_tables)
+
+    status_parser = subparsers.add_parser('status', help='スキーマバージョンを表示')
+    status_parser.set_defaults(func=cmd_status)
+
+    check_parser = subparsers.add_parser('check', help='EXPLAINでインデックスの使用を確認')
+    check_parser.add_argument('--days', type=int, default=30, help='確認に使う日付範囲（日数）')
+    check_parser.set_defaults(func=cmd_check)
+
+    rebuild_parser = subparsers.add_parser('rebuild-agg', help='生産実績日別集計を全件再作成')
+    rebuild_parser.set_defaults(func=cmd_rebuild_agg)
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"エラーが発生しました: {str(e)}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
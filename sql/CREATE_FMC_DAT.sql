@@ -31,8 +31,9 @@ CREATE TABLE `FMC_DAT` (
     `FMC_WASH_CUT_ERR` decimal(4) COMMENT '洗浄カットミス',
     `FMC_WASH_OTHERS` decimal(4) COMMENT '洗浄その他',
     `FMC_PASS_QTY` decimal(4) COMMENT '合格数',
-    `FMC_MONTH` decimal(2) COMMENT '月'
+    `FMC_MONTH` decimal(2) COMMENT '月',
 
+    KEY `IX_FMC_CUT_DATE` (`FMC_CUT_DATE`, `FMC_MONOMER`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='膜カットデータ';
 
 ALTER TABLE `FMC_DAT` ADD COLUMN `FMC_AMPM` decimal(1) COMMENT 'AM/PM' AFTER `FMC_COLOR`;
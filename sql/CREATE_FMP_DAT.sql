@@ -24,5 +24,7 @@ CREATE TABLE `FMP_DAT` (
     `FMP_OTHERS` decimal(5) COMMENT 'その他',
     `FMP_GRADE_A` decimal(5) COMMENT 'A品',
     `FMP_GRADE_B` decimal(5) COMMENT 'B品',
-    `FMP_GRADE_C` decimal(5) COMMENT 'C品'
+    `FMP_GRADE_C` decimal(5) COMMENT 'C品',
+
+    KEY `IX_FMP_INSP_DATE` (`FMP_INSP_DATE`, `FMP_COLOR`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='膜加工データ';
\ No newline at end of file
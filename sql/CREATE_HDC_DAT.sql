@@ -30,6 +30,7 @@ CREATE TABLE `HDC_DAT` (
     `HDC_PRJ_DROP` decimal(5) COMMENT '投影タレ',
     `HDC_PRJ_CHIP` decimal(5) COMMENT '投影カケ',
     `HDC_PRJ_STREAK` decimal(5) COMMENT '投影スジ',
-    `HDC_PASS_QTY` decimal(5) COMMENT '合格数'
+    `HDC_PASS_QTY` decimal(5) COMMENT '合格数',
 
+    KEY `IX_HDC_COAT_DATE` (`HDC_COAT_DATE`, `HDC_TYPE`, `HDC_TIMES`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='ハードコートデータ';
\ No newline at end of file
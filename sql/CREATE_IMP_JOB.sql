@@ -0,0 +1,20 @@
+﻿/* CSV取込ジョブ */
+CREATE TABLE IMP_JOB (
+    IMJ_ID int NOT NULL AUTO_INCREMENT COMMENT 'ジョブID',
+    IMJ_KIND varchar(20) NOT NULL COMMENT '取込種類',
+    IMJ_STATUS varchar(10) NOT NULL COMMENT '状態(queued/running/done/failed)',
+    IMJ_FILE_PATH varchar(255) NOT NULL COMMENT '保存したCSVファイルのパス',
+    IMJ_FILE_NM varchar(255) COMMENT 'アップロード時のファイル名',
+    IMJ_ENCODING varchar(20) COMMENT '文字コード',
+    IMJ_USER varchar(20) COMMENT '登録ユーザー',
+    IMJ_STAGE varchar(20) COMMENT '処理段階',
+    IMJ_READ_ROWS int COMMENT '読込件数',
+    IMJ_WRITTEN_ROWS int COMMENT '登録件数',
+    IMJ_SKIPPED_ROWS int COMMENT 'スキップ件数',
+    IMJ_MESSAGE text COMMENT '結果メッセージ・エラー内容',
+    IMJ_CREATED_DT datetime COMMENT '登録日時',
+    IMJ_STARTED_DT datetime COMMENT '開始日時',
+    IMJ_FINISHED_DT datetime COMMENT '終了日時',
+    PRIMARY KEY (IMJ_ID),
+    KEY IX_IMJ_STATUS (IMJ_STATUS, IMJ_ID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='CSV取込ジョブ';
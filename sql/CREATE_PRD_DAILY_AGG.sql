@@ -0,0 +1,77 @@
+﻿/* 生産実績日別集計 */
+CREATE TABLE PRD_DAILY_AGG (
+    PDA_ID bigint NOT NULL AUTO_INCREMENT COMMENT 'ID',
+    PDA_DATE_KBN varchar(3) NOT NULL COMMENT '日付区分(R1/R2/CHK)',
+    PDA_DATE date COMMENT '日付',
+    PDA_MONO_SYU varchar(1) COMMENT 'モノマー種',
+    PDA_PRD_ID varchar(5) COMMENT '製品ID',
+    PDA_CHK3_FLG decimal(1) NOT NULL DEFAULT 0 COMMENT '三次検査済み',
+    PDA_LOT_CNT int NOT NULL DEFAULT 0 COMMENT 'ロット数',
+    PDA_INJECT_QTY decimal(10) COMMENT 'PRR_INJECT_QTYの合計',
+    PDA_ROLL_MISS decimal(10) COMMENT 'PRR_ROLL_MISSの合計',
+    PDA_R1_BUB_CHK decimal(10) COMMENT 'PRR_R1_BUB_CHKの合計',
+    PDA_CURL_INS decimal(10) COMMENT 'PRR_CURL_INSの合計',
+    PDA_FILM_FLT_CK decimal(10) COMMENT 'PRR_FILM_FLT_CKの合計',
+    PDA_LEAK decimal(10) COMMENT 'PRR_LEAKの合計',
+    PDA_FILM_PULL decimal(10) COMMENT 'PRR_FILM_PULLの合計',
+    PDA_FILM_NG_CK decimal(10) COMMENT 'PRR_FILM_NG_CKの合計',
+    PDA_R2_BUB_REK decimal(10) COMMENT 'PRR_R2_BUB_REKの合計',
+    PDA_CRACK decimal(10) COMMENT 'PRR_CRACKの合計',
+    PDA_TEAR_RLS decimal(10) COMMENT 'PRR_TEAR_RLSの合計',
+    PDA_TEAR decimal(10) COMMENT 'PRR_TEARの合計',
+    PDA_PEEL decimal(10) COMMENT 'PRR_PEELの合計',
+    PDA_CHIP decimal(10) COMMENT 'PRR_CHIPの合計',
+    PDA_POLY_CRK decimal(10) COMMENT 'PRR_POLY_CRKの合計',
+    PDA_MOLD_SCR decimal(10) COMMENT 'PRR_MOLD_SCRの合計',
+    PDA_LENS_SCR decimal(10) COMMENT 'PRR_LENS_SCRの合計',
+    PDA_R1_BUBBLE decimal(10) COMMENT 'PRR_R1_BUBBLEの合計',
+    PDA_R2_BUBBLE decimal(10) COMMENT 'PRR_R2_BUBBLEの合計',
+    PDA_DEFECT decimal(10) COMMENT 'PRR_DEFECTの合計',
+    PDA_ELUTION decimal(10) COMMENT 'PRR_ELUTIONの合計',
+    PDA_HAZE decimal(10) COMMENT 'PRR_HAZEの合計',
+    PDA_CURL decimal(10) COMMENT 'PRR_CURLの合計',
+    PDA_FILM_FLOAT decimal(10) COMMENT 'PRR_FILM_FLOATの合計',
+    PDA_R1_DEFECT decimal(10) COMMENT 'PRR_R1_DEFECTの合計',
+    PDA_FILM_NG decimal(10) COMMENT 'PRR_FILM_NGの合計',
+    PDA_FOREIGN decimal(10) COMMENT 'PRR_FOREIGNの合計',
+    PDA_CUT_WASTE decimal(10) COMMENT 'PRR_CUT_WASTEの合計',
+    PDA_FIBER decimal(10) COMMENT 'PRR_FIBERの合計',
+    PDA_MOLD_DIRT decimal(10) COMMENT 'PRR_MOLD_DIRTの合計',
+    PDA_FILM_DIRT decimal(10) COMMENT 'PRR_FILM_DIRTの合計',
+    PDA_AXIS_1ST decimal(10) COMMENT 'PRR_AXIS_1STの合計',
+    PDA_STRIPE_1ST decimal(10) COMMENT 'PRR_STRIPE_1STの合計',
+    PDA_EDGE_DEFECT decimal(10) COMMENT 'PRR_EDGE_DEFECTの合計',
+    PDA_ECC_1ST decimal(10) COMMENT 'PRR_ECC_1STの合計',
+    PDA_WASH_DROP decimal(10) COMMENT 'PRR_WASH_DROPの合計',
+    PDA_UNKNOWN decimal(10) COMMENT 'PRR_UNKNOWNの合計',
+    PDA_OTHER_1 decimal(10) COMMENT 'PRR_OTHER_1の合計',
+    PDA_OTHER_2 decimal(10) COMMENT 'PRR_OTHER_2の合計',
+    PDA_ECC_DEFECT decimal(10) COMMENT 'PRR_ECC_DEFECTの合計',
+    PDA_DROP decimal(10) COMMENT 'PRR_DROPの合計',
+    PDA_COUNT_ERR decimal(10) COMMENT 'PRR_COUNT_ERRの合計',
+    PDA_OTHER_1ST decimal(10) COMMENT 'PRR_OTHER_1STの合計',
+    PDA_PEEL_2ND decimal(10) COMMENT 'PRR_PEEL_2NDの合計',
+    PDA_STRIPE_2ND decimal(10) COMMENT 'PRR_STRIPE_2NDの合計',
+    PDA_SUCTION decimal(10) COMMENT 'PRR_SUCTIONの合計',
+    PDA_MOLD_2ND decimal(10) COMMENT 'PRR_MOLD_2NDの合計',
+    PDA_FILM_2ND decimal(10) COMMENT 'PRR_FILM_2NDの合計',
+    PDA_DEFECT_2ND decimal(10) COMMENT 'PRR_DEFECT_2NDの合計',
+    PDA_OTHER_2ND decimal(10) COMMENT 'PRR_OTHER_2NDの合計',
+    PDA_AXIS_DEF decimal(10) COMMENT 'PRR_AXIS_DEFの合計',
+    PDA_FILM_3RD decimal(10) COMMENT 'PRR_FILM_3RDの合計',
+    PDA_COLOR_DEF decimal(10) COMMENT 'PRR_COLOR_DEFの合計',
+    PDA_TRANS_DEF decimal(10) COMMENT 'PRR_TRANS_DEFの合計',
+    PDA_CURVE_DEF decimal(10) COMMENT 'PRR_CURVE_DEFの合計',
+    PDA_CEN_TH_DEF decimal(10) COMMENT 'PRR_CEN_TH_DEFの合計',
+    PDA_DIAM_DEF decimal(10) COMMENT 'PRR_DIAM_DEFの合計',
+    PDA_R1_TH_DEF decimal(10) COMMENT 'PRR_R1_TH_DEFの合計',
+    PDA_ECC_3RD decimal(10) COMMENT 'PRR_ECC_3RDの合計',
+    PDA_EDGE_DEF_3 decimal(10) COMMENT 'PRR_EDGE_DEF_3の合計',
+    PDA_AXIS_3RD decimal(10) COMMENT 'PRR_AXIS_3RDの合計',
+    PDA_OTHER_3RD decimal(10) COMMENT 'PRR_OTHER_3RDの合計',
+    PDA_A_GRADE decimal(10) COMMENT 'PRR_A_GRADEの合計',
+    PDA_B_GRADE decimal(10) COMMENT 'PRR_B_GRADEの合計',
+    PRIMARY KEY (PDA_ID),
+    KEY IX_PDA_DATE (PDA_DATE_KBN, PDA_DATE, PDA_MONO_SYU),
+    KEY IX_PDA_PRD (PDA_DATE_KBN, PDA_PRD_ID, PDA_DATE)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='生産実績日別集計';
@@ -97,7 +97,13 @@ CREATE TABLE `PRD_RECORD` (
     `PRR_R1_CHK_DT` datetime COMMENT 'R1検査日',
     `PRR_R2_DATETIME` datetime COMMENT 'R2注入日時',
 
-    PRIMARY KEY (`PRR_LOT_NO`)
+    PRIMARY KEY (`PRR_LOT_NO`),
+    KEY `IX_PRR_R1_IN_DATE` (`PRR_R1_IN_DATE`, `PRR_MONO_SYU`),
+    KEY `IX_PRR_R2_DATE` (`PRR_R2_DATE`, `PRR_MONO_SYU`, `PRR_CHK3_BY`),
+    KEY `IX_PRR_CHK_DT` (`PRR_CHK_DT`, `PRR_MONO_SYU`, `PRR_CHK3_BY`),
+    KEY `IX_PRR_MONO_CHK` (`PRR_MONO_SYU`, `PRR_CHK_DT`),
+    KEY `IX_PRR_PRD_R1` (`PRR_PRD_ID`, `PRR_R1_IN_DATE`),
+    KEY `IX_PRR_R1_LOT` (`PRR_R1_IN_DATE`, `PRR_LOT_NO`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='生産実績';
 
 alter table PRD_RECORD modify column PRR_LOT_NO varchar(17) NOT NULL COMMENT 'ロットNo．';
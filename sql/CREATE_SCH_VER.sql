@@ -0,0 +1,7 @@
+﻿/* スキーマバージョン */
+CREATE TABLE `SCH_VER` (
+    `SCV_VERSION` int NOT NULL COMMENT 'スキーマバージョン',
+    `SCV_DESC` varchar(100) COMMENT '内容',
+    `SCV_APPLIED_DT` datetime COMMENT '適用日時',
+    PRIMARY KEY (`SCV_VERSION`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='スキーマバージョン';
\ No newline at end of file
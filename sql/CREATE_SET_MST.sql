@@ -10,5 +10,6 @@ CREATE TABLE `SET_MST` (
     `SET_INFO_2` varchar(200) COMMENT 'お知らせ２',
     `SET_INFO_H3` varchar(40) COMMENT 'お知らせヘッダ３',
     `SET_INFO_3` varchar(200) COMMENT 'お知らせ３',
+    `SET_DATA_GEN` int NOT NULL DEFAULT 0 COMMENT 'データ世代',
     PRIMARY KEY (`SET_ID`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='設定マスタ';
\ No newline at end of file
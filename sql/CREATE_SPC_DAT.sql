@@ -42,5 +42,6 @@ CREATE TABLE `SPC_DAT` (
     `SPC_PST_OTHERS` decimal(5) COMMENT '硬化後その他',
     `SPC_FNL_GD_QTY` decimal(5) COMMENT '最終良品数',
 
-    PRIMARY KEY (`SPC_ID`)
+    PRIMARY KEY (`SPC_ID`),
+    KEY `IX_SPC_COAT_DATE` (`SPC_COAT_DATE`, `SPC_TYPE`, `SPC_TIMES`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='スピンコートデータ';
\ No newline at end of file
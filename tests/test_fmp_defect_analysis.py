@@ -0,0 +1,192 @@
+# FmpDat.get_defect_analysis の回帰テスト
+#
+# SQLの SUM 1回で集計する現在の実装と、変更前の実装（全行を読み込んでPythonで項目ごとに合計）が
+# 同じ結果を返すことを、SQLiteに読み込んだFMP_DATのデータで確認する。
+#
+#   python -m pytest tests
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp('db') / 'fmp.db'
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app, db
+    from app.config import Config
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        TESTING = True
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        from app.ishida_models import FmpDat
+        FmpDat.__table__.create(db.engine)
+        _load_fixture(db, FmpDat)
+        yield app
+
+
+BASE_DATE = datetime(2026, 4, 1)
+
+# 集計対象の数量列（日付・区分・備考以外）
+QTY_COLUMNS = (
+    'FMP_PROC_SHTS', 'FMP_WRINKLE_A', 'FMP_WRINKLE_B', 'FMP_TEAR', 'FMP_FOREIGN', 'FMP_FIBER',
+    'FMP_SCRATCH', 'FMP_HOLE', 'FMP_PRM_OTHERS', 'FMP_PRM_GOOD_QTY', 'FMP_CLR_FADE',
+    'FMP_CLR_IRREG', 'FMP_DYE_STREAK', 'FMP_DIRT', 'FMP_OTHERS',
+    'FMP_GRADE_A', 'FMP_GRADE_B', 'FMP_GRADE_C'
+)
+
+
+def _load_fixture(db, FmpDat):
+    """検査日30日分・色3種のFMP_DATを作成（色3は一次良品数0、一部の等級はNULL）"""
+    rand = random.Random(0)
+    for n in range(240):
+        values = {col: rand.randint(0, 40) for col in QTY_COLUMNS}
+        values['FMP_PROC_SHTS'] = rand.randint(300, 900)
+        color = n % 3 + 1
+        if color == 3:
+            values['FMP_PRM_GOOD_QTY'] = 0
+        if n % 7 == 0:
+            values['FMP_GRADE_B'] = None
+        insp_date = BASE_DATE + timedelta(days=n % 30, hours=n % 5)
+        db.session.add(FmpDat(
+            FMP_INSP_DATE=insp_date,
+            FMP_PROC_DATE=insp_date.replace(hour=0),
+            FMP_COLOR=color,
+            FMP_PVA_LOT_NO=n % 4,
+            FMP_FILM_CURVE=n % 2 + 1,
+            **values
+        ))
+    db.session.commit()
+
+
+def legacy_defect_analysis(query):
+    """変更前の get_defect_analysis の集計（全行を読み込んでPythonで合計）"""
+    results = query.all()
+
+    total_sheets = sum(r.FMP_PROC_SHTS for r in results)
+    primary_good = sum(r.FMP_PRM_GOOD_QTY for r in results)
+
+    if total_sheets == 0:
+        return {
+            'total_sheets': 0,
+            'primary_good': 0,
+            'primary_good_rate': 0,
+            'primary_defect_rates': {},
+            'secondary_defect_rates': {},
+            'grade_info': {}
+        }
+
+    primary_defect_rates = {
+        'シワA': sum(r.FMP_WRINKLE_A for r in results) / total_sheets * 100,
+        'シワB': sum(r.FMP_WRINKLE_B for r in results) / total_sheets * 100,
+        '裂け': sum(r.FMP_TEAR for r in results) / total_sheets * 100,
+        'ブツ': sum(r.FMP_FOREIGN for r in results) / total_sheets * 100,
+        '繊維': sum(r.FMP_FIBER for r in results) / total_sheets * 100,
+        'キズ': sum(r.FMP_SCRATCH for r in results) / total_sheets * 100,
+        '穴': sum(r.FMP_HOLE for r in results) / total_sheets * 100,
+        'その他': sum(r.FMP_PRM_OTHERS for r in results) / total_sheets * 100
+    }
+
+    if primary_good == 0:
+        return {
+            'total_sheets': total_sheets,
+            'primary_good': 0,
+            'primary_good_rate': 0,
+            'primary_defect_rates': primary_defect_rates,
+            'secondary_defect_rates': {},
+            'grade_info': {}
+        }
+
+    secondary_defect_rates = {
+        '色抜け': sum(r.FMP_CLR_FADE for r in results) / primary_good * 100,
+        '色ムラ': sum(r.FMP_CLR_IRREG for r in results) / primary_good * 100,
+        '染スジ': sum(r.FMP_DYE_STREAK for r in results) / primary_good * 100,
+        '汚れ': sum(r.FMP_DIRT for r in results) / primary_good * 100,
+        'その他': sum(r.FMP_OTHERS for r in results) / primary_good * 100
+    }
+
+    total_graded = sum(
+        (r.FMP_GRADE_A or 0) + (r.FMP_GRADE_B or 0) + (r.FMP_GRADE_C or 0)
+        for r in results
+    )
+
+    grade_info = {}
+    for name, col in (('A品', 'FMP_GRADE_A'), ('B品', 'FMP_GRADE_B'), ('C品', 'FMP_GRADE_C')):
+        quantity = sum(getattr(r, col) or 0 for r in results)
+        grade_info[name] = {
+            'quantity': quantity,
+            'rate': quantity / total_graded * 100 if total_graded > 0 else 0
+        }
+
+    good_rate = total_graded / total_sheets * 100 if total_sheets > 0 else 0
+
+    return {
+        'total_sheets': total_sheets,
+        'primary_good': primary_good,
+        'primary_good_rate': good_rate,
+        'primary_defect_rates': primary_defect_rates,
+        'secondary_defect_rates': secondary_defect_rates,
+        'grade_info': grade_info
+    }
+
+
+def legacy_query(FmpDat, start_date=None, end_date=None, proc_date=None,
+                 color=None, pva_lot_no=None, film_curve=None):
+    """変更前と同じ検索条件のクエリ"""
+    query = FmpDat.query
+    if start_date:
+        query = query.filter(FmpDat.FMP_INSP_DATE >= start_date)
+    if end_date:
+        query = query.filter(FmpDat.FMP_INSP_DATE <= end_date)
+    if proc_date:
+        query = query.filter(FmpDat.FMP_PROC_DATE == proc_date)
+    if color:
+        query = query.filter(FmpDat.FMP_COLOR == color)
+    if pva_lot_no:
+        query = query.filter(FmpDat.FMP_PVA_LOT_NO == pva_lot_no)
+    if film_curve:
+        query = query.filter(FmpDat.FMP_FILM_CURVE == film_curve)
+    return query
+
+
+@pytest.mark.parametrize('conditions', [
+    {},
+    {'start_date': BASE_DATE + timedelta(days=10)},
+    {'start_date': BASE_DATE + timedelta(days=5), 'end_date': BASE_DATE + timedelta(days=20), 'color': 1},
+    {'proc_date': BASE_DATE + timedelta(days=3)},
+    {'pva_lot_no': 2, 'film_curve': 1},
+    {'color': 2, 'film_curve': 2},
+    # 一次良品数が0（二次検査・等級は空）
+    {'color': 3},
+    # 対象データなし
+    {'start_date': BASE_DATE + timedelta(days=60)},
+    {'start_date': BASE_DATE + timedelta(days=20), 'end_date': BASE_DATE + timedelta(days=10)},
+], ids=repr)
+def test_get_defect_analysis_matches_legacy(app, conditions):
+    from app.ishida_models import FmpDat
+
+    expected = legacy_defect_analysis(legacy_query(FmpDat, **conditions))
+    actual = FmpDat.get_defect_analysis(**conditions)
+
+    assert actual == expected
+
+
+def test_branches_are_covered(app):
+    """フィクスチャが空の期間・一次良品数0の分岐を通ることを確認"""
+    from app.ishida_models import FmpDat
+
+    empty = FmpDat.get_defect_analysis(start_date=BASE_DATE + timedelta(days=60))
+    assert empty['total_sheets'] == 0 and empty['primary_defect_rates'] == {}
+
+    no_primary_good = FmpDat.get_defect_analysis(color=3)
+    assert no_primary_good['total_sheets'] > 0
+    assert no_primary_good['primary_good'] == 0
+    assert no_primary_good['primary_defect_rates']
+    assert no_primary_good['secondary_defect_rates'] == {} and no_primary_good['grade_info'] == {}